@@ -1,3 +1,5 @@
-from decimal import getcontext
+from decimal import getcontext, DefaultContext
 
 getcontext().prec = 128
+# Vorlage für die Contexts neuer Threads, damit parallele Berechnungen dieselbe Präzision verwenden
+DefaultContext.prec = 128
@@ -2,7 +2,7 @@ import math
 from dataclasses import dataclass
 from decimal import Decimal
 
-from lib import konstanten
+from lib import konstanten, tracing
 from lib.helper import grad_zu_rad
 from lib.planet import ERDE
 from lib.unit_decimal import UnitDecimal, return_unit
@@ -43,7 +43,7 @@ def bahnaufstieg() -> Bahnaufstieg:
     :return: Sämtliche berechneten Werte.
     """
     # TODO: Tatsächlichen Wert ausrechnen
-    print('Bahnaufstieg in eine 200-km-Bahn.')
+    tracing.message('Bahnaufstieg in eine 200-km-Bahn.')
     v_total = UnitDecimal(9.58, 'km/s')
-    print(f'TODO: Fester Wert für eine 200km Umlaufbahn: {v_total=}')
+    tracing.message(f'TODO: Fester Wert für eine 200km Umlaufbahn: {v_total=}')
     return Bahnaufstieg(v_total=v_total)
\ No newline at end of file
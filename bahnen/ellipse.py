@@ -2,14 +2,16 @@ import math
 from datetime import timedelta
 from decimal import Decimal
 from lib import konstanten
+from lib.numerik import absolute, adaptive, sqrt, math_sqrt, duration, total_seconds, number, to_float
 from lib.planet import Planet, ERDE
-from lib.unit_decimal import return_unit, UnitDecimal
+from lib.unit_decimal import return_unit, with_unit, UnitDecimal
 from typing import Optional, List, Callable, Dict
 from lib.allgemein import *
-from lib.solvable import Solvable
+from lib.solvable import Solvable, formula_cost, COST_DECIMAL_SQRT, COST_FLOAT_FUNCTION, COST_DECIMAL_POWER
 
 
 @return_unit('km')
+@adaptive(lambda epsilon, **_: 1 / absolute(1 - epsilon**2))
 def grosse_halbachse_p_epsilon(*, p: Decimal, epsilon: Decimal) -> Decimal:
     """
     Berechnet die große Halbachse a einer Ellipse.
@@ -48,6 +50,7 @@ def grosse_halbachse_ra_rp(*, ra: Decimal, rp: Decimal) -> Decimal:
 #     return (p / 2) * ((1 / (1 - epsilon)) + (1 / (1 + epsilon)))
 
 
+@formula_cost(COST_DECIMAL_SQRT)
 @return_unit('km')
 def kleine_halbachse(*, a: Decimal, e: Decimal) -> Decimal:
     """
@@ -57,7 +60,7 @@ def kleine_halbachse(*, a: Decimal, e: Decimal) -> Decimal:
     :param e: Lineare Exzentrizität.
     :return: Kleine Halbachse b in km.
     """
-    return (a**2 - e**2).sqrt()
+    return sqrt(a**2 - e**2)
 
 
 @return_unit('km')
@@ -69,7 +72,7 @@ def bahnparameter_p(*, rp: Decimal, epsilon: Decimal) -> Decimal:
     :param epsilon: Numerische Exzentrizität.
     :return: Bahnparameter p in km.
     """
-    return rp * (Decimal(1) + epsilon)
+    return rp * (1 + epsilon)
 
 
 @return_unit('km')
@@ -93,7 +96,7 @@ def perizentrum_radius_a_epsilon(*, a: Decimal, epsilon: Decimal) -> Decimal:
     :param epsilon: Numerische Exzentrizität.
     :return: Perizentrumsradius rp in km.
     """
-    return a * (Decimal(1) - epsilon)
+    return a * (1 - epsilon)
 
 
 @return_unit('km')
@@ -156,6 +159,7 @@ def apozentrum_radius_a_e(*, a: Decimal, e: Decimal) -> Decimal:
     return a + e
 
 
+@formula_cost(COST_DECIMAL_SQRT)
 @return_unit('km/s')
 def perizentrum_geschwindigkeit_rp_ra(*, zentralgestirn: Planet, rp: Decimal, ra: Decimal) -> Decimal:
     """
@@ -167,9 +171,10 @@ def perizentrum_geschwindigkeit_rp_ra(*, zentralgestirn: Planet, rp: Decimal, ra
     :param ra: Apozentrumsradius ra in km.
     :return: Perizentrumsgeschwindigkeit in km/s.
     """
-    return (2 * zentralgestirn.mu * ((1 / rp) - (1 / (rp + ra)))).sqrt()
+    return sqrt(2 * zentralgestirn.mu * ((1 / rp) - (1 / (rp + ra))))
 
 
+@formula_cost(COST_DECIMAL_SQRT)
 @return_unit('km/s')
 def perizentrum_geschwindigkeit_rp_p_epsilon(*, zentralgestirn: Planet, rp: Decimal, p: Decimal, epsilon: Decimal) -> Decimal:
     """
@@ -181,9 +186,10 @@ def perizentrum_geschwindigkeit_rp_p_epsilon(*, zentralgestirn: Planet, rp: Deci
     :param p: Bahnparameter p in km.
     :return: Perizentrumsgeschwindigkeit in km/s.
     """
-    return (zentralgestirn.mu * ((2 / rp) + ((epsilon**2 - 1) / p))).sqrt()
+    return sqrt(zentralgestirn.mu * ((2 / rp) + ((epsilon**2 - 1) / p)))
 
 
+@formula_cost(COST_DECIMAL_SQRT)
 @return_unit('km/s')
 def apozentrum_geschwindigkeit(*, zentralgestirn: Planet, ra: Decimal, epsilon: Decimal, p: Decimal) -> Decimal:
     """
@@ -196,9 +202,10 @@ def apozentrum_geschwindigkeit(*, zentralgestirn: Planet, ra: Decimal, epsilon:
     :param p: Bahnparameter p in km.
     :return: Perizentrumsgeschwindigkeit in km/s.
     """
-    return (zentralgestirn.mu * ((2 / ra) + ((epsilon**2 - 1) / p))).sqrt()
+    return sqrt(zentralgestirn.mu * ((2 / ra) + ((epsilon**2 - 1) / p)))
 
 
+@formula_cost(COST_FLOAT_FUNCTION)
 def umlaufzeit(*, zentralgestirn: Planet, a: Decimal) -> timedelta:
     """
     Berechnet die Umlaufzeit der Ellipse.
@@ -207,12 +214,14 @@ def umlaufzeit(*, zentralgestirn: Planet, a: Decimal) -> timedelta:
     :param a: Große Halbachse in km.
     :return: Umlaufzeit.
     """
-    return timedelta(seconds=2 * math.pi * math.sqrt(a**3 / zentralgestirn.mu))
+    return duration(2 * math.pi * to_float(math_sqrt(a**3 / zentralgestirn.mu)))
 
 
+@formula_cost(COST_DECIMAL_POWER)
 @return_unit('km')
 def grosse_halbachse_umlaufzeit_zentralgestirn(*, umlaufzeit: timedelta, zentralgestirn: Planet):
-    return (Decimal(umlaufzeit.total_seconds() / (2 * math.pi)) ** 2 * zentralgestirn.mu) ** (Decimal(1 / 3))
+    sekunden = with_unit(number(total_seconds(umlaufzeit) / (2 * math.pi), zentralgestirn.mu), 's')
+    return (sekunden ** 2 * zentralgestirn.mu) ** number(1 / 3, zentralgestirn.mu)
 
 
 class Ellipse(Solvable):
@@ -259,3 +268,24 @@ class Ellipse(Solvable):
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+
+    def bahnpunkte(self, t) -> 'kepler.Bahnpunkte':
+        """Berechnet wahre Anomalie, Radius und Geschwindigkeit zu einem Raster von Zeitpunkten auf einmal, siehe
+        `lib.kepler.bahnpunkte()`. Benötigt NumPy.
+
+        >>> import numpy as np
+        >>> ellipse = Ellipse(rp=UnitDecimal(7000, 'km'), ra=UnitDecimal(9000, 'km'), zentralgestirn=ERDE)
+        >>> t = np.arange(4) * (ellipse.umlaufzeit / 4)
+        >>> np.round(ellipse.bahnpunkte(t).r)
+        array([7000., 8124., 9000., 8124.])
+
+        Args:
+            t: Zeit seit dem Perizentrumsdurchgang in Sekunden als float-Array oder als Array von Dauern, auch
+                über mehrere Umläufe.
+
+        Returns:
+            kepler.Bahnpunkte: Die Zustände zu den Zeitpunkten als float64-Arrays.
+        """
+        # Erst hier importiert, da NumPy optional ist
+        from lib import kepler
+        return kepler.bahnpunkte(t, a=self.a, epsilon=self.epsilon, mu=self.zentralgestirn.mu)
@@ -1,32 +1,37 @@
 # ! Imports nicht optimieren bzw. welche rauslöschen, um in main() via eval() darauf Zugriff zu haben !
+from types import MappingProxyType
+
 from bahnen.transfer_ellipse import TransferEllipse, vk
 from lib.helper import merge_param_funcs
+from lib.numerik import absolute
+from lib.solvable import formula_cost, COST_FLOAT_FUNCTION
 from lib.planet import *
 from lib.unit_decimal import UnitDecimal, return_unit
 
 
 @return_unit('km/s')
 def delta_va(*, vka: UnitDecimal, va: UnitDecimal) -> Decimal:
-    return (va - vka).copy_abs()
+    return absolute(va - vka)
 
 
 @return_unit('km/s')
 def delta_vp(*, vkp: UnitDecimal, vp: UnitDecimal) -> Decimal:
-    return (vp - vkp).copy_abs()
+    return absolute(vp - vkp)
 
 
 class HohmannTransfer(TransferEllipse):
     param_funcs: dict = merge_param_funcs({
-        "vkp": [lambda rp, zentralgestirn: vk(zentralgestirn=zentralgestirn, radius=rp)],
-        "vka": [lambda ra, zentralgestirn: vk(zentralgestirn=zentralgestirn, radius=ra)],
+        "vkp": [formula_cost(COST_FLOAT_FUNCTION)(lambda rp, zentralgestirn: vk(zentralgestirn=zentralgestirn, radius=rp))],
+        "vka": [formula_cost(COST_FLOAT_FUNCTION)(lambda ra, zentralgestirn: vk(zentralgestirn=zentralgestirn, radius=ra))],
         "rp": [lambda planet_p: planet_p.a],
         "ra": [lambda planet_a: planet_a.a],
         "delta_vp": [delta_vp],
         "delta_va": [delta_va]
     }, TransferEllipse.param_funcs)
 
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs, phi_ankunft=UnitDecimal('180', '°'))
+    default_params = MappingProxyType({
+        "phi_ankunft": UnitDecimal('180', '°')
+    })
 
 
 # def hohmann(*, zentralgestirn: Planet, rp: Decimal, ra: Decimal) -> HohmannTransfer:
@@ -4,13 +4,22 @@ from bahnen.ellipse import Ellipse
 from lib import kreis
 from lib.planet import Planet
 from datetime import timedelta, datetime
+from typing import Iterator, Tuple
 from lib.planet import planet_from_name, ERDE
 from lib.unit_decimal import UnitDecimal, return_unit
+from lib.solvable import formula_cost, COST_FLOAT_FUNCTION
 from lib.helper import jahre_zu_timedelta, merge_param_funcs, timedelta_zu_jahre, rad_zu_grad, grad_zu_rad
-import math
+from lib.numerik import absolute, adaptive, all_true, acos, arc_condition, atan, cos, duration, math_sqrt, pi, select, sin, tan, \
+    total_seconds
 
 
+def _cos_phi_ankunft(*, epsilon: Decimal, a: Decimal, ziel_planet: Planet) -> Decimal:
+    return 1 / epsilon * ((a * (1 - epsilon**2) / ziel_planet.a) - 1)
+
+
+@formula_cost(2 * COST_FLOAT_FUNCTION)
 @return_unit("°")
+@adaptive(lambda **kwargs: arc_condition(_cos_phi_ankunft(**kwargs)) + 1 / absolute(1 - kwargs['epsilon']**2))
 def phi_ankunft(*, epsilon: Decimal, a: Decimal, ziel_planet: Planet) -> Decimal:
     """Berechnet die Winkelposition, zu der der Zielplanet erreicht wird.
 
@@ -22,9 +31,11 @@ def phi_ankunft(*, epsilon: Decimal, a: Decimal, ziel_planet: Planet) -> Decimal
     Returns:
         Decimal: Ankunftswinkelposition in Grad.
     """
-    return rad_zu_grad(Decimal(math.acos(1 / epsilon * ((a * (1 - epsilon**2) / ziel_planet.a) - 1))))
+    return rad_zu_grad(acos(_cos_phi_ankunft(epsilon=epsilon, a=a, ziel_planet=ziel_planet)))
 
 
+@formula_cost(6 * COST_FLOAT_FUNCTION)
+@adaptive(lambda epsilon, **_: 1 / absolute(1 - epsilon**2))
 def transfer_dauer(*, zentralgestirn: Planet, a: Decimal, epsilon: Decimal, phi_ankunft: Decimal) -> timedelta:
     """Berechnet die Transferdauer einer (schnellen) Übergangsellipse.
 
@@ -37,33 +48,14 @@ def transfer_dauer(*, zentralgestirn: Planet, a: Decimal, epsilon: Decimal, phi_
     Returns:
         timedelta: Dauer des Transfers.
     """
-    return timedelta(
-        seconds=float(Decimal(
-            math.sqrt(a**3 / zentralgestirn.mu)
-        ) * (
-            Decimal(2) * Decimal(
-                math.atan(Decimal(
-                    math.sqrt(
-                        (1 - epsilon)/(1 + epsilon)
-                    )) * Decimal(
-                        math.tan(grad_zu_rad(phi_ankunft)/2)
-                )
-                )
-            ) - (
-                epsilon * Decimal(
-                    math.sqrt(1 - epsilon**2)
-                ) * Decimal(
-                    math.sin(grad_zu_rad(phi_ankunft))
-                )/(
-                    1 + epsilon * Decimal(
-                        math.cos(grad_zu_rad(phi_ankunft))
-                    )
-                )
-            )
-        ))
-    )
+    phi = grad_zu_rad(phi_ankunft)
+    return duration(math_sqrt(a**3 / zentralgestirn.mu) * (
+        2 * atan(math_sqrt((1 - epsilon) / (1 + epsilon)) * tan(phi / 2))
+        - (epsilon * math_sqrt(1 - epsilon**2) * sin(phi) / (1 + epsilon * cos(phi)))
+    ))
 
 
+@formula_cost(COST_FLOAT_FUNCTION)
 @return_unit("km/s")
 def vk(*, zentralgestirn: Planet, radius: Decimal) -> Decimal:
     """Kreisbahngeschwindigkeit um den Planeten mit entsprechendem Radius.
@@ -78,6 +70,7 @@ def vk(*, zentralgestirn: Planet, radius: Decimal) -> Decimal:
     return kreis.geschwindigkeit(planet=zentralgestirn, rk=radius)
 
 
+@formula_cost(2 * COST_FLOAT_FUNCTION)
 @return_unit("°")
 def psi(*, phi_ankunft: Decimal, transfer_dauer: timedelta, ziel_planet: Planet) -> Decimal:
     """Winkeldelta welches zwischen Start- und Zielplanet zum Startzeitpunkt herrschen muss, damit man beim Zielplaneten ankommt.
@@ -90,7 +83,7 @@ def psi(*, phi_ankunft: Decimal, transfer_dauer: timedelta, ziel_planet: Planet)
     Returns:
         Decimal: Psi in Grad.
     """
-    return rad_zu_grad(grad_zu_rad(phi_ankunft) - timedelta_zu_jahre(transfer_dauer) * 2 * Decimal(math.pi) / ziel_planet.T)
+    return rad_zu_grad(grad_zu_rad(phi_ankunft) - timedelta_zu_jahre(transfer_dauer) * 2 * pi(phi_ankunft) / ziel_planet.T)
 
 
 @return_unit("a")
@@ -119,9 +112,10 @@ def delta_t(*, psi: Decimal, start_planet: Planet, ziel_planet: Planet) -> Decim
     Returns:
         Decimal: Delta-t in Jahren.
     """
-    return (psi + start_planet.L0 - ziel_planet.L0)/(2 * Decimal(math.pi) * ((1/ziel_planet.T) - (1/start_planet.T)))
+    return (psi + start_planet.L0 - ziel_planet.L0)/(2 * pi(psi) * ((1/ziel_planet.T) - (1/start_planet.T)))
 
 
+@formula_cost(4 * COST_FLOAT_FUNCTION)
 @return_unit("km/s")
 def delta_v2(*, zentralgestirn: Planet, v_start: UnitDecimal, start_planet: Planet, ziel_planet: Planet, epsilon: Decimal) -> Decimal:
     """Berechnet das Delta v2 bei einem schnellen Übergang, bei dem man nicht notwendiger Weise tangential am Zielplaneten eintrifft.
@@ -137,45 +131,70 @@ def delta_v2(*, zentralgestirn: Planet, v_start: UnitDecimal, start_planet: Plan
         Decimal: Delta v2 der Transferellipse in km/s.
     """
     # Geschwindigkeit der Sonde auf dessen Bahn beim Zielplaneten
-    v_phi = UnitDecimal(math.sqrt(zentralgestirn.mu /
-                        ziel_planet.a * (1 + epsilon**2)), 'km/s')
+    v_phi = math_sqrt(zentralgestirn.mu / ziel_planet.a * (1 + epsilon**2))
     # Geschwindigkeit des Zielplaneten auf seiner Bahn
     v_pl = vk(zentralgestirn=zentralgestirn, radius=ziel_planet.a)
     # Cosinus-Satz
-    cos_b = UnitDecimal((start_planet.a * v_start) / (ziel_planet.a * v_phi), '°')
-    return -Decimal(math.sqrt((v_pl**2 + v_phi**2 - 2 * v_phi * v_pl * cos_b).copy_abs())).copy_abs()
+    cos_b = (start_planet.a * v_start) / (ziel_planet.a * v_phi)
+    return -absolute(math_sqrt(absolute(v_pl**2 + v_phi**2 - 2 * v_phi * v_pl * cos_b)))
 
 
+@formula_cost(4 * COST_FLOAT_FUNCTION)
 @return_unit('km/s')
 def delta_vp_or_delta_v2(*, vkp: UnitDecimal, flug_zu_innerem_planet: bool, zentralgestirn: Planet, vp: UnitDecimal, start_planet: Planet, ziel_planet: Planet, epsilon: Decimal) -> Decimal:
-    if flug_zu_innerem_planet:
-        return delta_v2(zentralgestirn=zentralgestirn, v_start=vp, start_planet=start_planet, ziel_planet=ziel_planet, epsilon=epsilon)
-    else:
-        return (vp - vkp).copy_abs()
+    return select(
+        flug_zu_innerem_planet,
+        lambda: delta_v2(zentralgestirn=zentralgestirn, v_start=vp, start_planet=start_planet, ziel_planet=ziel_planet, epsilon=epsilon),
+        lambda: absolute(vp - vkp)
+    )
 
 
+@formula_cost(4 * COST_FLOAT_FUNCTION)
 @return_unit('km/s')
 def delta_va_or_delta_v2(*, vka: UnitDecimal, flug_zu_innerem_planet: bool, zentralgestirn: Planet, va: UnitDecimal, start_planet: Planet, ziel_planet: Planet, epsilon: Decimal) -> Decimal:
-    if flug_zu_innerem_planet:
-        return (va - vka).copy_abs()
-    else:
-        return delta_v2(zentralgestirn=zentralgestirn, v_start=va, start_planet=start_planet, ziel_planet=ziel_planet, epsilon=epsilon)
+    return select(
+        flug_zu_innerem_planet,
+        lambda: absolute(va - vka),
+        lambda: delta_v2(zentralgestirn=zentralgestirn, v_start=va, start_planet=start_planet, ziel_planet=ziel_planet, epsilon=epsilon)
+    )
 
 
+@formula_cost(COST_FLOAT_FUNCTION)
 @return_unit("km/s")
 def vkp(*, flug_zu_innerem_planet: bool, zentralgestirn: Planet, planet_p: Planet, rp: UnitDecimal) -> Decimal:
-    if flug_zu_innerem_planet:
-        return vk(zentralgestirn=zentralgestirn, radius=planet_p.a)
-    else:
-        return vk(zentralgestirn=zentralgestirn, radius=rp)
+    return select(
+        flug_zu_innerem_planet,
+        lambda: vk(zentralgestirn=zentralgestirn, radius=planet_p.a),
+        lambda: vk(zentralgestirn=zentralgestirn, radius=rp)
+    )
 
 
+@formula_cost(COST_FLOAT_FUNCTION)
 @return_unit("km/s")
 def vka(*, flug_zu_innerem_planet: bool, zentralgestirn: Planet, planet_a: Planet, ra: UnitDecimal) -> Decimal:
-    if flug_zu_innerem_planet:
-        return vk(zentralgestirn=zentralgestirn, radius=ra)
-    else:
-        return vk(zentralgestirn=zentralgestirn, radius=planet_a.a)
+    return select(
+        flug_zu_innerem_planet,
+        lambda: vk(zentralgestirn=zentralgestirn, radius=ra),
+        lambda: vk(zentralgestirn=zentralgestirn, radius=planet_a.a)
+    )
+
+
+@return_unit("km/s")
+def delta_v_start(*, delta_vp: UnitDecimal, delta_va: UnitDecimal, flug_zu_innerem_planet: bool) -> Decimal:
+    """Geschwindigkeitsdelta beim Startplaneten: im Apozentrum beim Flug nach innen, sonst im Perizentrum."""
+    return select(flug_zu_innerem_planet, lambda: delta_va, lambda: delta_vp)
+
+
+@return_unit("km/s")
+def delta_v_ziel(*, delta_vp: UnitDecimal, delta_va: UnitDecimal, flug_zu_innerem_planet: bool) -> Decimal:
+    """Geschwindigkeitsdelta beim Zielplaneten: im Perizentrum beim Flug nach innen, sonst im Apozentrum."""
+    return select(flug_zu_innerem_planet, lambda: delta_vp, lambda: delta_va)
+
+
+@return_unit("km/s")
+def v_total(*, delta_vp: UnitDecimal, delta_va: UnitDecimal) -> Decimal:
+    """Insgesamt benötigter Geschwindigkeitsimpuls aus den Beträgen der beiden Schubimpulse."""
+    return absolute(delta_vp) + absolute(delta_va)
 
 
 class TransferEllipse(Ellipse):
@@ -222,16 +241,16 @@ class TransferEllipse(Ellipse):
 
     param_funcs: dict = merge_param_funcs({
         "start_planet": [lambda planet_p, planet_a, flug_zu_innerem_planet:
-                         planet_a if flug_zu_innerem_planet else planet_p],
+                         select(flug_zu_innerem_planet, lambda: planet_a, lambda: planet_p)],
         "ziel_planet": [lambda planet_p, planet_a, flug_zu_innerem_planet:
-                        planet_p if flug_zu_innerem_planet else planet_a],
+                        select(flug_zu_innerem_planet, lambda: planet_p, lambda: planet_a)],
         "vkp": [vkp],
         "vka": [vka],
         "delta_vp": [delta_vp_or_delta_v2],
         "delta_va": [delta_va_or_delta_v2],
-        "delta_v1": [lambda delta_vp, delta_va, flug_zu_innerem_planet: delta_va if flug_zu_innerem_planet else delta_vp],
-        "delta_v2": [lambda delta_vp, delta_va, flug_zu_innerem_planet: delta_vp if flug_zu_innerem_planet else delta_va],
-        "v_total": [lambda delta_vp, delta_va: UnitDecimal(delta_vp.copy_abs() + delta_va.copy_abs(), "km/s")],
+        "delta_v1": [delta_v_start],
+        "delta_v2": [delta_v_ziel],
+        "v_total": [v_total],
         "phi_ankunft": [phi_ankunft],
         "transfer_dauer": [transfer_dauer],
         "psi": [psi],
@@ -243,15 +262,15 @@ class TransferEllipse(Ellipse):
         ],
         "ra": [
             lambda planet_a, flug_zu_innerem_planet:
-                planet_a.a if flug_zu_innerem_planet else None
+                planet_a.a if all_true(flug_zu_innerem_planet) else None
         ],
         "planet_p": [
             lambda start_planet, ziel_planet, flug_zu_innerem_planet:
-                ziel_planet if flug_zu_innerem_planet else start_planet
+                select(flug_zu_innerem_planet, lambda: ziel_planet, lambda: start_planet)
         ],
         "planet_a": [
             lambda start_planet, ziel_planet, flug_zu_innerem_planet:
-                start_planet if flug_zu_innerem_planet else ziel_planet
+                select(flug_zu_innerem_planet, lambda: start_planet, lambda: ziel_planet)
         ],
         "flug_zu_innerem_planet": [lambda start_planet, ziel_planet: ziel_planet.a < start_planet.a]
     }, Ellipse.param_funcs)
@@ -259,11 +278,53 @@ class TransferEllipse(Ellipse):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
-        if hasattr(self, 'ra') and hasattr(self, 'rp') and self.ra < self.rp:
+        # vars() statt hasattr(), damit im lazy-Modus ra und rp nicht für die Prüfung berechnet werden
+        if 'ra' in vars(self) and 'rp' in vars(self) and self.ra < self.rp:
             raise Exception('Apozentrum muss größer sein als Perizentrum.')
 
+    def bahnpunkte_nach_start(self, t) -> 'kepler.Bahnpunkte':
+        """Wie `Ellipse.bahnpunkte()`, aber mit der Zeit seit dem Start beim Startplaneten. Beim Flug zu einem
+        inneren Planeten beginnt der Transfer im Apozentrum, also einen halben Umlauf nach dem Perizentrum. Benötigt
+        NumPy.
+
+        Args:
+            t: Zeit seit dem Start in Sekunden als float-Array oder als Array von Dauern.
+
+        Returns:
+            kepler.Bahnpunkte: Die Zustände zu den Zeitpunkten, `t` weiterhin seit dem Perizentrumsdurchgang.
+        """
+        import numpy as np
+        t = np.asarray(t)
+        if t.dtype == object or np.issubdtype(t.dtype, np.timedelta64):
+            t = np.asarray(t, dtype='timedelta64[us]') / np.timedelta64(1, 's')
+        if self.flug_zu_innerem_planet:
+            t = t + total_seconds(self.umlaufzeit) / 2
+        return self.bahnpunkte(t)
+
+    def _startfenster(self) -> Tuple[datetime, timedelta]:
+        """Erster Startzeitpunkt nach dem Referenzdatum und Abstand der Startzeitpunkte.
+
+        Die synodische Periode ist negativ, wenn der Startplanet langsamer umläuft als der Zielplanet. Die
+        Startzeitpunkte wiederholen sich trotzdem im Abstand ihres Betrags, daher zählt der Index immer vorwärts.
+        """
+        erster_startzeitpunkt = self.start_planet.L0_DATETIME + jahre_zu_timedelta(self.delta_t)
+        return erster_startzeitpunkt, jahre_zu_timedelta(abs(self.synodische_periode))
+
     def startzeitpunkt_nach_index(self, n: int) -> datetime:
-        """Berechnet den n-te Startzeitpunkt der nach dem Referenzdatum.
+        """Berechnet den n-ten Startzeitpunkt nach dem Referenzdatum.
+
+        Die Startzeitpunkte liegen im Abstand des Betrags der synodischen Periode, siehe `_startfenster()`. Ist sie
+        negativ, etwa von der Erde zur Venus, liegt der Startzeitpunkt n + 1 also trotzdem nach dem Startzeitpunkt n.
+
+        >>> from decimal import getcontext
+        >>> getcontext().prec = 128
+        >>> from bahnen.hohmann import HohmannTransfer
+        >>> from lib.planet import SONNE, VENUS
+        >>> hohmann = HohmannTransfer(zentralgestirn=SONNE, start_planet=ERDE, ziel_planet=VENUS)
+        >>> hohmann.synodische_periode < 0
+        True
+        >>> [hohmann.startzeitpunkt_nach_index(n).date() for n in range(3)]
+        [datetime.date(1920, 11, 12), datetime.date(1922, 6, 19), datetime.date(1924, 1, 24)]
 
         Args:
             n (int): Index der Konstellation.
@@ -271,9 +332,32 @@ class TransferEllipse(Ellipse):
         Returns:
             datetime: Zeitpunkt der Konstellation.
         """
-        erster_startzeitpunkt = self.start_planet.L0_DATETIME + \
-            jahre_zu_timedelta(self.delta_t)
-        return erster_startzeitpunkt + n * jahre_zu_timedelta(self.synodische_periode)
+        erster_startzeitpunkt, periode = self._startfenster()
+        return erster_startzeitpunkt + n * periode
+
+    def startzeitpunkt_index(self, datum: datetime) -> int:
+        """Berechnet den Index des ersten Startzeitpunkts nach dem gegebenen Datum, ohne die Startzeitpunkte
+        abzulaufen.
+
+        >>> from decimal import getcontext
+        >>> getcontext().prec = 128
+        >>> from bahnen.hohmann import HohmannTransfer
+        >>> from lib.planet import SONNE, MARS
+        >>> hohmann = HohmannTransfer(zentralgestirn=SONNE, start_planet=ERDE, ziel_planet=MARS)
+        >>> hohmann.startzeitpunkt_index(datetime(2030, 1, 1))
+        3
+        >>> hohmann.startzeitpunkt_nach_index(2) <= datetime(2030, 1, 1) < hohmann.startzeitpunkt_nach_index(3)
+        True
+
+        Args:
+            datum (datetime): Das Datum.
+
+        Returns:
+            int: Kleinstes n mit `startzeitpunkt_nach_index(n) > datum`.
+        """
+        erster_startzeitpunkt, periode = self._startfenster()
+        # timedelta // timedelta rechnet exakt in Mikrosekunden und rundet ab, auch für Daten vor dem Referenzdatum
+        return (datum - erster_startzeitpunkt) // periode + 1
 
     def startzeitpunkt_um_datum(self, datum: datetime) -> tuple:
         """Berechnet den am nächsten liegenden Startzeitpunkt zum gegebenen Datum.
@@ -284,15 +368,59 @@ class TransferEllipse(Ellipse):
         Returns:
             tuple: Tupel bestehend aus datetimes: (Startzeitpunkt früher oder am gleichen Tag, Startzeitpunkt später)
         """
-        n_kleinste_obere_schranke: int = 0
-        schritt: int = 1
+        n_kleinste_obere_schranke = self.startzeitpunkt_index(datum)
+        return (self.startzeitpunkt_nach_index(n_kleinste_obere_schranke - 1),
+                self.startzeitpunkt_nach_index(n_kleinste_obere_schranke))
 
-        # Wenn datum kleiner als Referenzdatum, dann müssen wir rückwärts gehen
-        if self.startzeitpunkt_nach_index(0) > datum:
-            schritt = -1
+    def startzeitpunkte(self, von: datetime, bis: datetime) -> Iterator[datetime]:
+        """Liefert nacheinander alle Startzeitpunkte im Intervall `[von, bis)`.
 
-        while not self.startzeitpunkt_nach_index(n_kleinste_obere_schranke) > datum >= self.startzeitpunkt_nach_index(n_kleinste_obere_schranke - 1):
-            n_kleinste_obere_schranke += schritt
+        >>> from decimal import getcontext
+        >>> getcontext().prec = 128
+        >>> from bahnen.hohmann import HohmannTransfer
+        >>> from lib.planet import SONNE, VENUS
+        >>> hohmann = HohmannTransfer(zentralgestirn=SONNE, start_planet=ERDE, ziel_planet=VENUS)
+        >>> [startzeitpunkt.date() for startzeitpunkt in hohmann.startzeitpunkte(datetime(2030, 1, 1), datetime(2035, 1, 1))]
+        [datetime.date(2031, 3, 7), datetime.date(2032, 10, 11), datetime.date(2034, 5, 18)]
 
-        return (self.startzeitpunkt_nach_index(n_kleinste_obere_schranke - 1),
-                self.startzeitpunkt_nach_index(n_kleinste_obere_schranke))
+        Args:
+            von (datetime): Beginn des Intervalls.
+            bis (datetime): Ende des Intervalls, ausschließlich.
+
+        Returns:
+            Iterator[datetime]: Die Startzeitpunkte in aufsteigender Reihenfolge.
+        """
+        n = self.startzeitpunkt_index(von - timedelta.resolution)
+        startzeitpunkt = self.startzeitpunkt_nach_index(n)
+        while startzeitpunkt < bis:
+            yield startzeitpunkt
+            n += 1
+            startzeitpunkt = self.startzeitpunkt_nach_index(n)
+
+    def startzeitpunkte_um_daten(self, daten) -> Tuple['np.ndarray', 'np.ndarray']:
+        """Wie `startzeitpunkt_um_datum()`, aber für ein ganzes Array von Daten auf einmal. Benötigt NumPy.
+
+        >>> from decimal import getcontext
+        >>> getcontext().prec = 128
+        >>> from bahnen.hohmann import HohmannTransfer
+        >>> from lib.planet import SONNE, MARS
+        >>> hohmann = HohmannTransfer(zentralgestirn=SONNE, start_planet=ERDE, ziel_planet=MARS)
+        >>> import numpy as np
+        >>> frueher, spaeter = hohmann.startzeitpunkte_um_daten(np.array(['1950-01-01', '2030-01-01'], dtype='datetime64'))
+        >>> spaeter[1].item() == hohmann.startzeitpunkt_um_datum(datetime(2030, 1, 1))[1]
+        True
+
+        Args:
+            daten: Daten als `datetime64`-Array oder als Liste von `datetime`, beliebige Form.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Für jedes Datum der Startzeitpunkt früher oder zur gleichen Zeit und der
+            Startzeitpunkt später als `datetime64[us]`-Arrays.
+        """
+        import numpy as np
+        erster_startzeitpunkt, periode = self._startfenster()
+        erster_startzeitpunkt = np.datetime64(erster_startzeitpunkt, 'us')
+        periode = np.timedelta64(periode, 'us')
+        n = (np.asarray(daten, dtype='datetime64[us]') - erster_startzeitpunkt) // periode
+        frueher = erster_startzeitpunkt + n * periode
+        return frueher, frueher + periode
@@ -2,7 +2,8 @@ import dataclasses
 import json
 from typing import Dict
 from decimal import Decimal
-from lib import kreis, hyperbel
+from lib import kreis, hyperbel, tracing
+from lib.memo import formula_cache
 from lib.planet import *
 from lib.unit_decimal import UnitDecimal
 from dataclasses import dataclass
@@ -47,38 +48,38 @@ def fluchthyperbel(planet: Planet, vinf: Decimal, hp: Decimal) -> Fluchthyperbel
     vinf = UnitDecimal(vinf, 'km/s')
     hp = UnitDecimal(hp, 'km')
 
-    print('Fluchthyperbel 🚀')
-    print(f'{planet=}')
-    print(f'Hyperbolische Exzessgeschwindigkeit; Geschwindigkeit im Unendlichen {vinf=}')
-    print(f'Höhe über Perizentrum {hp=}')
+    tracing.message('Fluchthyperbel 🚀')
+    tracing.message(f'{planet=}')
+    tracing.message(f'Hyperbolische Exzessgeschwindigkeit; Geschwindigkeit im Unendlichen {vinf=}')
+    tracing.message(f'Höhe über Perizentrum {hp=}')
     rp = hp + planet.R
-    print(f'Radius Perizentrum (Höhe Perizentrum + Radius Planet) {rp=}')
-    print()
+    tracing.message(f'Radius Perizentrum (Höhe Perizentrum + Radius Planet) {rp=}')
+    tracing.message('')
 
-    a = hyperbel.grosse_halbachse_planet_vinf(planet=planet, vinf=vinf)
-    print(f'Große Halbachse {a=}')
-    ra = hyperbel.apozentrum_radius_a_rp(a=a, rp=rp)
-    print(f'Radius Apozentrum {ra=}')
-    epsilon = hyperbel.numerische_exzentrizitaet(a=a, ra=ra)
-    print(f'Numerische Exzentrizität {epsilon=}')
-    e = hyperbel.lineare_exzentrizitaet(a=a, rp=rp)
-    print(f'Lineare Exzentrizität {e=}')
-    b = hyperbel.kleine_halbachse(a=a, e=e)
-    print(f'Kleine Halbachse {b=}')
-    p = hyperbel.bahnparameter_p(a=a, epsilon=epsilon)
-    print(f'Bahnparameter {p=}')
-    grosses_epsilon = hyperbel.umlenkwinkel(epsilon=epsilon)
-    print(f'Umlenkwinkel {grosses_epsilon}')
-    psi_inf = hyperbel.unendlichkeitsanomalie(epsilon=epsilon)
-    print(f'Unendlichkeitsanomalie {psi_inf=}')
-    vk = kreis.geschwindigkeit(planet=planet, rk=rp)
-    print()
+    a = formula_cache.call(hyperbel.grosse_halbachse_planet_vinf, planet=planet, vinf=vinf)
+    tracing.message(f'Große Halbachse {a=}')
+    ra = formula_cache.call(hyperbel.apozentrum_radius_a_rp, a=a, rp=rp)
+    tracing.message(f'Radius Apozentrum {ra=}')
+    epsilon = formula_cache.call(hyperbel.numerische_exzentrizitaet, a=a, ra=ra)
+    tracing.message(f'Numerische Exzentrizität {epsilon=}')
+    e = formula_cache.call(hyperbel.lineare_exzentrizitaet, a=a, rp=rp)
+    tracing.message(f'Lineare Exzentrizität {e=}')
+    b = formula_cache.call(hyperbel.kleine_halbachse, a=a, e=e)
+    tracing.message(f'Kleine Halbachse {b=}')
+    p = formula_cache.call(hyperbel.bahnparameter_p, a=a, epsilon=epsilon)
+    tracing.message(f'Bahnparameter {p=}')
+    grosses_epsilon = formula_cache.call(hyperbel.umlenkwinkel, epsilon=epsilon)
+    tracing.message(f'Umlenkwinkel {grosses_epsilon}')
+    psi_inf = formula_cache.call(hyperbel.unendlichkeitsanomalie, epsilon=epsilon)
+    tracing.message(f'Unendlichkeitsanomalie {psi_inf=}')
+    vk = formula_cache.call(kreis.geschwindigkeit, planet=planet, rk=rp)
+    tracing.message('')
 
-    print(f'Bereits vorhandene Kreisbahngeschwindigkeit bei Perizentrum mit Radius {rp}: {vk=}')
-    vp = hyperbel.perizentrum_geschwindigkeit(vk=vk, vinf=vinf)
-    print(f'Benötigte Perizentrumsgeschwindigkeit {vp=}')
+    tracing.message(f'Bereits vorhandene Kreisbahngeschwindigkeit bei Perizentrum mit Radius {rp}: {vk=}')
+    vp = formula_cache.call(hyperbel.perizentrum_geschwindigkeit, vk=vk, vinf=vinf)
+    tracing.message(f'Benötigte Perizentrumsgeschwindigkeit {vp=}')
     v_total = UnitDecimal(vp - vk, 'km/s')
-    print(f'Benötigter Gesamtschubimpuls {v_total=}')
+    tracing.message(f'Benötigter Gesamtschubimpuls {v_total=}')
 
     return Fluchthyperbel(
         vinf=vinf, hp=hp, a=a, rp=rp, epsilon=epsilon, p=p, umlenkwinkel_gross_phi=grosses_epsilon, phi_inf=psi_inf,
@@ -87,6 +88,7 @@ def fluchthyperbel(planet: Planet, vinf: Decimal, hp: Decimal) -> Fluchthyperbel
 
 
 def main():
+    tracing.set_sink(tracing.PrintSink())
     print('Fluchthyperbel 🚀 - Eingabe der Parameter')
     planet = planet_from_name(input('Planet: '))
     vinf = Decimal(input('Geschwindigkeit im Unendlichen vinf (in km/s): '))
@@ -4,7 +4,9 @@ from decimal import Decimal
 from typing import Any
 
 from lib import konstanten
+from lib.numerik import cos, sin, math_sqrt, round_to
 from lib.planet import *
+from lib.solvable import formula_cost, ERROR_ROUNDED
 from lib.unit_decimal import return_unit, UnitDecimal
 
 
@@ -42,7 +44,7 @@ def bahngleichung(*, p: Decimal, epsilon: Decimal, phi: Decimal) -> Decimal:
     :param phi: Wahre Anomalie in Radiant.
     :return: Radius r in km.
     """
-    return p / (1 + epsilon * Decimal(math.cos(phi)))
+    return p / (1 + epsilon * cos(phi))
 
 
 @return_unit('km')
@@ -85,7 +87,7 @@ def vis_viva_r_epsilon_p(*, planet: Planet, r: Decimal, epsilon: Decimal, p: Dec
     :param p: Bahnparameter p in km.
     :return: Geschwindigkeit des Satelliten in km/s.
     """
-    return Decimal(math.sqrt(planet.mu * ((2 / r) + ((epsilon ** 2 - 1) / p))))
+    return math_sqrt(planet.mu * ((2 / r) + ((epsilon ** 2 - 1) / p)))
 
 
 @return_unit('km/s')
@@ -98,9 +100,10 @@ def vis_viva_r_a(*, planet: Planet, r: Decimal, a: Decimal) -> Decimal:
     :param a: Große Halbachse in km.
     :return: Geschwindigkeit des Satelliten in km/s.
     """
-    return Decimal(math.sqrt(planet.mu * ((2 / r) - (1 / a))))
+    return math_sqrt(planet.mu * ((2 / r) - (1 / a)))
 
 
+@formula_cost(error=ERROR_ROUNDED)
 def numerische_exzentrizitaet_ra_rp(*, rp: Decimal, ra: Decimal) -> int:
     """
     Berechnet die numerische Exzentrizität epsilon.
@@ -109,9 +112,10 @@ def numerische_exzentrizitaet_ra_rp(*, rp: Decimal, ra: Decimal) -> int:
     :param rp: Radius des Perizentrums in km, also der Ort mit minimaler Entfernung zum Planten.
     :return: Numerische Exzentrizität.
     """
-    return round((ra - rp) / (ra + rp), konstanten.EPSILON_PRECISION)
+    return round_to((ra - rp) / (ra + rp), konstanten.EPSILON_PRECISION)
 
 
+@formula_cost(error=ERROR_ROUNDED)
 def numerische_exzentrizitaet_e_a(*, e: Decimal, a: Decimal) -> Decimal:
     """
     Berechnet die numerische Exzentrizität epsilon.
@@ -120,9 +124,10 @@ def numerische_exzentrizitaet_e_a(*, e: Decimal, a: Decimal) -> Decimal:
     :param a: Große Halbachse in km.
     :return: Numerische Exzentrizität.
     """
-    return round(e / a, konstanten.EPSILON_PRECISION)
+    return round_to(e / a, konstanten.EPSILON_PRECISION)
 
 
+@formula_cost(error=ERROR_ROUNDED)
 def numerische_exzentrizitaet_epsilon_a(*, epsilon: Decimal, a: Decimal) -> Decimal:
     """
     Berechnet die numerische Exzentrizität epsilon.
@@ -131,7 +136,7 @@ def numerische_exzentrizitaet_epsilon_a(*, epsilon: Decimal, a: Decimal) -> Deci
     :param a: Große Halbachse in km.
     :return: Numerische Exzentrizität.
     """
-    return round((a * (1 + epsilon) - a * (1 - epsilon)) / (2 * a), konstanten.EPSILON_PRECISION)
+    return round_to((a * (1 + epsilon) - a * (1 - epsilon)) / (2 * a), konstanten.EPSILON_PRECISION)
 
 
 @return_unit('km')
@@ -158,4 +163,4 @@ def inklinationsaenderung(*, v: Decimal, delta_i: Decimal) -> Decimal:
     Returns:
         Decimal: Das notwendige delta_v für die Bahnebenendrehung.
     """
-    return 2 * v * Decimal(math.sin(grad_zu_rad(delta_i) / 2))
+    return 2 * v * sin(grad_zu_rad(delta_i) / 2)
@@ -0,0 +1,355 @@
+"""Erzeugt aus einer `Solvable`-Klasse und einer Menge gegebener Parameter ein Python-Modul mit einer Funktion, die den
+Lösungsplan als gerade Folge von Formelaufrufen ausführt.
+
+Für häufig verwendete Eingaben wie `HohmannTransfer(zentralgestirn, start_planet, ziel_planet)` entfällt so der
+Aufwand des Solvers für Plan-Cache, Worklist und das Setzen der Attribute. Die Formeln selbst werden nicht kopiert,
+sondern über `formula_index` der Klasse referenziert, sodass Änderungen an einem Funktionsrumpf ohne neues Erzeugen
+wirksam werden. Die Module werden auf der Festplatte gespeichert und neu erzeugt, sobald sich `param_funcs`
+der Klasse ändert, siehe `fingerprint()`.
+"""
+import hashlib
+import importlib.util
+import os
+import tempfile
+import threading
+from typing import Callable, Dict, FrozenSet, Iterable, Optional, Tuple, Type
+
+from lib import numerik
+from lib.solvable import Solvable
+from lib.unit_decimal import unit_of, with_unit
+
+
+GENERATOR_VERSION = 2
+"""Wird erhöht, wenn sich der erzeugte Code ändert, damit alte Module auf der Festplatte neu erzeugt werden."""
+
+_loaded: Dict[Tuple[type, FrozenSet[str], Optional[FrozenSet[str]], str], Callable] = {}
+"""Bereits geladene Funktionen nach Klasse, gegebenen und gesuchten Parametern und Verzeichnis."""
+_lock = threading.Lock()
+
+
+def default_cache_dir() -> str:
+    """Verzeichnis für die erzeugten Module: `$RFT_SOLVER_CACHE` oder `rft/solvers` im Cache-Verzeichnis des
+    Benutzers."""
+    directory = os.environ.get('RFT_SOLVER_CACHE')
+    if directory:
+        return directory
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'rft', 'solvers')
+
+
+def _given_with_defaults(solvable_class: Type[Solvable], given: Iterable[str]) -> FrozenSet[str]:
+    return frozenset(given) | frozenset(solvable_class.default_params.keys())
+
+
+def fingerprint(
+        solvable_class: Type[Solvable], given: Iterable[str], targets: Optional[Iterable[str]] = None
+) -> str:
+    """Prüfsumme über alles, wovon der erzeugte Code abhängt: Name, Argumente, Kosten und Einheit jeder Formel in
+    `param_funcs`, die Standardparameter und die gegebenen und gesuchten Parameter.
+
+    >>> from bahnen.hohmann import HohmannTransfer
+    >>> given = ['zentralgestirn', 'start_planet', 'ziel_planet']
+    >>> fingerprint(HohmannTransfer, given) == fingerprint(HohmannTransfer, reversed(given))
+    True
+    >>> fingerprint(HohmannTransfer, given) == fingerprint(HohmannTransfer, given, targets=['v_total'])
+    False
+
+    Args:
+        solvable_class (Type[Solvable]): Die Klasse.
+        given (Iterable[str]): Namen der gegebenen Parameter.
+        targets (Optional[Iterable[str]]): Namen der gesuchten Parameter oder None für alle.
+
+    Returns:
+        str: Hexadezimale SHA-256-Prüfsumme.
+    """
+    formulas = [
+        (
+            formula.param, formula.func.__module__, formula.func.__qualname__, formula.args, formula.keyword_only,
+            formula.cost, formula.error, getattr(formula.func, 'unit', None)
+        )
+        for formula in solvable_class._formulas
+    ]
+    description = repr((
+        GENERATOR_VERSION, solvable_class.__module__, solvable_class.__qualname__, formulas,
+        sorted(solvable_class.default_params.keys()), sorted(_given_with_defaults(solvable_class, given)),
+        None if targets is None else sorted(targets)
+    ))
+    return hashlib.sha256(description.encode('utf-8')).hexdigest()
+
+
+def generate_source(
+        solvable_class: Type[Solvable], given: Iterable[str], targets: Optional[Iterable[str]] = None
+) -> str:
+    """Erzeugt den Quelltext eines Moduls mit der Funktion `solve(**given) -> dict`.
+
+    Die Funktion ruft die Formeln des Lösungsplans in Abhängigkeitsreihenfolge mit Decimal auf und liefert die
+    gegebenen und berechneten Parameter wie `Solvable.to_dict()`. Wie beim Abspielen eines Plans im Solver wird der
+    erste Fall mit bestimmten Einheiten der gegebenen Parameter von der Klasse selbst mit Einheitenprüfung gelöst,
+    alle weiteren rechnen mit reinen Zahlen und erhalten erst am Ende ihre Einheiten. Liefert eine Formel zur Laufzeit
+    None, wird der Fall ebenfalls mit der Klasse gelöst, damit auch die alternativen Formeln versucht werden. Die
+    Funktion zeichnet keine Schritte für `lib.tracing` auf. Gegebene Werte in anderen Einheiten wie m werden wie in
+    `Solvable` zuerst in die Einheiten aus `param_units` umgerechnet.
+
+    >>> from bahnen.hohmann import HohmannTransfer
+    >>> source = generate_source(HohmannTransfer, ['zentralgestirn', 'start_planet', 'ziel_planet'])
+    >>> 'def solve(*, phi_ankunft=_defaults[\\'phi_ankunft\\'], start_planet, zentralgestirn, ziel_planet):' in source
+    True
+
+    Args:
+        solvable_class (Type[Solvable]): Die Klasse.
+        given (Iterable[str]): Namen der gegebenen Parameter. Standardparameter der Klasse werden ergänzt.
+        targets (Optional[Iterable[str]]): Namen der gesuchten Parameter oder None für alle.
+
+    Returns:
+        str: Der Quelltext.
+    """
+    given = _given_with_defaults(solvable_class, given)
+    plan = solvable_class.solve_plan(given, targets)
+    given_order = sorted(given)
+    given_args = ', '.join(given_order)
+
+    lines = [
+        f'"""Erzeugt von lib.codegen aus {solvable_class.__module__}.{solvable_class.__qualname__}. Nicht bearbeiten."""',
+        'from lib import codegen as _codegen, numerik as _numerik',
+        'from lib.unit_decimal import convert_unit as _convert_unit, unit_of as _unit_of, '
+        'units_detached as _units_detached, without_unit as _without_unit',
+        f'from {solvable_class.__module__} import {solvable_class.__qualname__} as _solvable',
+        '',
+        f'FINGERPRINT = {fingerprint(solvable_class, given, targets)!r}',
+        f'GIVEN = {tuple(given_order)!r}',
+        f'TARGETS = {None if targets is None else tuple(sorted(targets))!r}',
+        '',
+        '_formulas = _solvable.formula_index',
+        '_defaults = _solvable.default_params',
+        '_param_units = _solvable.param_units',
+        '_units = {}',
+    ]
+    names = {}
+    for formula in plan:
+        index = solvable_class.formula_index[formula.param].index(formula)
+        names[formula] = f'_f_{formula.param}_{index}'
+        lines.append(f'{names[formula]} = _formulas[{formula.param!r}][{index}].raw_func')
+
+    lines += ['', '', f'def _evaluate({given_args}):']
+    for formula in plan:
+        call_kwargs = ', '.join(f'{arg}={arg}' for arg in formula.args)
+        lines += [
+            f'    {formula.param} = {names[formula]}({call_kwargs})',
+            f'    if {formula.param} is None:',
+            '        return None',
+        ]
+    # Reihenfolge wie bei Solvable.to_dict(): gegebene Parameter in der Reihenfolge von param_funcs, dann der Plan
+    result = [param for param in solvable_class.param_funcs.keys() if param in given]
+    result += [formula.param for formula in plan]
+    lines.append('    return {' + ', '.join(f'{param!r}: {param}' for param in result) + '}')
+
+    arguments = [
+        f'{param}=_defaults[{param!r}]' if param in solvable_class.default_params else param
+        for param in given_order
+    ]
+    lines += [
+        '',
+        '',
+        f'def solve(*, {", ".join(arguments)}):',
+    ]
+    # Wie Solvable._set_given(): gegebene Werte mit Einheit in die Einheit aus param_units umrechnen
+    for param in given_order:
+        if param in solvable_class.param_units:
+            lines += [
+                f'    if _unit_of({param}) is not None:',
+                f'        {param} = _convert_unit({param}, _param_units[{param!r}])',
+            ]
+    lines += [
+        f'    given = ({given_args},)',
+        '    signature = tuple(map(_unit_of, given))',
+        '    units = _units.get(signature)',
+        '    with _numerik.numeric_mode(_numerik.DECIMAL):',
+        '        if units is not None:',
+        '            raw = tuple(map(_without_unit, given))',
+        '            with _units_detached():',
+        '                values = _evaluate(*raw)',
+        '            if values is not None:',
+        '                return _codegen.attach_units(values, GIVEN, given, raw, units)',
+        '        return _codegen.solve_checked(_solvable, GIVEN, given, _units, signature)',
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def solve_checked(
+        solvable_class: Type[Solvable], names: Tuple[str, ...], given: tuple, units: dict, signature: tuple
+) -> dict:
+    """Löst einen Fall für eine erzeugte Funktion mit der Klasse selbst, also mit Einheitenprüfung, und merkt sich die
+    Einheiten der Ergebnisse für die folgenden Aufrufe ohne Einheiten.
+
+    Args:
+        solvable_class (Type[Solvable]): Die Klasse.
+        names (Tuple[str, ...]): Namen der gegebenen Parameter.
+        given (tuple): Die gegebenen Parameter in der Reihenfolge von `names`.
+        units (dict): Einheiten der Ergebnisse der erzeugten Funktion nach den Einheiten der gegebenen Parameter.
+        signature (tuple): Einheiten der gegebenen Parameter.
+
+    Returns:
+        dict: Alle Parameter wie `Solvable.to_dict()`.
+    """
+    solvable = solvable_class(mode=numerik.DECIMAL, **dict(zip(names, given)))
+    result = solvable.to_dict()
+    # Nur ein vollständig abgespielter Plan legt die Einheiten für die gerade Folge von Aufrufen fest
+    if all(param in solvable._given or param in solvable._sources for param in result):
+        units[signature] = {param: unit_of(value) for param, value in result.items()}
+    return result
+
+
+def attach_units(values: dict, names: Tuple[str, ...], given: tuple, raw: tuple, units: dict) -> dict:
+    """Hängt an die ohne Einheiten berechneten Werte einer erzeugten Funktion ihre Einheiten an.
+
+    Gegebene Parameter und unverändert weitergereichte gegebene Werte wie Planeten werden wieder zum Original.
+
+    Args:
+        values (dict): Die berechneten Werte nach Parameter.
+        names (Tuple[str, ...]): Namen der gegebenen Parameter.
+        given (tuple): Die gegebenen Parameter in der Reihenfolge von `names`.
+        raw (tuple): Die gegebenen Parameter ohne Einheiten.
+        units (dict): Einheit jedes Parameters oder None für Werte ohne Einheit.
+
+    Returns:
+        dict: Die Werte mit Einheiten.
+    """
+    originals = {id(value): original for value, original in zip(raw, given) if value is not original}
+    given_by_name = dict(zip(names, given))
+    result = {}
+    for param, value in values.items():
+        unit = units.get(param)
+        if param in given_by_name:
+            result[param] = given_by_name[param]
+        elif unit is None:
+            result[param] = originals.get(id(value), value)
+        else:
+            result[param] = with_unit(value, unit)
+    return result
+
+
+def _module_path(
+        solvable_class: Type[Solvable], given: FrozenSet[str], targets: Optional[FrozenSet[str]], cache_dir: str
+) -> str:
+    shape = repr((sorted(given), None if targets is None else sorted(targets)))
+    digest = hashlib.sha256(shape.encode('utf-8')).hexdigest()[:16]
+    module_name = solvable_class.__module__.replace('.', '_')
+    return os.path.join(cache_dir, f'{module_name}_{solvable_class.__qualname__}_{digest}.py')
+
+
+def _import_file(path: str):
+    name = 'rft_solver_' + os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _write_atomic(path: str, source: str):
+    """Schreibt erst in eine temporäre Datei und ersetzt dann, damit parallele Prozesse nie ein halbes Modul lesen."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    handle, temporary = tempfile.mkstemp(suffix='.py', dir=os.path.dirname(path))
+    try:
+        with os.fdopen(handle, 'w', encoding='utf-8') as file:
+            file.write(source)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def load_solver(
+        solvable_class: Type[Solvable], given: Iterable[str], targets: Optional[Iterable[str]] = None,
+        cache_dir: Optional[str] = None
+) -> Callable[..., dict]:
+    """Liefert die erzeugte Funktion `solve` für die Klasse und die gegebenen Parameter.
+
+    Das Modul wird aus `cache_dir` geladen. Fehlt es oder passt sein `FINGERPRINT` nicht mehr zu `param_funcs`, wird
+    es neu erzeugt und gespeichert. Pro Prozess wird jedes Modul nur einmal geladen.
+
+    >>> import tempfile
+    >>> from bahnen.hohmann import HohmannTransfer
+    >>> from lib.planet import SONNE, ERDE, MARS
+    >>> with tempfile.TemporaryDirectory() as directory:
+    ...     solve = load_solver(HohmannTransfer, ['zentralgestirn', 'start_planet', 'ziel_planet'], cache_dir=directory)
+    ...     solve(zentralgestirn=SONNE, start_planet=ERDE, ziel_planet=MARS)['v_total']
+    5.594 km/s
+
+    Args:
+        solvable_class (Type[Solvable]): Die Klasse.
+        given (Iterable[str]): Namen der gegebenen Parameter. Standardparameter der Klasse werden ergänzt.
+        targets (Optional[Iterable[str]]): Namen der gesuchten Parameter oder None für alle.
+        cache_dir (Optional[str]): Verzeichnis der erzeugten Module. Ohne gilt `default_cache_dir()`.
+
+    Returns:
+        Callable[..., dict]: Die Funktion. Nimmt die gegebenen Parameter als Keyword-Argumente und liefert alle
+            Parameter als dict.
+    """
+    given = _given_with_defaults(solvable_class, given)
+    targets = None if targets is None else frozenset(targets)
+    cache_dir = default_cache_dir() if cache_dir is None else cache_dir
+    key = (solvable_class, given, targets, cache_dir)
+
+    solver = _loaded.get(key)
+    if solver is not None:
+        return solver
+
+    with _lock:
+        solver = _loaded.get(key)
+        if solver is None:
+            path = _module_path(solvable_class, given, targets, cache_dir)
+            expected = fingerprint(solvable_class, given, targets)
+            module = _import_file(path) if os.path.exists(path) else None
+            if module is None or getattr(module, 'FINGERPRINT', None) != expected:
+                _write_atomic(path, generate_source(solvable_class, given, targets))
+                module = _import_file(path)
+            solver = module.solve
+            _loaded[key] = solver
+    return solver
+
+
+def _same_value(a, b) -> bool:
+    if type(a) is not type(b) or unit_of(a) is not unit_of(b):
+        return False
+    # NaN ist ungleich zu sich selbst
+    return a is b or a == b or (a != a and b != b)
+
+
+def is_equivalent(solver: Callable[..., dict], solvable_class: Type[Solvable], **given) -> bool:
+    """Prüft, ob eine erzeugte Funktion für die gegebenen Parameter beim ersten und bei jedem weiteren Aufruf genau
+    dieselben Parameter mit denselben Werten, Typen und Einheiten liefert wie `Solvable.solve()`.
+
+    >>> from bahnen.transfer_ellipse import TransferEllipse
+    >>> from lib.planet import SONNE, ERDE, MARS
+    >>> from lib.unit_decimal import UnitDecimal
+    >>> given = dict(zentralgestirn=SONNE, start_planet=ERDE, ziel_planet=MARS, epsilon=UnitDecimal('0.5237', ''),
+    ...              p=MARS.a)
+    >>> namespace = {}
+    >>> exec(generate_source(TransferEllipse, given.keys()), namespace)
+    >>> is_equivalent(namespace['solve'], TransferEllipse, **given)
+    True
+    >>> from bahnen.ellipse import Ellipse
+    >>> from lib.planet import ERDE
+    >>> given = dict(zentralgestirn=ERDE, rp=UnitDecimal(7_000_000, 'm'), ra=UnitDecimal(9000, 'km'))
+    >>> exec(generate_source(Ellipse, given.keys()), namespace)
+    >>> [(result['a'], result['rp']) for result in (namespace['solve'](**given), namespace['solve'](**given))]
+    [(8000.000 km, 7000.000 km), (8000.000 km, 7000.000 km)]
+    >>> is_equivalent(namespace['solve'], Ellipse, **given)
+    True
+
+    Args:
+        solver (Callable[..., dict]): Die erzeugte Funktion, z.B. von `load_solver()`.
+        solvable_class (Type[Solvable]): Die Klasse, aus der sie erzeugt wurde.
+        **given: Die gegebenen Parameter.
+
+    Returns:
+        bool: True, wenn alle Parameter übereinstimmen.
+    """
+    expected = solvable_class(mode=numerik.DECIMAL, **given).to_dict()
+    # Der erste Aufruf löst mit Einheitenprüfung, der zweite mit reinen Zahlen
+    for generated in (solver(**given), solver(**given)):
+        if generated.keys() != expected.keys() or not all(
+                _same_value(generated[param], expected[param]) for param in expected
+        ):
+            return False
+    return True
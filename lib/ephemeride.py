@@ -0,0 +1,143 @@
+"""Vektorisierte Ephemeride der Planeten auf Kreisbahnen aus `Planet.L0`, `Planet.T` und `Planet.L0_DATETIME`.
+
+Die heliozentrische Länge eines Planeten wächst gleichmäßig mit 360° je Umlaufzeit T, ausgehend von L0 am
+Referenzzeitpunkt. `ephemeride()` wertet das für ein Array von Zeitpunkten (`datetime64`) und mehrere Planeten in einem
+Aufruf aus, statt wie `TransferEllipse` mit Decimal und `timedelta` je Zeitpunkt. Die Konstanten der Planeten werden
+dafür einmal je Planetenauswahl in float-Arrays umgewandelt und gespeichert.
+
+Ein Jahr hat wie in `lib.helper.jahre_zu_timedelta()` 365.2422 Tage. Anders als `timedelta_zu_jahre()` rechnet die
+Ephemeride mit Bruchteilen von Tagen.
+"""
+from dataclasses import dataclass
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+
+from lib.planet import Planet
+
+TAGE_PRO_JAHR = 365.2422
+"""Durchschnittliche Anzahl an Tagen pro Jahr, wie in `lib.helper`."""
+
+
+@dataclass(frozen=True)
+class PlanetenKonstanten:
+    """Die für die Ephemeride benötigten Konstanten mehrerer Planeten als float64-Arrays, ein Eintrag je Planet."""
+
+    planeten: Tuple[Planet, ...]
+    """Die Planeten in der Reihenfolge der Arrays."""
+    a: np.ndarray
+    """Bahnradius in km."""
+    L0: np.ndarray
+    """Länge am Referenzzeitpunkt in Radiant."""
+    n: np.ndarray
+    """Mittlere Winkelgeschwindigkeit in Radiant pro Tag."""
+    referenz: np.ndarray
+    """Referenzzeitpunkt von L0 als `datetime64[us]`."""
+
+
+_konstanten: Dict[Tuple[Planet, ...], PlanetenKonstanten] = {}
+"""Bereits umgewandelte Konstanten nach Planetenauswahl."""
+
+
+def planeten_konstanten(planeten: Sequence[Planet]) -> PlanetenKonstanten:
+    """Liefert die Konstanten der Planeten als float-Arrays. Das Ergebnis wird je Planetenauswahl gespeichert.
+
+    >>> from lib.planet import ERDE, MARS
+    >>> planeten_konstanten([ERDE, MARS]).n * TAGE_PRO_JAHR / (2 * np.pi)
+    array([1.        , 0.53166038])
+
+    Args:
+        planeten (Sequence[Planet]): Die Planeten.
+
+    Returns:
+        PlanetenKonstanten: Die Konstanten in der Reihenfolge der Planeten.
+    """
+    planeten = tuple(planeten)
+    konstanten = _konstanten.get(planeten)
+    if konstanten is None:
+        konstanten = PlanetenKonstanten(
+            planeten=planeten,
+            a=np.array([float(planet.a) for planet in planeten]),
+            L0=np.radians([float(planet.L0) for planet in planeten]),
+            n=np.array([2 * np.pi / (float(planet.T) * TAGE_PRO_JAHR) for planet in planeten]),
+            referenz=np.array([planet.L0_DATETIME for planet in planeten], dtype='datetime64[us]'),
+        )
+        _konstanten[planeten] = konstanten
+    return konstanten
+
+
+def _als_datetime64(epochen) -> np.ndarray:
+    epochen = np.asarray(epochen)
+    if not np.issubdtype(epochen.dtype, np.datetime64):
+        epochen = epochen.astype('datetime64[us]')
+    return epochen
+
+
+def laengen(epochen, planeten: Sequence[Planet]) -> np.ndarray:
+    """Berechnet die heliozentrischen Längen der Planeten zu den Zeitpunkten.
+
+    >>> from lib.planet import ERDE, MARS
+    >>> epochen = np.array(['1987-10-12', '1988-10-11T05:48:46'], dtype='datetime64[s]')
+    >>> np.round(np.degrees(laengen(epochen, [ERDE, MARS])), 4)
+    array([[ 20.0427, 175.7365],
+           [380.0427, 367.1342]])
+
+    Args:
+        epochen: Zeitpunkte als `datetime64`-Array oder als Liste von `datetime`, beliebige Form.
+        planeten (Sequence[Planet]): Die Planeten.
+
+    Returns:
+        np.ndarray: Längen in Radiant mit der Form `epochen.shape + (len(planeten),)`. Die Längen werden nicht auf
+        einen Umlauf reduziert, sodass sie über die Zeit stetig wachsen.
+    """
+    konstanten = planeten_konstanten(planeten)
+    epochen = _als_datetime64(epochen)[..., np.newaxis]
+    tage = (epochen - konstanten.referenz) / np.timedelta64(1, 'D')
+    return konstanten.L0 + konstanten.n * tage
+
+
+@dataclass(frozen=True)
+class Ephemeride:
+    """Längen und Positionen mehrerer Planeten zu einem Array von Zeitpunkten.
+
+    Alle Arrays haben die Form `epochen.shape + (len(planeten),)`. Positionen liegen in der gemeinsamen Bahnebene,
+    die x-Achse zeigt zur Länge 0.
+    """
+
+    epochen: np.ndarray
+    """Die Zeitpunkte als `datetime64`."""
+    planeten: Tuple[Planet, ...]
+    """Die Planeten in der Reihenfolge der letzten Achse."""
+    laenge: np.ndarray
+    """Heliozentrische Länge in Radiant, nicht auf einen Umlauf reduziert."""
+    x: np.ndarray
+    """x-Koordinate in km."""
+    y: np.ndarray
+    """y-Koordinate in km."""
+
+
+def ephemeride(epochen, planeten: Sequence[Planet]) -> Ephemeride:
+    """Berechnet Längen und Positionen der Planeten zu allen Zeitpunkten in einem Aufruf.
+
+    >>> from lib.planet import ERDE, VENUS, MARS
+    >>> epochen = np.arange('2020-01-01', '2050-01-01', dtype='datetime64[D]')
+    >>> e = ephemeride(epochen, [ERDE, VENUS, MARS])
+    >>> e.x.shape
+    (10958, 3)
+    >>> bool(np.allclose(np.hypot(e.x, e.y), [float(ERDE.a), float(VENUS.a), float(MARS.a)]))
+    True
+
+    Args:
+        epochen: Zeitpunkte als `datetime64`-Array oder als Liste von `datetime`, beliebige Form.
+        planeten (Sequence[Planet]): Die Planeten.
+
+    Returns:
+        Ephemeride: Längen und Positionen.
+    """
+    konstanten = planeten_konstanten(planeten)
+    epochen = _als_datetime64(epochen)
+    laenge = laengen(epochen, konstanten.planeten)
+    return Ephemeride(
+        epochen=epochen, planeten=konstanten.planeten, laenge=laenge,
+        x=konstanten.a * np.cos(laenge), y=konstanten.a * np.sin(laenge)
+    )
@@ -0,0 +1,269 @@
+"""Vorberechnete Ephemeridentabellen aus stückweisen Tschebyschow-Polynomen.
+
+Das Kreisbahnmodell aus `lib.ephemeride` kennt nur a, L0 und T. `tabelle_erstellen()` berechnet stattdessen die
+Positionen von Körpern auf Keplerbahnen aus `Bahnelemente` (Exzentrizität, Inklination, Knoten und Perihel) und
+speichert sie als Koeffizienten von Tschebyschow-Polynomen je Zeitabschnitt in einer Binärdatei. Statt dichter
+Stützstellen genügen so wenige Koeffizienten je Abschnitt und Koordinate.
+
+`EphemeridenTabelle` bildet die Datei mit `numpy.memmap` in den Speicher ab. Das Öffnen kostet unabhängig von der
+Größe der Tabelle fast nichts, gelesen werden nur die Abschnitte, deren Positionen abgefragt werden. Da alle Prozesse
+dieselben Seiten aus dem Cache des Betriebssystems verwenden, können beliebig viele Prozesse eine Tabelle gemeinsam
+nutzen. Beim Übertragen an einen anderen Prozess mit pickle wird nur der Pfad übertragen.
+
+Aufbau der Datei: 8 Bytes `MAGIC`, 4 Bytes Länge des Headers (little endian), der Header als JSON, aufgefüllt auf ein
+Vielfaches von 64 Bytes, dann die Koeffizienten als float64 (little endian) in der Form
+(Körper, Abschnitte, 3 Koordinaten, Grad + 1).
+"""
+import json
+import math
+import os
+import struct
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Sequence
+
+import numpy as np
+
+from lib import kepler
+from lib.planet import Planet
+
+MAGIC = b'RFTCHEB1'
+"""Kennung am Anfang jeder Tabellendatei."""
+FORMAT_VERSION = 1
+"""Version des Dateiformats. Ältere oder neuere Dateien werden abgelehnt."""
+_AUSRICHTUNG = 64
+_TAGE_PRO_JAHR = 365.2422
+
+
+@dataclass(frozen=True)
+class Bahnelemente:
+    """Keplersche Bahnelemente eines Körpers um die Sonne. Winkel in Grad, wie `Planet.L0`.
+
+    Wie bei `Planet` bestimmt die Umlaufzeit T die mittlere Bewegung, und L0 ist die mittlere Länge zum Zeitpunkt
+    `L0_DATETIME`.
+    """
+
+    name: str
+    """Name des Körpers."""
+    a: float
+    """Große Halbachse in km."""
+    epsilon: float
+    """Numerische Exzentrizität."""
+    L0: float
+    """Mittlere Länge zum Referenzzeitpunkt in Grad."""
+    T: float
+    """Umlaufzeit in Jahren."""
+    L0_DATETIME: datetime
+    """Referenzzeitpunkt für L0."""
+    perihel: float = 0.0
+    """Länge des Perihels in Grad."""
+    i: float = 0.0
+    """Inklination gegen die Bezugsebene in Grad."""
+    knoten: float = 0.0
+    """Länge des aufsteigenden Knotens in Grad."""
+
+    @staticmethod
+    def aus_planet(planet: Planet) -> 'Bahnelemente':
+        """Bahnelemente der Kreisbahn eines Planeten aus dem Katalog, wie sie `lib.ephemeride` verwendet."""
+        return Bahnelemente(
+            name=planet.name, a=float(planet.a), epsilon=0.0, L0=float(planet.L0), T=float(planet.T),
+            L0_DATETIME=planet.L0_DATETIME
+        )
+
+    def positionen(self, epochen) -> np.ndarray:
+        """Berechnet die heliozentrischen Positionen mit der Keplergleichung, siehe `lib.kepler`.
+
+        Args:
+            epochen: Zeitpunkte als `datetime64`-Array, beliebige Form.
+
+        Returns:
+            np.ndarray: Positionen in km mit der Form `epochen.shape + (3,)`.
+        """
+        tage = (np.asarray(epochen, dtype='datetime64[us]') - np.datetime64(self.L0_DATETIME, 'us')) \
+            / np.timedelta64(1, 'D')
+        M = np.radians(self.L0 - self.perihel) + 2 * np.pi * tage / (self.T * _TAGE_PRO_JAHR)
+        E = kepler.exzentrische_anomalie(M, self.epsilon)
+        x = self.a * (np.cos(E) - self.epsilon)
+        y = self.a * math.sqrt(1 - self.epsilon ** 2) * np.sin(E)
+
+        knoten, i = math.radians(self.knoten), math.radians(self.i)
+        omega = math.radians(self.perihel) - knoten
+        cos_o, sin_o, cos_k, sin_k, cos_i, sin_i = \
+            math.cos(omega), math.sin(omega), math.cos(knoten), math.sin(knoten), math.cos(i), math.sin(i)
+        return np.stack([
+            (cos_o * cos_k - sin_o * sin_k * cos_i) * x + (-sin_o * cos_k - cos_o * sin_k * cos_i) * y,
+            (cos_o * sin_k + sin_o * cos_k * cos_i) * x + (-sin_o * sin_k + cos_o * cos_k * cos_i) * y,
+            sin_o * sin_i * x + cos_o * sin_i * y,
+        ], axis=-1)
+
+
+def _tschebyschow_knoten(grad: int) -> np.ndarray:
+    return np.cos(np.pi * (np.arange(grad + 1) + 0.5) / (grad + 1))
+
+
+def _koeffizienten(werte: np.ndarray, grad: int) -> np.ndarray:
+    """Koeffizienten der Interpolation an den Tschebyschow-Knoten. `werte` hat die Knoten in der letzten Achse."""
+    j = np.arange(grad + 1)[:, np.newaxis]
+    matrix = np.cos(j * np.pi * (np.arange(grad + 1) + 0.5) / (grad + 1)) * (2 / (grad + 1))
+    matrix[0] /= 2
+    return werte @ matrix.T
+
+
+def _clenshaw(koeffizienten: np.ndarray, tau: np.ndarray) -> np.ndarray:
+    """Wertet die Tschebyschow-Reihen aus. `koeffizienten` hat die Form (..., 3, Grad + 1), `tau` die Form (...,)."""
+    tau = tau[..., np.newaxis]
+    b1 = np.zeros(koeffizienten.shape[:-1])
+    b2 = np.zeros_like(b1)
+    for k in range(koeffizienten.shape[-1] - 1, 0, -1):
+        b1, b2 = 2 * tau * b1 - b2 + koeffizienten[..., k], b1
+    return tau * b1 - b2 + koeffizienten[..., 0]
+
+
+def tabelle_erstellen(
+        pfad: str, koerper: Sequence[Bahnelemente], start: datetime, ende: datetime, abschnitt_tage: float = 16,
+        grad: int = 12
+) -> float:
+    """Berechnet die Tabelle für alle Körper im Zeitraum `[start, ende)` und schreibt sie atomar nach `pfad`.
+
+    >>> import os, tempfile
+    >>> from lib.planet import ERDE
+    >>> mars = Bahnelemente('Mars', a=227_939_200.0, epsilon=0.0934, L0=175.7365, T=1.8809,
+    ...                     L0_DATETIME=datetime(1987, 10, 12), perihel=336.04, i=1.85, knoten=49.56)
+    >>> verzeichnis = tempfile.TemporaryDirectory()
+    >>> pfad = os.path.join(verzeichnis.name, 'planeten.cheb')
+    >>> tabelle_erstellen(pfad, [Bahnelemente.aus_planet(ERDE), mars], datetime(2020, 1, 1), datetime(2040, 1, 1)) < 1
+    True
+    >>> tabelle = EphemeridenTabelle(pfad)
+    >>> tabelle.koerper
+    ['Erde', 'Mars']
+    >>> epochen = np.arange('2030-01-01', '2031-01-01', dtype='datetime64[D]')
+    >>> float(np.abs(tabelle.positionen('Mars', epochen) - mars.positionen(epochen)).max()) < 1
+    True
+    >>> tabelle.close()
+    >>> verzeichnis.cleanup()
+
+    Args:
+        pfad (str): Pfad der Datei.
+        koerper (Sequence[Bahnelemente]): Die Körper.
+        start (datetime): Beginn des Zeitraums.
+        ende (datetime): Ende des Zeitraums, wird auf ganze Abschnitte aufgerundet.
+        abschnitt_tage (float): Länge eines Abschnitts in Tagen.
+        grad (int): Grad der Polynome je Abschnitt.
+
+    Returns:
+        float: Größte Abweichung zur Keplerbahn in km, geprüft in der Mitte zwischen den Stützstellen.
+    """
+    namen = [element.name for element in koerper]
+    if len(set(namen)) != len(namen):
+        raise ValueError('Die Namen der Körper müssen eindeutig sein.')
+    abschnitt = np.timedelta64(int(round(abschnitt_tage * 86_400e6)), 'us')
+    beginn = np.datetime64(start, 'us')
+    abschnitte = max(1, int(math.ceil((np.datetime64(ende, 'us') - beginn) / abschnitt)))
+
+    # Stützstellen aller Abschnitte auf einmal: Form (Abschnitte, Grad + 1)
+    mitte = beginn + abschnitt * np.arange(abschnitte) + abschnitt / 2
+    knoten = _tschebyschow_knoten(grad)
+    pruefung = np.linspace(-1, 1, 2 * grad + 3)
+    epochen = mitte[:, np.newaxis] + (knoten * (abschnitt / 2)).astype('timedelta64[us]')
+    pruef_epochen = mitte[:, np.newaxis] + (pruefung * (abschnitt / 2)).astype('timedelta64[us]')
+    pruef_tau = ((pruef_epochen - mitte[:, np.newaxis]) / (abschnitt / 2)).astype(np.float64)
+
+    koeffizienten = np.empty((len(koerper), abschnitte, 3, grad + 1))
+    max_fehler = 0.0
+    for k, element in enumerate(koerper):
+        werte = np.moveaxis(element.positionen(epochen), -1, 1)  # (Abschnitte, 3, Grad + 1)
+        koeffizienten[k] = _koeffizienten(werte, grad)
+        naeherung = _clenshaw(koeffizienten[k][:, np.newaxis], pruef_tau)
+        max_fehler = max(max_fehler, float(np.abs(naeherung - element.positionen(pruef_epochen)).max()))
+
+    header = json.dumps({
+        'version': FORMAT_VERSION, 'koerper': namen, 'start_us': int(beginn.astype(np.int64)),
+        'abschnitt_us': int(abschnitt.astype(np.int64)), 'abschnitte': abschnitte, 'grad': grad,
+        'max_fehler_km': max_fehler,
+    }).encode('utf-8')
+    laenge = len(MAGIC) + 4 + len(header)
+    header += b' ' * (-laenge % _AUSRICHTUNG)
+
+    verzeichnis = os.path.dirname(os.path.abspath(pfad))
+    os.makedirs(verzeichnis, exist_ok=True)
+    fd, temp = tempfile.mkstemp(dir=verzeichnis, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as datei:
+            datei.write(MAGIC + struct.pack('<I', len(header)) + header)
+            datei.write(koeffizienten.astype('<f8').tobytes())
+        os.replace(temp, pfad)
+    except BaseException:
+        os.unlink(temp)
+        raise
+    return max_fehler
+
+
+class EphemeridenTabelle:
+    """Liest eine mit `tabelle_erstellen()` geschriebene Tabelle über eine Speicherabbildung."""
+
+    def __init__(self, pfad: str):
+        """
+        Args:
+            pfad (str): Pfad der Datei.
+
+        Raises:
+            ValueError: Wenn die Datei keine Tabelle in einer unterstützten Version ist.
+        """
+        self.pfad = pfad
+        with open(pfad, 'rb') as datei:
+            if datei.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f'{pfad} ist keine Ephemeridentabelle.')
+            (laenge,) = struct.unpack('<I', datei.read(4))
+            header = json.loads(datei.read(laenge))
+        if header['version'] != FORMAT_VERSION:
+            raise ValueError(f'{pfad} hat Version {header["version"]}, unterstützt wird {FORMAT_VERSION}.')
+
+        self.koerper: List[str] = header['koerper']
+        """Namen der Körper in der Tabelle."""
+        self.grad: int = header['grad']
+        """Grad der Polynome je Abschnitt."""
+        self.max_fehler_km: float = header['max_fehler_km']
+        """Beim Erstellen gemessene größte Abweichung zur Keplerbahn in km."""
+        self.start = np.datetime64(header['start_us'], 'us')
+        """Beginn des Zeitraums."""
+        self.abschnitt = np.timedelta64(header['abschnitt_us'], 'us')
+        """Länge eines Abschnitts."""
+        self.abschnitte: int = header['abschnitte']
+        """Anzahl an Abschnitten."""
+        self.ende = self.start + self.abschnitt * self.abschnitte
+        """Ende des Zeitraums, ausschließlich."""
+        self._index = {name: k for k, name in enumerate(self.koerper)}
+        self._koeffizienten = np.memmap(
+            pfad, dtype='<f8', mode='r', offset=len(MAGIC) + 4 + laenge,
+            shape=(len(self.koerper), self.abschnitte, 3, self.grad + 1)
+        )
+
+    def __reduce__(self):
+        return type(self), (self.pfad,)
+
+    def positionen(self, name: str, epochen) -> np.ndarray:
+        """Berechnet die Positionen eines Körpers. Gelesen werden nur die Abschnitte, in denen die Zeitpunkte liegen.
+
+        Args:
+            name (str): Name des Körpers.
+            epochen: Zeitpunkte als `datetime64`-Array oder als Liste von `datetime`, beliebige Form.
+
+        Raises:
+            KeyError: Wenn der Körper nicht in der Tabelle ist.
+            ValueError: Wenn ein Zeitpunkt außerhalb des Zeitraums der Tabelle liegt.
+
+        Returns:
+            np.ndarray: Positionen in km mit der Form `epochen.shape + (3,)`.
+        """
+        koeffizienten = self._koeffizienten[self._index[name]]
+        versatz = np.asarray(epochen, dtype='datetime64[us]') - self.start
+        abschnitt = versatz // self.abschnitt
+        if abschnitt.size > 0 and (abschnitt.min() < 0 or abschnitt.max() >= self.abschnitte):
+            raise ValueError(f'Zeitpunkte außerhalb von [{self.start}, {self.ende}).')
+        tau = 2 * ((versatz - abschnitt * self.abschnitt) / self.abschnitt) - 1
+        return _clenshaw(koeffizienten[abschnitt], tau)
+
+    def close(self):
+        """Gibt die Speicherabbildung frei, sobald keine Ergebnisse mehr auf sie verweisen."""
+        self._koeffizienten = None
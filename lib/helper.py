@@ -1,3 +1,4 @@
+from lib.numerik import pi, is_array, days, number, uses_floats
 from lib.unit_decimal import return_unit
 from decimal import Decimal
 import math
@@ -21,7 +22,7 @@ def rad_zu_grad(rad: Decimal) -> Decimal:
     Returns:
         Decimal: Gleicher Wert in Grad.
     """
-    return rad / Decimal(math.pi) * 180
+    return rad / pi(rad) * 180
 
 
 @return_unit("rad")
@@ -41,7 +42,7 @@ def grad_zu_rad(grad: Decimal) -> Decimal:
     Returns:
         Decimal: Gleicher Wert in Rad.
     """
-    return grad * Decimal(math.pi) / 180
+    return grad * pi(grad) / 180
 
 
 def gleicher_tag(datum1: datetime, datum2: datetime) -> bool:
@@ -66,7 +67,7 @@ def jahre_zu_timedelta(jahre: Decimal) -> timedelta:
     Returns:
         timedelta: Timedelta bestimmt durch Tage.
     """
-    return timedelta(days=float(Decimal('365.2422') * jahre))
+    return timedelta(days=float(number('365.2422', jahre) * jahre))
 
 
 @return_unit("a")
@@ -79,6 +80,8 @@ def timedelta_zu_jahre(td: timedelta) -> Decimal:
     Returns:
         Decimal: Jahre in Jahren.
     """
+    if is_array(td) or uses_floats():
+        return days(td) / 365.2422
     return td.days / Decimal('365.2422')
 
 
@@ -1,12 +1,13 @@
-import math
 from decimal import Decimal
 from lib.helper import rad_zu_grad
 from lib import konstanten
+from lib.numerik import absolute, acos, adaptive, arc_condition, asin, round_to, sqrt
 from lib.planet import *
 from lib.unit_decimal import return_unit
 
 
 @return_unit('km')
+@adaptive(lambda epsilon, **_: 1 / absolute(epsilon**2 - 1))
 def grosse_halbachse_p_epsilon(*, p: Decimal, epsilon: Decimal) -> Decimal:
     """
     Berechnet die große Halbachse a einer Hyperbel.
@@ -56,7 +57,7 @@ def kleine_halbachse(*, a: Decimal, e: Decimal) -> Decimal:
     :param e: Lineare Exzentrizität.
     :return: Kleine Halbachse b in km.
     """
-    return (e**2 - a**2).sqrt()
+    return sqrt(e**2 - a**2)
 
 
 @return_unit('km')
@@ -80,10 +81,11 @@ def numerische_exzentrizitaet(*, a: Decimal, ra: Decimal) -> Decimal:
     :param ra: Radius des Apozentrums der Hyperbel in km.
     :return: Numerische Exzentrizität.
     """
-    return round(Decimal((ra / a) - 1), konstanten.EPSILON_PRECISION)
+    return round_to((ra / a) - 1, konstanten.EPSILON_PRECISION)
 
 
 @return_unit('km')
+@adaptive(lambda epsilon, **_: 1 / absolute(epsilon**2 - 1))
 def bahnparameter_p(*, a: Decimal, epsilon: Decimal) -> Decimal:
     """
     Berechnet den Bahnparameter p einer Hyperbel.
@@ -141,9 +143,10 @@ def perizentrum_geschwindigkeit(*, vk: Decimal, vinf: Decimal) -> Decimal:
     :param vinf: Die Geschwindigkeit im Unendlichen nach der Hyperbel in km/s.
     :return: Perizentrumsgeschwindigkeit in km/s.
     """
-    return (2 * vk**2 + vinf**2).sqrt()
+    return sqrt(2 * vk**2 + vinf**2)
 
 
+@adaptive(lambda epsilon: arc_condition(1 / epsilon))
 def unendlichkeitsanomalie(*, epsilon: Decimal) -> Decimal:
     """
     Berechnet die Umlaufzeit der Hyperbel.
@@ -151,13 +154,20 @@ def unendlichkeitsanomalie(*, epsilon: Decimal) -> Decimal:
     :param epsilon: Die numerische Exzentrizität.
     :return: Unendlichkeitsanomalie in Grad.
     """
-    return rad_zu_grad(Decimal(math.acos(-(1 / epsilon))))
+    return rad_zu_grad(acos(-(1 / epsilon)))
 
 
+@adaptive(lambda epsilon: arc_condition(1 / epsilon))
 def umlenkwinkel(epsilon: Decimal) -> Decimal:
     """
     Berechnet den Umlenkwinkel der Parabel.
+
+    >>> from lib import numerik
+    >>> with numerik.numeric_mode(numerik.ADAPTIVE):
+    ...     round(umlenkwinkel(2.0), 9), round(umlenkwinkel(epsilon=2.0), 9)
+    (60.0, 60.0)
+
     :param epsilon: Die numerische Exzentrizität.
     :return: Den Umlinkwinkel in Grad.
     """
-    return rad_zu_grad(2 * Decimal(math.asin(1 / epsilon)))
+    return rad_zu_grad(2 * asin(1 / epsilon))
@@ -0,0 +1,128 @@
+"""Vektorisierte Lösung der Keplergleichung für elliptische Bahnen.
+
+`lib.allgemein.keplersche_zeitgleichung()` berechnet die Flugzeit zu einer wahren Anomalie. Dieses Modul löst die
+Umkehrung für ganze NumPy-Arrays von Zeitpunkten auf einmal: Zeit → mittlere Anomalie M → exzentrische Anomalie E →
+wahre Anomalie phi. Die Keplergleichung M = E - epsilon·sin(E) wird mit dem Startwert von Danby und dem
+Halley-Verfahren gelöst, das kubisch konvergiert und für alle 0 <= epsilon < 1 nach wenigen Schritten die
+Maschinengenauigkeit erreicht.
+
+Alle Funktionen rechnen mit float64 ohne Einheiten: Zeiten in Sekunden seit dem Perizentrumsdurchgang, Winkel in
+Radiant, Längen in km und Geschwindigkeiten in km/s.
+"""
+from dataclasses import dataclass
+from datetime import timedelta
+
+import numpy as np
+
+TOLERANZ = 1e-14
+"""Abbruchschranke für die Änderung von E in Radiant."""
+MAX_ITERATIONEN = 32
+"""Höchstzahl an Halley-Schritten. Ab epsilon < 0.999 genügen in der Praxis 4."""
+
+
+def exzentrische_anomalie(M, epsilon: float, toleranz: float = TOLERANZ) -> np.ndarray:
+    """Löst die Keplergleichung M = E - epsilon·sin(E) nach der exzentrischen Anomalie E.
+
+    E liegt im selben Umlauf wie M, d.h. E - M ist höchstens epsilon, sodass E über mehrere Umläufe stetig wächst.
+
+    >>> exzentrische_anomalie(np.array([0, np.pi, 3 * np.pi]), 0.5) / np.pi
+    array([0., 1., 3.])
+
+    Args:
+        M: Mittlere Anomalie in Radiant, Skalar oder Array.
+        epsilon (float): Numerische Exzentrizität, 0 <= epsilon < 1.
+        toleranz (float): Abbruchschranke für die Änderung von E.
+
+    Raises:
+        ValueError: Wenn epsilon keine Ellipse beschreibt oder das Verfahren nicht konvergiert.
+
+    Returns:
+        np.ndarray: Exzentrische Anomalie in Radiant.
+    """
+    epsilon = float(epsilon)
+    if not 0 <= epsilon < 1:
+        raise ValueError(f'Die Keplergleichung für Ellipsen benötigt 0 <= epsilon < 1, nicht {epsilon}.')
+    M = np.asarray(M, dtype=np.float64)
+
+    # Auf einen Umlauf um 0 reduzieren, damit der Startwert gut ist, und am Ende wieder zurückschieben
+    umlauf = np.round(M / (2 * np.pi))
+    m = M - 2 * np.pi * umlauf
+    E = m + 0.85 * epsilon * np.sign(np.sin(m))
+    for _ in range(MAX_ITERATIONEN):
+        e_sin = epsilon * np.sin(E)
+        e_cos = epsilon * np.cos(E)
+        f = E - e_sin - m
+        f1 = 1 - e_cos
+        schritt = f / (f1 - 0.5 * f * e_sin / f1)
+        E -= schritt
+        if not np.any(np.abs(schritt) > toleranz):
+            return E + 2 * np.pi * umlauf
+    raise ValueError(f'Die Keplergleichung konvergiert nicht nach {MAX_ITERATIONEN} Schritten.')
+
+
+def wahre_anomalie_aus_exzentrischer(E, epsilon: float) -> np.ndarray:
+    """Rechnet die exzentrische Anomalie in die wahre Anomalie um. Wie E wächst sie über mehrere Umläufe stetig.
+
+    >>> wahre_anomalie_aus_exzentrischer(np.array([0, np.pi / 2]), 0.0) / np.pi
+    array([0. , 0.5])
+
+    Args:
+        E: Exzentrische Anomalie in Radiant, Skalar oder Array.
+        epsilon (float): Numerische Exzentrizität.
+
+    Returns:
+        np.ndarray: Wahre Anomalie in Radiant.
+    """
+    E = np.asarray(E, dtype=np.float64)
+    halb = E / 2
+    # atan2 liefert den Winkel im Umlauf von E, die Umläufe kommen aus E selbst
+    phi = 2 * np.arctan2(np.sqrt(1 + epsilon) * np.sin(halb), np.sqrt(1 - epsilon) * np.cos(halb))
+    return phi + 2 * np.pi * np.round((E - phi) / (2 * np.pi))
+
+
+@dataclass(frozen=True)
+class Bahnpunkte:
+    """Zustand auf einer Ellipse zu einem Raster von Zeitpunkten, ein Array-Eintrag je Zeitpunkt."""
+
+    t: np.ndarray
+    """Zeit seit dem Perizentrumsdurchgang in Sekunden."""
+    E: np.ndarray
+    """Exzentrische Anomalie in Radiant."""
+    phi: np.ndarray
+    """Wahre Anomalie in Radiant, über mehrere Umläufe stetig."""
+    r: np.ndarray
+    """Abstand zum Zentralgestirn in km."""
+    v: np.ndarray
+    """Bahngeschwindigkeit in km/s."""
+
+
+def bahnpunkte(t, *, a: float, epsilon: float, mu: float) -> Bahnpunkte:
+    """Berechnet wahre Anomalie, Radius und Geschwindigkeit auf einer Ellipse zu den gegebenen Zeitpunkten.
+
+    >>> halber_umlauf = np.pi * np.sqrt(8000.0 ** 3 / 398600.0)
+    >>> punkte = bahnpunkte(np.array([0.0, halber_umlauf]), a=8000.0, epsilon=0.125, mu=398600.0)
+    >>> np.round(punkte.r, 6), np.round(punkte.phi / np.pi, 12)
+    (array([7000., 9000.]), array([0., 1.]))
+
+    Args:
+        t: Zeit seit dem Perizentrumsdurchgang in Sekunden als float-Array oder als Array von Dauern.
+        a (float): Große Halbachse in km.
+        epsilon (float): Numerische Exzentrizität.
+        mu (float): Gravitationsparameter des Zentralgestirns in km³/s².
+
+    Returns:
+        Bahnpunkte: Die Zustände zu den Zeitpunkten.
+    """
+    t = np.asarray(t)
+    if t.dtype == object and t.size > 0 and isinstance(t.flat[0], timedelta):
+        t = t.astype('timedelta64[us]')
+    if np.issubdtype(t.dtype, np.timedelta64):
+        t = t / np.timedelta64(1, 's')
+    t = t.astype(np.float64, copy=False)
+    a, epsilon, mu = float(a), float(epsilon), float(mu)
+
+    E = exzentrische_anomalie(np.sqrt(mu / a ** 3) * t, epsilon)
+    phi = wahre_anomalie_aus_exzentrischer(E, epsilon)
+    r = a * (1 - epsilon * np.cos(E))
+    v = np.sqrt(mu * (2 / r - 1 / a))
+    return Bahnpunkte(t=t, E=E, phi=phi, r=r, v=v)
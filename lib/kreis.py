@@ -2,6 +2,7 @@ import math
 from datetime import timedelta
 from decimal import Decimal
 from lib import konstanten
+from lib.numerik import constant, duration, math_sqrt, sqrt, to_float
 from lib.planet import ERDE, Planet
 from lib.unit_decimal import return_unit
 
@@ -36,7 +37,7 @@ def lineare_exzentrizitaet() -> Decimal:
     Gibt die lineare Exzentrizität e einer Kreises zurück.
     Hinweis: Die lineare Exzentrizität ist immer 0.
     """
-    return Decimal(0)
+    return constant(0)
 
 
 @return_unit('km')
@@ -78,7 +79,7 @@ def geschwindigkeit(*, planet: Planet, rk: Decimal) -> Decimal:
     :param rk: Radius der Kreisbahn.
     :return: Kreisbahngeschwindigkeit in km/s.
     """
-    return Decimal(math.sqrt(planet.mu / rk))
+    return math_sqrt(planet.mu / rk)
 
 
 def winkelgeschwindigkeit(*, planet: Planet, rk: Decimal) -> Decimal:
@@ -89,7 +90,7 @@ def winkelgeschwindigkeit(*, planet: Planet, rk: Decimal) -> Decimal:
     :param rk: Radius des Kreises in km.
     :return: Winkelgeschwindigkeit TODO: welche Einheit?.
     """
-    return (planet.mu / rk**3).sqrt()
+    return sqrt(planet.mu / rk**3)
 
 
 def umlaufzeit(*, planet: Planet, r: Decimal) -> timedelta:
@@ -102,4 +103,4 @@ def umlaufzeit(*, planet: Planet, r: Decimal) -> timedelta:
     """
     # TODO: Ist die Umlaufzeit wirklich in Sekunden?
     # TODO: Umlaufzeit als timedelta returnen?
-    return timedelta(seconds=2 * math.pi * math.sqrt(r ** 3 / planet.mu))
+    return duration(2 * math.pi * to_float(math_sqrt(r ** 3 / planet.mu)))
@@ -0,0 +1,138 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from decimal import getcontext
+from typing import Callable, Optional
+
+from lib import numerik
+from lib.unit_decimal import attaches_units, unit_of
+
+
+@dataclass(frozen=True)
+class CacheInfo:
+    """Statistik eines `FormulaCache`."""
+
+    hits: int
+    """Anzahl der Aufrufe, deren Ergebnis aus dem Cache kam."""
+    misses: int
+    """Anzahl der Aufrufe, die die Formel ausgewertet haben."""
+    maxsize: int
+    """Maximale Anzahl an Einträgen."""
+    size: int
+    """Aktuelle Anzahl an Einträgen."""
+
+
+class FormulaCache:
+    """LRU-Cache für Aufrufe reiner Formeln, über alle Objekte hinweg.
+
+    Schlüssel sind die Formel, der Rechenmodus, mit Decimal die Präzision und die Werte der Argumente mit deren
+    Einheiten, da z.B. `UnitDecimal('7', 'km')`, `UnitDecimal('7', 'm')` und `Decimal('7')` gleich sind, die Formel aber
+    unterschiedliche Ergebnisse liefert. Aufrufe mit nicht hashbaren Argumenten werden ohne Cache ausgewertet.
+
+    >>> from lib import kreis
+    >>> from lib.planet import ERDE
+    >>> cache = FormulaCache(maxsize=2, enabled=True)
+    >>> cache.call(kreis.geschwindigkeit, planet=ERDE, rk=ERDE.R + 200)
+    7.784 km/s
+    >>> cache.call(kreis.geschwindigkeit, planet=ERDE, rk=ERDE.R + 200)
+    7.784 km/s
+    >>> cache.info()
+    CacheInfo(hits=1, misses=1, maxsize=2, size=1)
+    >>> from lib.unit_decimal import without_unit
+    >>> _ = cache.call(kreis.geschwindigkeit, planet=ERDE, rk=without_unit(ERDE.R + 200))
+    >>> cache.info()
+    CacheInfo(hits=1, misses=2, maxsize=2, size=2)
+    >>> from decimal import localcontext
+    >>> with localcontext() as context:
+    ...     context.prec = 6
+    ...     _ = cache.call(kreis.geschwindigkeit, planet=ERDE, rk=ERDE.R + 200)
+    >>> cache.info()
+    CacheInfo(hits=1, misses=3, maxsize=2, size=2)
+    """
+
+    def __init__(self, maxsize: int = 4096, enabled: bool = False):
+        """
+        Args:
+            maxsize (int): Maximale Anzahl an Einträgen. Danach wird der am längsten nicht verwendete verdrängt.
+            enabled (bool): Ob der Cache verwendet wird. Ausgeschaltet wird jede Formel direkt ausgewertet.
+        """
+        self.maxsize = maxsize
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def call(self, func: Callable, **kwargs):
+        """Wertet `func` mit den Argumenten aus oder liefert das gespeicherte Ergebnis.
+
+        Args:
+            func (Callable): Die Formel. Muss für gleiche Argumente immer das gleiche Ergebnis liefern.
+            **kwargs: Die Argumente der Formel.
+
+        Returns:
+            Das Ergebnis der Formel.
+        """
+        if not self.enabled:
+            return func(**kwargs)
+
+        # Der Rechenmodus gehört zum Schlüssel, da z.B. 0.5 und Decimal('0.5') gleich sind. Ebenso, ob Einheiten
+        # angehängt werden, da Planeten und ihre Kopien ohne Einheiten gleich sind. Mit Decimal, auch beim Nachrechnen
+        # im Modus ADAPTIVE, zusätzlich die Präzision wie in lib.result_cache.
+        mode = numerik.current_mode()
+        key = (
+            func, mode, getcontext().prec if mode == numerik.DECIMAL else None, attaches_units(),
+            tuple((param, value, unit_of(value)) for param, value in kwargs.items())
+        )
+        try:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key]
+        except TypeError:
+            # Nicht hashbares Argument
+            return func(**kwargs)
+
+        result = func(**kwargs)
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return result
+
+    def enable(self, maxsize: Optional[int] = None):
+        """Schaltet den Cache ein.
+
+        Args:
+            maxsize (Optional[int]): Neue maximale Anzahl an Einträgen.
+        """
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = maxsize
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+            self.enabled = True
+
+    def disable(self):
+        """Schaltet den Cache aus. Die Einträge bleiben erhalten."""
+        self.enabled = False
+
+    def clear(self):
+        """Löscht alle Einträge und setzt die Zähler zurück."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> CacheInfo:
+        """Liefert die Statistik des Caches."""
+        with self._lock:
+            return CacheInfo(hits=self.hits, misses=self.misses, maxsize=self.maxsize, size=len(self._entries))
+
+
+formula_cache = FormulaCache()
+"""Cache, den der Solver und `fluchthyperbel` verwenden. Standardmäßig ausgeschaltet, einschalten mit
+`formula_cache.enable()`."""
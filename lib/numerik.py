@@ -0,0 +1,541 @@
+"""Rechenoperationen, die für Decimal, float und NumPy-Arrays funktionieren.
+
+Die Formeln verwenden diese Funktionen statt `math` und der Methoden von `Decimal`, damit sie unverändert mit
+skalaren Decimal-Werten, skalaren floats und ganzen Spalten als NumPy-Arrays ausgewertet werden können. Für Decimal
+verhalten sich die Funktionen wie der bisherige Code: Funktionen aus `math` werden auf float ausgewertet und das
+Ergebnis wieder in ein Decimal umgewandelt.
+
+Welcher Zahlentyp verwendet wird, ergibt sich aus den Argumenten. Nur wo eine Formel keine Argumente hat, entscheidet
+der Rechenmodus: `DECIMAL` für Referenzrechnungen in voller Genauigkeit, `FLOAT` für schnelle Rechnungen mit
+float64 oder `ADAPTIVE`, das wie `FLOAT` rechnet und unzuverlässige Fälle mit Decimal nachrechnet, siehe `adaptive()`.
+Der Modus gilt global (`set_default_mode()`) oder für einen Block (`numeric_mode()`); `Solvable` wandelt die
+gegebenen Parameter in den Modi `FLOAT` und `ADAPTIVE` in floats um.
+
+NumPy ist optional. Ohne NumPy funktionieren alle Funktionen für Decimal und float.
+"""
+import dataclasses
+import inspect
+import math
+import sys
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+from decimal import Decimal, localcontext
+from functools import wraps
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+def is_array(x: Any) -> bool:
+    """Gibt an, ob `x` ein NumPy-Array ist."""
+    return np is not None and isinstance(x, np.ndarray)
+
+
+DECIMAL = 'decimal'
+"""Rechenmodus mit Decimal in der Genauigkeit des aktuellen Decimal-Kontexts."""
+FLOAT = 'float'
+"""Rechenmodus mit float64."""
+ADAPTIVE = 'adaptive'
+"""Rechenmodus mit float64, in dem mit `adaptive()` markierte Formeln schlecht konditionierte Fälle mit Decimal
+nachrechnen."""
+MODES = (DECIMAL, FLOAT, ADAPTIVE)
+
+_default_mode = DECIMAL
+_mode: ContextVar[Optional[str]] = ContextVar('numerik_mode', default=None)
+
+
+def _check_mode(mode: str):
+    if mode not in MODES:
+        raise ValueError(f'Unbekannter Rechenmodus {mode!r}, erlaubt sind {MODES}.')
+
+
+def set_default_mode(mode: str):
+    """Setzt den globalen Rechenmodus, der gilt, wenn kein anderer mit `numeric_mode()` gesetzt ist.
+
+    Args:
+        mode (str): `DECIMAL`, `FLOAT` oder `ADAPTIVE`.
+    """
+    global _default_mode
+    _check_mode(mode)
+    _default_mode = mode
+
+
+def current_mode() -> str:
+    """Liefert den aktuellen Rechenmodus."""
+    mode = _mode.get()
+    return _default_mode if mode is None else mode
+
+
+@contextmanager
+def numeric_mode(mode: str):
+    """Setzt den Rechenmodus für die Dauer des Blocks, nur für den aktuellen Thread bzw. Kontext.
+
+    >>> with numeric_mode(FLOAT):
+    ...     constant('0.1')
+    0.1
+
+    Args:
+        mode (str): `DECIMAL`, `FLOAT` oder `ADAPTIVE`.
+    """
+    _check_mode(mode)
+    token = _mode.set(mode)
+    try:
+        yield
+    finally:
+        _mode.reset(token)
+
+
+def uses_floats() -> bool:
+    """Gibt an, ob im aktuellen Rechenmodus mit float statt Decimal gerechnet wird."""
+    return current_mode() != DECIMAL
+
+
+def constant(value):
+    """Liefert eine Konstante im Zahlentyp des aktuellen Rechenmodus. Für Formeln ohne Argumente, aus denen sich der
+    Typ ergibt, sonst `number()`.
+
+    >>> constant('0.1')
+    Decimal('0.1')
+    """
+    if uses_floats():
+        return float(value)
+    return Decimal(value)
+
+
+def _math_function(math_func: Callable, numpy_name: str) -> Callable:
+    """Erzeugt eine Funktion, die `math_func` für Decimal und float und die gleichnamige NumPy-Funktion für Arrays
+    verwendet."""
+    def function(x):
+        if isinstance(x, Decimal):
+            return Decimal(math_func(x))
+        if is_array(x):
+            return getattr(np, numpy_name)(x)
+        return math_func(x)
+    function.__name__ = numpy_name
+    function.__doc__ = f'{numpy_name}(x) für Decimal, float und NumPy-Arrays. Liefert den Typ von x.'
+    return function
+
+
+math_sqrt = _math_function(math.sqrt, 'sqrt')
+"""Wurzel mit float-Genauigkeit. Für Decimal wie `Decimal(math.sqrt(x))`."""
+sin = _math_function(math.sin, 'sin')
+cos = _math_function(math.cos, 'cos')
+tan = _math_function(math.tan, 'tan')
+atan = _math_function(math.atan, 'arctan')
+log = _math_function(math.log, 'log')
+
+
+def _half_angle_near_one(x: Decimal) -> Decimal:
+    """Liefert `asin(sqrt((1 - |x|) / 2))`, also den halben Abstand von acos(|x|) zu 0. `1 - |x|` wird in Decimal
+    exakt berechnet, sodass auch Werte nahe 1 genau bleiben."""
+    return Decimal(math.asin(math.sqrt((1 - x.copy_abs()) / 2)))
+
+
+def acos(x):
+    """arccos(x) für Decimal, float und NumPy-Arrays. Liefert den Typ von x.
+
+    Für Decimal nahe ±1 wird `acos(x) = 2·asin(sqrt((1 - x) / 2))` verwendet, da `x` dort nicht mehr genau als float
+    darstellbar ist.
+    """
+    if isinstance(x, Decimal):
+        if x.copy_abs() <= Decimal('0.5'):
+            return Decimal(math.acos(x))
+        half_angle = _half_angle_near_one(x)
+        return 2 * half_angle if x > 0 else Decimal(math.pi) - 2 * half_angle
+    if is_array(x):
+        return np.arccos(x)
+    return math.acos(x)
+
+
+def asin(x):
+    """arcsin(x) für Decimal, float und NumPy-Arrays. Liefert den Typ von x. Für Decimal nahe ±1 wie `acos()`."""
+    if isinstance(x, Decimal):
+        if x.copy_abs() <= Decimal('0.5'):
+            return Decimal(math.asin(x))
+        angle = Decimal(math.pi / 2) - 2 * _half_angle_near_one(x)
+        return angle if x > 0 else -angle
+    if is_array(x):
+        return np.arcsin(x)
+    return math.asin(x)
+
+
+def arc_condition(x):
+    """Schätzt die Konditionszahl von acos(x) und asin(x), die bei |x| → 1 gegen unendlich geht. Für `adaptive()`."""
+    return 1 / math_sqrt(absolute(1 - x**2))
+
+
+def exp(x):
+    """Exponentialfunktion in der vollen Genauigkeit des Typs, für Decimal also `x.exp()`."""
+    if isinstance(x, Decimal):
+        return x.exp()
+    if is_array(x):
+        return np.exp(x)
+    return math.exp(x)
+
+
+def sqrt(x):
+    """Wurzel in der vollen Genauigkeit des Typs, für Decimal also `x.sqrt()`.
+
+    >>> sqrt(Decimal(16))
+    Decimal('4')
+    >>> sqrt(4.0)
+    2.0
+    """
+    if isinstance(x, Decimal):
+        return x.sqrt()
+    if is_array(x):
+        return np.sqrt(x)
+    return math.sqrt(x)
+
+
+def absolute(x):
+    """Betrag. Für Decimal wie `x.copy_abs()`."""
+    if isinstance(x, Decimal):
+        return x.copy_abs()
+    if is_array(x):
+        return np.abs(x)
+    return abs(x)
+
+
+def round_to(x, digits: int):
+    """Rundet auf `digits` Nachkommastellen, wie `round(x, digits)`."""
+    if is_array(x):
+        return np.round(x, digits)
+    return round(x, digits)
+
+
+def pi(like):
+    """Liefert π im Zahlentyp von `like`, also `Decimal(math.pi)` für Decimal und sonst float."""
+    if isinstance(like, Decimal):
+        return Decimal(math.pi)
+    return math.pi
+
+
+def number(value, like):
+    """Wandelt eine Konstante in den Zahlentyp von `like` um.
+
+    >>> number(1 / 3, Decimal(2)) == Decimal(1 / 3)
+    True
+    >>> number(1 / 3, 2.0)
+    0.3333333333333333
+    """
+    if is_array(value):
+        return value
+    if isinstance(like, Decimal):
+        return Decimal(value)
+    return float(value)
+
+
+def select(condition, if_true: Callable[[], Any], if_false: Callable[[], Any]):
+    """Fallunterscheidung, die auch elementweise für eine Maske als NumPy-Array funktioniert.
+
+    Für skalare Bedingungen wird nur der benötigte Zweig ausgewertet, für Arrays beide, die dann elementweise
+    kombiniert werden. Datenklassen wie `Planet` werden feldweise kombiniert, sodass z.B. `planet.a` ein Array ist.
+
+    Args:
+        condition: Bedingung, bool oder NumPy-Array von bool.
+        if_true (Callable[[], Any]): Liefert den Wert, wenn die Bedingung erfüllt ist.
+        if_false (Callable[[], Any]): Liefert den Wert, wenn die Bedingung nicht erfüllt ist.
+
+    Returns:
+        Den Wert des passenden Zweigs.
+    """
+    if not is_array(condition):
+        return if_true() if condition else if_false()
+
+    true_value, false_value = if_true(), if_false()
+    if true_value is false_value:
+        return true_value
+    if dataclasses.is_dataclass(true_value) and type(true_value) is type(false_value):
+        return dataclasses.replace(true_value, **{
+            field.name: np.where(condition, getattr(true_value, field.name), getattr(false_value, field.name))
+            for field in dataclasses.fields(true_value)
+        })
+    return np.where(condition, true_value, false_value)
+
+
+def all_true(condition) -> bool:
+    """Gibt an, ob eine Bedingung erfüllt ist, bei einer Maske als NumPy-Array für alle Elemente."""
+    if is_array(condition):
+        return bool(np.all(condition))
+    return bool(condition)
+
+
+def duration(seconds):
+    """Wandelt Sekunden in eine Dauer um: `timedelta` für Skalare, `timedelta64[us]` für Arrays."""
+    if is_array(seconds):
+        return np.round(seconds * 1e6).astype('timedelta64[us]')
+    return timedelta(seconds=float(seconds))
+
+
+def total_seconds(td):
+    """Liefert die Sekunden einer Dauer als float bzw. float-Array."""
+    if is_array(td):
+        return td / np.timedelta64(1, 's')
+    return td.total_seconds()
+
+
+def days(td):
+    """Liefert die ganzen Tage einer Dauer, wie `timedelta.days`."""
+    if is_array(td):
+        return td // np.timedelta64(1, 'D')
+    return td.days
+
+
+def relative_difference(a, b) -> float:
+    """Relativer Unterschied zweier Werte, bezogen auf den betragsmäßig größeren. Dauern werden über ihre Sekunden
+    verglichen, Arrays über ihr größtes Element. Gleiche Werte, auch zweimal NaN, haben den Unterschied 0, NaN und eine
+    Zahl den Unterschied unendlich. Alle anderen Werte wie Planeten werden auf Gleichheit geprüft.
+
+    >>> relative_difference(Decimal('2'), Decimal('2.5'))
+    0.2
+    >>> relative_difference(timedelta(days=2), timedelta(days=2))
+    0.0
+
+    Returns:
+        float: Unterschied zwischen 0 und 1, unendlich bei NaN oder 1, wenn Werte ohne Zahl ungleich sind.
+    """
+    if isinstance(a, timedelta) or (is_array(a) and a.dtype.kind == 'm'):
+        a, b = total_seconds(a), total_seconds(b)
+    if is_array(a) or is_array(b):
+        a, b = np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64)
+        both_nan = np.isnan(a) & np.isnan(b)
+        scale = np.maximum(np.abs(a), np.abs(b))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            difference = np.where(a == b, 0.0, np.abs(a - b) / scale)
+        difference = np.where(both_nan, 0.0, np.where(np.isnan(difference), math.inf, difference))
+        return float(np.max(difference)) if difference.size > 0 else 0.0
+    if isinstance(a, bool) or not isinstance(a, (Decimal, float, int)) or not isinstance(b, (Decimal, float, int)):
+        return 0.0 if a == b or a is b else 1.0
+    a_nan, b_nan = a != a, b != b
+    if a_nan or b_nan:
+        return 0.0 if a_nan and b_nan else math.inf
+    if a == b:
+        return 0.0
+    if isinstance(a, Decimal) and isinstance(b, Decimal):
+        return float(abs(a - b) / max(abs(a), abs(b)))
+    return abs(float(a) - float(b)) / max(abs(float(a)), abs(float(b)))
+
+
+ADAPTIVE_TOLERANCE = 1e-10
+"""Geschätzter relativer Fehler eines float-Ergebnisses, ab dem im Modus `ADAPTIVE` mit Decimal nachgerechnet wird."""
+ESCALATION_PRECISION = 50
+"""Mindestgenauigkeit in Stellen, mit der im Modus `ADAPTIVE` nachgerechnet wird."""
+FLOAT_EPSILON = sys.float_info.epsilon
+"""Relativer Rundungsfehler von float64."""
+
+
+def adaptive(condition: Callable[..., Any]):
+    """Markiert eine Formel, deren float-Ergebnis in manchen Bereichen unzuverlässig ist.
+
+    `condition` erhält die Argumente der Formel und schätzt ihre Konditionszahl, also um wie viel sich relative
+    Rundungsfehler der Argumente im Ergebnis verstärken. Im Modus `ADAPTIVE` wird damit der Fehler des float-Ergebnisses
+    abgeschätzt; übersteigt er `ADAPTIVE_TOLERANCE`, wird die Formel mit Decimal in mindestens
+    `ESCALATION_PRECISION` Stellen neu berechnet. Bei Arrays nur für die betroffenen Elemente. In den anderen Modi
+    ändert der Decorator nichts.
+
+    >>> @adaptive(lambda x: 1 / absolute(1 - x))
+    ... def f(*, x):
+    ...     return (1 - x**2) / (1 - x)
+    >>> with numeric_mode(ADAPTIVE):
+    ...     f(x=0.5), f(x=1 - 1e-12)
+    (1.5, 1.999999999999)
+
+    Args:
+        condition (Callable[..., Any]): Schätzt die Konditionszahl aus den Argumenten der Formel.
+    """
+    def decorator(function):
+        signature = inspect.signature(function)
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if current_mode() != ADAPTIVE:
+                return function(*args, **kwargs)
+            if len(args) > 0:
+                # condition und die Neuberechnung erhalten alle Argumente über ihren Namen
+                kwargs = signature.bind(*args, **kwargs).arguments
+
+            unreliable = _condition_number(condition, kwargs) * FLOAT_EPSILON > ADAPTIVE_TOLERANCE
+            collected = _unreliable.get()
+            if collected is not None and np_any(unreliable):
+                collected.append(unreliable)
+            if is_array(unreliable) or any(_contains_array(value) for value in kwargs.values()):
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    result = function(**kwargs)
+                if not np_any(unreliable):
+                    return result
+                return _recompute_elements(function, kwargs, result, unreliable)
+
+            if unreliable:
+                return to_float(_evaluate_decimal(function, kwargs))
+            return function(**kwargs)
+        wrapper.condition = condition
+        return wrapper
+    return decorator
+
+
+_unreliable: ContextVar[Optional[list]] = ContextVar('numerik_unreliable', default=None)
+
+
+@contextmanager
+def collect_unreliable():
+    """Sammelt im Modus `ADAPTIVE`, für welche Fälle mit `adaptive()` markierte Formeln unzuverlässig waren.
+
+    Liefert eine Liste, die je ausgewerteter unzuverlässiger Formel True oder eine bool-Maske der betroffenen Elemente
+    enthält. So kann z.B. der Solver die betroffenen Fälle vollständig mit Decimal neu lösen.
+    """
+    collected = []
+    token = _unreliable.set(collected)
+    try:
+        yield collected
+    finally:
+        _unreliable.reset(token)
+
+
+def np_any(condition) -> bool:
+    """Gibt an, ob eine Bedingung erfüllt ist, bei einer Maske als NumPy-Array für mindestens ein Element."""
+    if is_array(condition):
+        return bool(np.any(condition))
+    return bool(condition)
+
+
+def _condition_number(condition: Callable[..., Any], kwargs: dict):
+    try:
+        if np is None:
+            return condition(**kwargs)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return condition(**kwargs)
+    except (ZeroDivisionError, ValueError):
+        return math.inf
+
+
+def _contains_array(value) -> bool:
+    if is_array(value):
+        return True
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return any(is_array(getattr(value, field.name)) for field in dataclasses.fields(value))
+    return False
+
+
+def _evaluate_decimal(function: Callable, kwargs: dict):
+    """Wertet `function` mit Decimal in mindestens `ESCALATION_PRECISION` Stellen aus."""
+    with localcontext() as context, numeric_mode(DECIMAL):
+        context.prec = max(context.prec, ESCALATION_PRECISION)
+        return function(**{name: to_decimal(value) for name, value in kwargs.items()})
+
+
+def element(value, index: tuple, shape: tuple):
+    """Liefert das Element `index` eines Werts, der gegen `shape` gebroadcastet wird. Skalare bleiben unverändert,
+    Datenklassen mit Array-Feldern werden zu Kopien mit den jeweiligen Elementen."""
+    if is_array(value):
+        return np.broadcast_to(value, shape)[index]
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.replace(value, **{
+            field.name: element(getattr(value, field.name), index, shape)
+            for field in dataclasses.fields(value)
+            if is_array(getattr(value, field.name))
+        })
+    return value
+
+
+def set_element(array, index: tuple, value):
+    """Setzt ein Element eines float- oder timedelta64-Arrays auf einen einzelnen Wert, z.B. ein Decimal-Ergebnis."""
+    value = to_float(value)
+    array[index] = np.timedelta64(value) if isinstance(value, timedelta) else value
+
+
+def _recompute_elements(function: Callable, kwargs: dict, result, unreliable):
+    """Berechnet die Elemente von `result`, für die `unreliable` gilt, mit Decimal neu."""
+    shape = np.broadcast_shapes(np.shape(result), np.shape(unreliable))
+    result = np.array(np.broadcast_to(result, shape))
+    for index in zip(*np.nonzero(np.broadcast_to(unreliable, shape))):
+        set_element(result, index, _evaluate_decimal(function, {
+            name: element(argument, index, shape) for name, argument in kwargs.items()
+        }))
+    return result
+
+
+def to_decimal(value):
+    """Gegenstück zu `to_float()` für einzelne Werte: float wird zu Decimal, `UnitFloat` zu `UnitDecimal` und
+    Datenklassen wie `Planet` zu Kopien mit Decimal-Feldern. Alle anderen Werte bleiben unverändert."""
+    if np is not None and isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, bool) or not isinstance(value, float):
+        if dataclasses.is_dataclass(value) and not isinstance(value, type):
+            return dataclasses.replace(value, **{
+                field.name: to_decimal(getattr(value, field.name))
+                for field in dataclasses.fields(value)
+                if isinstance(getattr(value, field.name), float)
+            })
+        return value
+    unit = getattr(value, 'unit', None)
+    if unit is not None:
+        from lib.unit_decimal import UnitDecimal
+        return UnitDecimal(float(value), unit)
+    return Decimal(value)
+
+
+def to_float(value):
+    """Wandelt einen Wert für die Auswertung mit float bzw. NumPy um.
+
+    Decimal wird zu float, `UnitDecimal` zu `UnitFloat` mit derselben Einheit, Listen und Arrays werden zu
+    float64-Arrays (bool-Arrays bleiben Masken), Datenklassen wie `Planet` werden zu Kopien mit float-Feldern. Alle
+    anderen Werte bleiben unverändert.
+    """
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, Decimal):
+        unit = getattr(value, 'unit', None)
+        if unit is not None:
+            from lib.unit_decimal import UnitFloat
+            return UnitFloat(value, unit)
+        return float(value)
+    if isinstance(value, (list, tuple)) or is_array(value):
+        array = np.asarray(value)
+        if array.dtype == bool or array.dtype.kind in 'mM':
+            return array
+        return array.astype(np.float64)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return _dataclass_to_float(value)
+    return value
+
+
+_float_copies: Dict[int, Tuple[weakref.ref, Any]] = {}
+"""Bereits umgewandelte Datenklassen nach id() des Originals, mit einer schwachen Referenz auf das Original. Nicht über
+den Hash, da z.B. `SONNE` NaN-Felder hat. Ein Eintrag wird entfernt, sobald das Original freigegeben wird."""
+
+
+def _dataclass_to_float(value):
+    """
+    >>> from lib.planet import ERDE
+    >>> planet = dataclasses.replace(ERDE, name='Erde 2')
+    >>> to_float(planet) is to_float(planet), id(planet) in _float_copies
+    (True, True)
+    >>> key = id(planet)
+    >>> del planet
+    >>> key in _float_copies
+    False
+    """
+    cached = _float_copies.get(id(value))
+    if cached is not None and cached[0]() is value:
+        return cached[1]
+
+    changes = {
+        field.name: to_float(getattr(value, field.name))
+        for field in dataclasses.fields(value)
+        if isinstance(getattr(value, field.name), Decimal)
+    }
+    copy = dataclasses.replace(value, **changes)
+    try:
+        original = weakref.ref(value)
+    except TypeError:
+        # Ohne __weakref__ wird die Kopie nicht gespeichert
+        return copy
+    _float_copies[id(value)] = (original, copy)
+    weakref.finalize(value, _float_copies.pop, id(value), None)
+    return copy
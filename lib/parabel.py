@@ -1,4 +1,5 @@
 import math
+from lib.numerik import constant, math_sqrt, number
 from lib.unit_decimal import return_unit
 from decimal import Decimal
 
@@ -11,7 +12,7 @@ def grosse_halbachse() -> Decimal:
 
     :return: Große Halbachse a in km.
     """
-    return Decimal(math.inf)
+    return constant(math.inf)
 
 
 @return_unit('km')
@@ -22,7 +23,7 @@ def lineare_exzentrizitaet() -> Decimal:
 
     :return: Lineare Exzentrizität in km.
     """
-    return Decimal(math.inf)
+    return constant(math.inf)
 
 
 @return_unit('km')
@@ -44,7 +45,7 @@ def apozentrum_radius() -> Decimal:
 
     :return: Der Apozentrumsradius ra in km.
     """
-    return Decimal(math.inf)
+    return constant(math.inf)
 
 
 @return_unit('km/s')
@@ -56,7 +57,7 @@ def perizentrum_geschwindigkeit(*, vk: Decimal) -> Decimal:
     :param vk: Die Kreisgeschwindigkeit.
     :return: Die Perizentrumsgeschwindigkeit in km/s.
     """
-    return Decimal(math.sqrt(2)) * vk
+    return math_sqrt(number(2, vk)) * vk
 
 
 def unendlichkeitsanomalie() -> Decimal:
@@ -66,4 +67,4 @@ def unendlichkeitsanomalie() -> Decimal:
 
     :return: Die Unendlichkeitsanomalie.
     """
-    return Decimal(math.inf)
+    return constant(math.inf)
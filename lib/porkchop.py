@@ -0,0 +1,236 @@
+"""Porkchop-Diagramme: benötigte Geschwindigkeitsimpulse für alle Kombinationen von Start- und Ankunftsdatum.
+
+Für jede Zelle des Rasters liegen Start- und Zielplanet nach `lib.ephemeride` fest, ebenso die Flugzeit. Die Bahn
+dazwischen ist die Lösung des Lambert-Problems in der gemeinsamen Bahnebene, die `lambert()` für alle Zellen auf einmal
+mit universellen Variablen berechnet. Die Geschwindigkeitsimpulse sind wie in `TransferEllipse` (`delta_v2()`) der
+Betrag der Differenz zwischen der Geschwindigkeit der Sonde und der Kreisbahngeschwindigkeit des Planeten, `v_total`
+die Summe ihrer Beträge.
+
+Das Raster wird zeilenweise in Blöcke aufgeteilt und wie in `lib.sweep` auf einen Pool von Prozessen verteilt. Das
+Ergebnis hängt nicht von der Anzahl der Prozesse ab.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+from lib.ephemeride import ephemeride
+from lib.planet import Planet, SONNE
+
+_MAX_ITERATIONEN = 64
+_TOLERANZ = 1e-11
+
+
+def _stumpff(z: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Stumpff-Funktionen S(z) und C(z), nahe 0 als Reihe, um die Auslöschung zu vermeiden."""
+    S = np.empty_like(z)
+    C = np.empty_like(z)
+    positiv, negativ = z > 1e-3, z < -1e-3
+    null = ~(positiv | negativ)
+
+    w = np.sqrt(z[positiv])
+    S[positiv] = (w - np.sin(w)) / w ** 3
+    C[positiv] = (1 - np.cos(w)) / z[positiv]
+    w = np.sqrt(-z[negativ])
+    S[negativ] = (np.sinh(w) - w) / w ** 3
+    C[negativ] = (np.cosh(w) - 1) / -z[negativ]
+    z0 = z[null]
+    S[null] = 1 / 6 - z0 / 120 + z0 ** 2 / 5040
+    C[null] = 1 / 2 - z0 / 24 + z0 ** 2 / 720
+    return S, C
+
+
+def lambert(r1: np.ndarray, r2: np.ndarray, t: np.ndarray, mu: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Löst das Lambert-Problem für prograde Bahnen ohne vollen Umlauf in der Ebene, für alle Fälle auf einmal.
+
+    Gelöst wird die Gleichung der universellen Variable z mit dem Newton-Verfahren, abgesichert durch ein
+    Einschlussintervall, in dem bei schlechten Schritten halbiert wird. Fälle ohne Lösung, z.B. mit t <= 0 oder mit
+    einem Transferwinkel von genau 180°, bei dem die Bahnebene unbestimmt ist, liefern NaN.
+
+    >>> r1 = np.array([[149_599_366.0, 0.0]])
+    >>> r2 = np.array([[0.0, 149_599_366.0]])
+    >>> viertel_umlauf = np.pi / 2 * np.sqrt(149_599_366.0 ** 3 / 1.3271e11)
+    >>> v1, v2 = lambert(r1, r2, np.array([viertel_umlauf]), 1.3271e11)
+    >>> np.round(v1, 3) + 0
+    array([[ 0.   , 29.784]])
+
+    Args:
+        r1 (np.ndarray): Startpositionen in km, Form (..., 2).
+        r2 (np.ndarray): Zielpositionen in km, Form (..., 2).
+        t (np.ndarray): Flugzeiten in Sekunden, Form (...).
+        mu (float): Gravitationsparameter des Zentralgestirns in km³/s².
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Geschwindigkeiten am Start und am Ziel in km/s, jeweils Form (..., 2).
+    """
+    r1, r2 = np.asarray(r1, dtype=np.float64), np.asarray(r2, dtype=np.float64)
+    form = np.broadcast_shapes(r1.shape[:-1], r2.shape[:-1], np.shape(t))
+    r1, r2 = np.broadcast_to(r1, form + (2,)).reshape(-1, 2), np.broadcast_to(r2, form + (2,)).reshape(-1, 2)
+    t = np.broadcast_to(np.asarray(t, dtype=np.float64), form).reshape(-1)
+
+    betrag1, betrag2 = np.hypot(r1[:, 0], r1[:, 1]), np.hypot(r2[:, 0], r2[:, 1])
+    kreuz = r1[:, 0] * r2[:, 1] - r1[:, 1] * r2[:, 0]
+    cos_winkel = np.clip((r1[:, 0] * r2[:, 0] + r1[:, 1] * r2[:, 1]) / (betrag1 * betrag2), -1, 1)
+    # Prograd: gegen den Uhrzeigersinn, bei negativem Kreuzprodukt also der lange Weg über 180°
+    sin_winkel = np.sqrt(1 - cos_winkel ** 2) * np.where(kreuz >= 0, 1, -1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        A = sin_winkel * np.sqrt(betrag1 * betrag2 / (1 - cos_winkel))
+    sqrt_mu_t = np.sqrt(mu) * t
+    loesbar = (t > 0) & np.isfinite(A) & (A != 0)
+
+    def zeitgleichung(z, k):
+        """F(z) = sqrt(mu)·(Flugzeit zu z - t) für die Fälle mit den Indizes k, -inf wo y(z) <= 0."""
+        S, C = _stumpff(z)
+        y = betrag1[k] + betrag2[k] + A[k] * (z * S - 1) / np.sqrt(C)
+        gueltig = y > 0
+        y = np.where(gueltig, y, 1.0)
+        F = np.where(gueltig, (y / C) ** 1.5 * S + A[k] * np.sqrt(y) - sqrt_mu_t[k], -np.inf)
+        return F, y, S, C, gueltig
+
+    # Einschlussintervall: F wächst mit z und geht für z gegen 4·pi² gegen unendlich
+    oben = np.full_like(t, 4 * np.pi ** 2 * (1 - 1e-12))
+    unten = np.full_like(t, -4 * np.pi ** 2)
+    z = np.zeros_like(t)
+    with np.errstate(over='ignore', invalid='ignore', divide='ignore'):
+        aktiv = np.flatnonzero(loesbar)
+        for _ in range(8):
+            zu_gross = zeitgleichung(unten[aktiv], aktiv)[0] >= 0
+            aktiv = aktiv[zu_gross]
+            unten[aktiv] *= 4
+        loesbar[aktiv] = False
+
+        # Newton nur für die noch nicht konvergierten Fälle
+        aktiv = np.flatnonzero(loesbar)
+        for _ in range(_MAX_ITERATIONEN):
+            if aktiv.size == 0:
+                break
+            zk, Ak = z[aktiv], A[aktiv]
+            F, y, S, C, gueltig = zeitgleichung(zk, aktiv)
+            unten[aktiv] = np.where(F < 0, zk, unten[aktiv])
+            oben[aktiv] = np.where(F >= 0, zk, oben[aktiv])
+            ableitung = np.where(
+                np.abs(zk) > 1e-3,
+                (y / C) ** 1.5 * ((C - 1.5 * S / C) / (2 * zk) + 0.75 * S ** 2 / C)
+                + Ak / 8 * (3 * S / C * np.sqrt(y) + Ak * np.sqrt(C / y)),
+                np.sqrt(2) / 40 * y ** 1.5 + Ak / 8 * (np.sqrt(y) + Ak * np.sqrt(1 / (2 * y))),
+            )
+            neu = zk - F / ableitung
+            # Am Rand des Intervalls landet ein fast konvergierter Newton-Schritt, das ist kein schlechter Schritt
+            schlecht = ~gueltig | ~np.isfinite(neu) | (neu < unten[aktiv]) | (neu > oben[aktiv])
+            neu = np.where(schlecht, (unten[aktiv] + oben[aktiv]) / 2, neu)
+            z[aktiv] = neu
+            aktiv = aktiv[np.abs(neu - zk) > _TOLERANZ * np.maximum(1, np.abs(zk))]
+
+        alle = np.arange(len(t))
+        F, y, S, C, gueltig = zeitgleichung(z, alle)
+        loesbar &= gueltig
+        f = 1 - y / betrag1
+        g = A * np.sqrt(y / mu)
+        g_punkt = 1 - y / betrag2
+        v1 = (r2 - f[:, np.newaxis] * r1) / g[:, np.newaxis]
+        v2 = (g_punkt[:, np.newaxis] * r2 - r1) / g[:, np.newaxis]
+    v1[~loesbar] = np.nan
+    v2[~loesbar] = np.nan
+    return v1.reshape(form + (2,)), v2.reshape(form + (2,))
+
+
+@dataclass(frozen=True)
+class Porkchop:
+    """Ergebnis von `porkchop()`. Alle Arrays haben die Form (Startdaten, Ankunftsdaten), Zellen ohne Transfer NaN."""
+
+    abflug: np.ndarray
+    """Startdaten als `datetime64`."""
+    ankunft: np.ndarray
+    """Ankunftsdaten als `datetime64`."""
+    delta_v_start: np.ndarray
+    """Geschwindigkeitsimpuls beim Startplaneten in km/s."""
+    delta_v_ziel: np.ndarray
+    """Geschwindigkeitsimpuls beim Zielplaneten in km/s."""
+    v_total: np.ndarray
+    """Summe der Beträge beider Geschwindigkeitsimpulse in km/s."""
+    transfer_dauer: np.ndarray
+    """Flugzeit als `timedelta64[us]`."""
+
+    @property
+    def c3(self) -> np.ndarray:
+        """Charakteristische Energie beim Start in km²/s², das Quadrat der hyperbolischen Überschussgeschwindigkeit."""
+        return self.delta_v_start ** 2
+
+
+def _planeten_zustand(planet: Planet, epochen: np.ndarray, mu: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Positionen und Kreisbahngeschwindigkeiten eines Planeten, wie `vk()` in `bahnen.transfer_ellipse`."""
+    e = ephemeride(epochen, [planet])
+    laenge = e.laenge[:, 0]
+    position = np.stack([e.x[:, 0], e.y[:, 0]], axis=-1)
+    geschwindigkeit = np.sqrt(mu / float(planet.a)) * np.stack([-np.sin(laenge), np.cos(laenge)], axis=-1)
+    return position, geschwindigkeit
+
+
+def _block(
+        r1: np.ndarray, v_start: np.ndarray, t1: np.ndarray, r2: np.ndarray, v_ziel: np.ndarray, t2: np.ndarray, mu: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Löst die Zeilen eines Blocks: r1, v_start und t1 je Startdatum, r2, v_ziel und t2 je Ankunftsdatum."""
+    flugzeit = (t2[np.newaxis, :] - t1[:, np.newaxis]) / np.timedelta64(1, 's')
+    v1, v2 = lambert(r1[:, np.newaxis], r2[np.newaxis, :], flugzeit, mu)
+    delta_v_start = np.linalg.norm(v1 - v_start[:, np.newaxis], axis=-1)
+    delta_v_ziel = np.linalg.norm(v2 - v_ziel[np.newaxis, :], axis=-1)
+    return delta_v_start, delta_v_ziel
+
+
+def porkchop(
+        start_planet: Planet, ziel_planet: Planet, abflug, ankunft, zentralgestirn: Planet = SONNE,
+        max_workers: Optional[int] = None, zellen_pro_block: int = 1 << 16
+) -> Porkchop:
+    """Berechnet die Geschwindigkeitsimpulse für alle Kombinationen von Start- und Ankunftsdatum.
+
+    >>> from lib.planet import ERDE, MARS
+    >>> abflug = np.arange('2035-01-01', '2036-06-01', dtype='datetime64[D]')
+    >>> ankunft = np.arange('2035-06-01', '2037-06-01', dtype='datetime64[D]')
+    >>> p = porkchop(ERDE, MARS, abflug, ankunft, max_workers=1)
+    >>> p.v_total.shape
+    (517, 731)
+    >>> i, j = np.unravel_index(np.nanargmin(p.v_total), p.v_total.shape)
+    >>> round(float(p.v_total[i, j]), 2), int(p.transfer_dauer[i, j] / np.timedelta64(1, 'D'))
+    (5.59, 259)
+
+    Args:
+        start_planet (Planet): Startplanet aus dem Katalog in `lib.planet`.
+        ziel_planet (Planet): Zielplanet aus dem Katalog in `lib.planet`.
+        abflug: Startdaten als `datetime64`-Array oder als Liste von `datetime`.
+        ankunft: Ankunftsdaten als `datetime64`-Array oder als Liste von `datetime`.
+        zentralgestirn (Planet): Zentralgestirn, um das beide Planeten kreisen.
+        max_workers (Optional[int]): Anzahl an Prozessen. Ohne so viele wie Prozessoren, mit 1 ohne Pool im
+            aufrufenden Prozess.
+        zellen_pro_block (int): Ungefähre Anzahl an Zellen je Block, der auf einmal gelöst wird.
+
+    Returns:
+        Porkchop: Die Geschwindigkeitsimpulse und Flugzeiten je Zelle.
+    """
+    if zellen_pro_block < 1:
+        raise ValueError('zellen_pro_block muss mindestens 1 sein.')
+    mu = float(zentralgestirn.mu)
+    t1 = np.asarray(abflug, dtype='datetime64[us]').reshape(-1)
+    t2 = np.asarray(ankunft, dtype='datetime64[us]').reshape(-1)
+    r1, v_start = _planeten_zustand(start_planet, t1, mu)
+    r2, v_ziel = _planeten_zustand(ziel_planet, t2, mu)
+
+    zeilen = max(1, zellen_pro_block // max(1, len(t2)))
+    bloecke = [slice(i, i + zeilen) for i in range(0, len(t1), zeilen)]
+    argumente = [(r1[b], v_start[b], t1[b], r2, v_ziel, t2, mu) for b in bloecke]
+    max_workers = (os.cpu_count() or 1) if max_workers is None else max_workers
+    if max_workers == 1 or len(bloecke) <= 1:
+        ergebnisse = [_block(*args) for args in argumente]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            ergebnisse = list(executor.map(_block, *zip(*argumente)))
+
+    delta_v_start = np.concatenate([ergebnis[0] for ergebnis in ergebnisse]).reshape(len(t1), len(t2))
+    delta_v_ziel = np.concatenate([ergebnis[1] for ergebnis in ergebnisse]).reshape(len(t1), len(t2))
+    transfer_dauer = t2[np.newaxis, :] - t1[:, np.newaxis]
+    transfer_dauer = np.where(transfer_dauer > np.timedelta64(0, 'us'), transfer_dauer, np.timedelta64('NaT'))
+    return Porkchop(
+        abflug=t1, ankunft=t2, delta_v_start=delta_v_start, delta_v_ziel=delta_v_ziel,
+        v_total=delta_v_start + delta_v_ziel, transfer_dauer=transfer_dauer
+    )
@@ -0,0 +1,404 @@
+"""Persistenter Cache für Ergebnisse von `Solvable`-Klassen und reinen Funktionen wie `fluchthyperbel()` in einer
+SQLite-Datenbank.
+
+Der Schlüssel eines Eintrags besteht aus einer kanonischen Darstellung der Eingaben (Planeten mit Name und allen
+Feldern), dem Rechenmodus, der Decimal-Präzision und einer Prüfsumme über den Quelltext aller beteiligten Formeln, siehe
+`formula_set_hash()`. Ändert sich `param_funcs` oder eine Formel, werden alte Einträge daher nicht mehr gefunden und
+mit der Zeit verdrängt.
+
+Die Datenbank läuft im WAL-Modus, sodass beliebig viele Threads und Prozesse gleichzeitig lesen können, während einer
+schreibt. Anzahl und Größe der Einträge führt die Tabelle `totals` über Trigger mit, sodass ein Einfügen nicht die
+ganze Tabelle zählen muss.
+"""
+import dataclasses
+import hashlib
+import inspect
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+import types
+from datetime import date, datetime, timedelta
+from decimal import Decimal, getcontext
+from typing import Callable, Dict, Iterable, Optional, Set, Type
+
+from lib import numerik
+from lib.solvable import Record, Solvable
+from lib.unit_decimal import unit_of
+
+
+SCHEMA_VERSION = 2
+"""Version des Datenbankschemas. Datenbanken mit einer anderen Version werden beim Öffnen geleert."""
+TOUCH_BATCH = 256
+"""Anzahl an Treffern, deren Zugriffszeit `ResultCache.get()` sammelt, bevor es sie in einer Transaktion schreibt."""
+
+
+def default_path() -> str:
+    """Pfad der Datenbank: `$RFT_RESULT_CACHE` oder `rft/results.sqlite3` im Cache-Verzeichnis des Benutzers."""
+    path = os.environ.get('RFT_RESULT_CACHE')
+    if path:
+        return path
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'rft', 'results.sqlite3')
+
+
+def canonical(value) -> str:
+    """Eindeutige, stabile Darstellung eines Eingabewerts für den Schlüssel.
+
+    Zahlen werden exakt dargestellt, `UnitDecimal` und `UnitFloat` mit ihrer Einheit. Datenklassen wie `Planet` werden
+    mit allen Feldern dargestellt, sodass ein veränderter Planet mit gleichem Namen einen anderen Schlüssel erhält.
+
+    >>> from lib.unit_decimal import UnitDecimal
+    >>> canonical({'rp': UnitDecimal('6578', 'km'), 'flug_zu_innerem_planet': False})
+    "{'flug_zu_innerem_planet':False,'rp':UnitDecimal('6578','km')}"
+
+    Args:
+        value: Der Wert.
+
+    Raises:
+        TypeError: Wenn sich der Wert nicht eindeutig darstellen lässt.
+
+    Returns:
+        str: Die Darstellung.
+    """
+    unit = unit_of(value)
+    if unit is not None:
+        number = str(Decimal(value)) if isinstance(value, Decimal) else repr(float(value))
+        return f'{type(value).__name__}({number!r},{unit.symbol!r})'
+    if value is None or isinstance(value, (bool, int, str, float)):
+        return repr(value)
+    if isinstance(value, Decimal):
+        return f'Decimal({str(value)!r})'
+    if isinstance(value, timedelta):
+        return f'timedelta({value.days},{value.seconds},{value.microseconds})'
+    if isinstance(value, (datetime, date)):
+        return f'{type(value).__name__}({value.isoformat()!r})'
+    if isinstance(value, dict):
+        return '{' + ','.join(f'{canonical(key)}:{canonical(value[key])}' for key in sorted(value)) + '}'
+    if isinstance(value, (list, tuple)):
+        return type(value).__name__ + '(' + ','.join(canonical(item) for item in value) + ')'
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        fields = ','.join(
+            f'{field.name}={canonical(getattr(value, field.name))}' for field in dataclasses.fields(value)
+        )
+        return f'{type(value).__module__}.{type(value).__qualname__}({fields})'
+    raise TypeError(f'Keine kanonische Darstellung für {type(value).__name__}')
+
+
+def _referenced_functions(function: Callable) -> Iterable[Callable]:
+    """Funktionen, die `function` über globale Namen aufruft, auch aus verschachtelten Funktionen und Lambdas."""
+    code_objects = [function.__code__]
+    while len(code_objects) > 0:
+        code = code_objects.pop()
+        code_objects.extend(const for const in code.co_consts if isinstance(const, types.CodeType))
+        for name in code.co_names:
+            referenced = function.__globals__.get(name)
+            if isinstance(referenced, types.ModuleType):
+                yield from (getattr(referenced, attribute, None) for attribute in code.co_names)
+            elif referenced is not None:
+                yield referenced
+
+
+def _source_modules(functions: Iterable[Callable]) -> Set[str]:
+    """Namen der Module, die die Funktionen und transitiv alle von ihnen aufgerufenen Funktionen definieren."""
+    modules, seen = set(), set()
+    pending = list(functions)
+    while len(pending) > 0:
+        function = pending.pop()
+        if not isinstance(function, types.FunctionType):
+            continue
+        function = inspect.unwrap(function)
+        if id(function) in seen:
+            continue
+        seen.add(id(function))
+        modules.add(function.__module__)
+        pending.extend(_referenced_functions(function))
+    return modules
+
+
+_formula_set_hashes = {}
+"""Bereits berechnete Prüfsummen nach Klasse bzw. Funktion. Der Quelltext ändert sich nicht, solange der Prozess läuft."""
+
+
+def formula_set_hash(target) -> str:
+    """Prüfsumme über den Quelltext aller Module, in denen die Formeln einer `Solvable`-Klasse oder eine Funktion und
+    alle von ihnen aufgerufenen Funktionen definiert sind, sowie über die Signaturen in `param_funcs`.
+
+    Module der Standardbibliothek und installierter Pakete gehen nicht ein.
+
+    >>> from bahnen.hohmann import HohmannTransfer
+    >>> from bahnen.ellipse import Ellipse
+    >>> formula_set_hash(HohmannTransfer) == formula_set_hash(Ellipse)
+    False
+
+    Args:
+        target: Eine Unterklasse von `Solvable` oder eine Funktion.
+
+    Returns:
+        str: Hexadezimale SHA-256-Prüfsumme.
+    """
+    cached = _formula_set_hashes.get(target)
+    if cached is not None:
+        return cached
+
+    digest = hashlib.sha256()
+    if isinstance(target, type) and issubclass(target, Solvable):
+        functions = [formula.func for formula in target._formulas]
+        modules = _source_modules(functions) | {cls.__module__ for cls in target.__mro__ if cls is not object}
+        for formula in target._formulas:
+            digest.update(repr((formula.param, formula.args, formula.cost, formula.error)).encode('utf-8'))
+    else:
+        modules = _source_modules([target])
+        digest.update(repr((target.__module__, target.__qualname__)).encode('utf-8'))
+
+    library = os.path.dirname(os.__file__)
+    for name in sorted(modules):
+        path = getattr(sys.modules.get(name), '__file__', None)
+        if path is None or path.startswith(library) or 'site-packages' in path:
+            continue
+        digest.update(name.encode('utf-8'))
+        with open(path, 'rb') as file:
+            digest.update(file.read())
+
+    result = digest.hexdigest()
+    _formula_set_hashes[target] = result
+    return result
+
+
+@dataclasses.dataclass(frozen=True)
+class ResultCacheInfo:
+    """Statistik eines `ResultCache`."""
+
+    hits: int
+    """Anzahl an Abfragen dieses Objekts, die ein gespeichertes Ergebnis geliefert haben."""
+    misses: int
+    """Anzahl an Abfragen dieses Objekts, für die neu gerechnet wurde."""
+    evictions: int
+    """Anzahl an Einträgen, die dieses Objekt wegen der Größenbeschränkung gelöscht hat."""
+    entries: int
+    """Aktuelle Anzahl an Einträgen in der Datenbank."""
+    size: int
+    """Aktuelle Größe aller gespeicherten Ergebnisse in Bytes."""
+
+    @property
+    def hit_rate(self) -> float:
+        """Anteil der Abfragen mit gespeichertem Ergebnis, 0 ohne Abfragen."""
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+
+class ResultCache:
+    """LRU-Cache für Ergebnisse in einer SQLite-Datenbank, über Prozesse und Läufe hinweg.
+
+    >>> import os, tempfile
+    >>> from decimal import getcontext
+    >>> getcontext().prec = 128
+    >>> from bahnen.hohmann import HohmannTransfer
+    >>> from lib.planet import SONNE, ERDE, MARS
+    >>> directory = tempfile.TemporaryDirectory()
+    >>> cache = ResultCache(os.path.join(directory.name, 'results.sqlite3'), max_entries=100)
+    >>> cache.solve_record(HohmannTransfer, zentralgestirn=SONNE, start_planet=ERDE, ziel_planet=MARS).v_total
+    5.594 km/s
+    >>> cache.solve_record(HohmannTransfer, zentralgestirn=SONNE, start_planet=ERDE, ziel_planet=MARS).v_total
+    5.594 km/s
+    >>> info = cache.info()
+    >>> info.hits, info.misses, info.entries, info.hit_rate
+    (1, 1, 1, 0.5)
+    >>> cache.close()
+    >>> directory.cleanup()
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 100_000, max_bytes: int = 1 << 30):
+        """
+        Args:
+            path (Optional[str]): Pfad der Datenbank. Ohne gilt `default_path()`.
+            max_entries (int): Maximale Anzahl an Einträgen. Danach werden die am längsten nicht verwendeten gelöscht.
+            max_bytes (int): Maximale Größe aller gespeicherten Ergebnisse in Bytes.
+        """
+        self.path = default_path() if path is None else path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # Zugriffszeiten der Treffer, die noch nicht in der Datenbank stehen
+        self._touched: Dict[str, float] = {}
+        # sqlite3-Verbindungen dürfen nicht zwischen Threads geteilt werden
+        self._local = threading.local()
+        self._connections = []
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        connection = self._connection()
+        with connection:
+            # Datenbanken mit einem älteren Schema enthalten nur Ergebnisse, die sich neu berechnen lassen
+            if connection.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+                connection.execute('DROP TABLE IF EXISTS results')
+                connection.execute('DROP TABLE IF EXISTS totals')
+                connection.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS results ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, '
+                'last_access REAL NOT NULL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access)')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS totals ('
+                'id INTEGER PRIMARY KEY CHECK (id = 0), entries INTEGER NOT NULL, size INTEGER NOT NULL)'
+            )
+            connection.execute('INSERT OR IGNORE INTO totals VALUES (0, 0, 0)')
+            connection.execute(
+                'CREATE TRIGGER IF NOT EXISTS results_insert AFTER INSERT ON results BEGIN '
+                'UPDATE totals SET entries = entries + 1, size = size + NEW.size; END'
+            )
+            connection.execute(
+                'CREATE TRIGGER IF NOT EXISTS results_update AFTER UPDATE OF size ON results BEGIN '
+                'UPDATE totals SET size = size + NEW.size - OLD.size; END'
+            )
+            connection.execute(
+                'CREATE TRIGGER IF NOT EXISTS results_delete AFTER DELETE ON results BEGIN '
+                'UPDATE totals SET entries = entries - 1, size = size - OLD.size; END'
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    @staticmethod
+    def key(namespace: str, formula_hash: str, inputs: dict, mode: Optional[str] = None) -> str:
+        """Schlüssel eines Eintrags aus Namensraum, Prüfsumme der Formeln, Eingaben, Rechenmodus und Präzision."""
+        mode = numerik.current_mode() if mode is None else mode
+        description = '\n'.join([namespace, formula_hash, mode, str(getcontext().prec), canonical(inputs)])
+        return hashlib.sha256(description.encode('utf-8')).hexdigest()
+
+    def get(self, key: str):
+        """Liefert das gespeicherte Ergebnis oder None und vermerkt den Zugriff für die Verdrängung.
+
+        Ein Treffer schreibt nicht sofort: Die Zugriffszeiten werden gesammelt und erst nach `TOUCH_BATCH` Treffern,
+        vor jedem `put()` und beim Schließen gemeinsam geschrieben, siehe `flush()`.
+        """
+        connection = self._connection()
+        row = connection.execute('SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+            self._touched[key] = time.time()
+            full = len(self._touched) >= TOUCH_BATCH
+        if full:
+            self.flush()
+        return pickle.loads(row[0])
+
+    def flush(self):
+        """Schreibt die gesammelten Zugriffszeiten der Treffer in einer Transaktion."""
+        with self._lock:
+            touched, self._touched = self._touched, {}
+        if len(touched) == 0:
+            return
+        connection = self._connection()
+        with connection:
+            connection.executemany(
+                'UPDATE results SET last_access = MAX(last_access, ?) WHERE key = ?',
+                [(last_access, key) for key, last_access in touched.items()]
+            )
+
+    def put(self, key: str, value):
+        """Speichert ein Ergebnis und löscht danach die am längsten nicht verwendeten Einträge über den Grenzen."""
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self.flush()
+        connection = self._connection()
+        with connection:
+            # Kein INSERT OR REPLACE, da das Ersetzen den DELETE-Trigger nicht auslöst
+            connection.execute(
+                'INSERT INTO results (key, value, size, last_access) VALUES (?, ?, ?, ?) ON CONFLICT (key) DO UPDATE '
+                'SET value = excluded.value, size = excluded.size, last_access = excluded.last_access',
+                (key, data, len(data), time.time())
+            )
+            evicted = 0
+            entries, size = connection.execute('SELECT entries, size FROM totals').fetchone()
+            while entries > self.max_entries or size > self.max_bytes:
+                count = entries - self.max_entries
+                if size > self.max_bytes:
+                    # Anzahl an Einträgen durchschnittlicher Größe, die über max_bytes liegen, aufgerundet
+                    count = max(count, -(-(size - self.max_bytes) * entries // size))
+                deleted = connection.execute(
+                    'DELETE FROM results WHERE key IN '
+                    '(SELECT key FROM results WHERE key != ? ORDER BY last_access LIMIT ?)', (key, count)
+                ).rowcount
+                if deleted == 0:
+                    # Nur noch der neue Eintrag, der allein größer als max_bytes ist
+                    break
+                evicted += deleted
+                entries, size = connection.execute('SELECT entries, size FROM totals').fetchone()
+        with self._lock:
+            self.evictions += evicted
+
+    def solve_record(
+            self, solvable_class: Type[Solvable], targets: Optional[Iterable[str]] = None, mode: Optional[str] = None,
+            **given
+    ) -> Record:
+        """Wie `Solvable.solve_record()`, aber aus dem Cache, falls der Fall mit denselben Formeln schon gelöst wurde.
+
+        Returns:
+            Record: Ein Datensatz vom Typ `solvable_class.Record`.
+        """
+        inputs = {'given': given, 'targets': None if targets is None else sorted(targets)}
+        key = self.key(
+            f'{solvable_class.__module__}.{solvable_class.__qualname__}', formula_set_hash(solvable_class), inputs, mode
+        )
+        record = self.get(key)
+        if record is None:
+            record = solvable_class.solve_record(targets=targets, mode=mode, **given)
+            self.put(key, record)
+        return record
+
+    def call(self, function: Callable, **kwargs):
+        """Wertet eine reine Funktion wie `fluchthyperbel()` aus oder liefert das gespeicherte Ergebnis. Das Ergebnis
+        muss sich mit pickle speichern lassen. Ausgaben über `lib.tracing` entfallen bei gespeicherten Ergebnissen.
+        """
+        key = self.key(f'{function.__module__}.{function.__qualname__}', formula_set_hash(function), kwargs)
+        result = self.get(key)
+        if result is None:
+            result = function(**kwargs)
+            self.put(key, result)
+        return result
+
+    def info(self) -> ResultCacheInfo:
+        """Liefert die Statistik dieses Objekts und die aktuelle Größe der Datenbank."""
+        entries, size = self._connection().execute('SELECT entries, size FROM totals').fetchone()
+        with self._lock:
+            return ResultCacheInfo(
+                hits=self.hits, misses=self.misses, evictions=self.evictions, entries=entries, size=size
+            )
+
+    def clear(self):
+        """Löscht alle Einträge und setzt die Zähler zurück."""
+        connection = self._connection()
+        with connection:
+            connection.execute('DELETE FROM results')
+        with self._lock:
+            self._touched.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def close(self):
+        """Schreibt die gesammelten Zugriffszeiten und schließt die Verbindungen aller Threads."""
+        self.flush()
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+        self._local = threading.local()
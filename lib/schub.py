@@ -1,5 +1,5 @@
-import math
 from decimal import Decimal
+from lib.numerik import exp, log
 from lib.unit_decimal import return_unit
 
 
@@ -19,7 +19,7 @@ def raketengrundgleichung_deltav_w(*, delta_v: Decimal, w: Decimal) -> Decimal:
     Returns:
         Das Verhältnis mb/m0.
     """
-    return (-(delta_v / w)).exp()
+    return exp(-(delta_v / w))
 
 
 @return_unit('km/s')
@@ -35,7 +35,7 @@ def geschwindigkeitszuwachs_raketengrundgleichung(*, w: Decimal, mb: Decimal, m0
     Returns:
         Decimal: Delta v bzw. Geschwindigkeitszuwachs in km/s.
     """
-    return -w * Decimal(math.log(mb / m0))
+    return -w * log(mb / m0)
 
 
 @return_unit('km/s')
@@ -1,87 +1,1261 @@
-import json
-from decimal import Decimal
-from typing import Optional, List
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, make_dataclass
+from decimal import Decimal, getcontext, localcontext
+from functools import partial
+from types import MappingProxyType
+from typing import Optional, List, Callable, ClassVar, Dict, FrozenSet, Iterable, Tuple, Mapping, Sequence, Set, Type
+import contextvars
 import inspect
-import random
+import heapq
+import threading
 
+from lib import numerik, tracing
+from lib.memo import formula_cache
 from lib.planet import Planet
+from lib.tracing import TraceStep
+from lib.unit_decimal import (
+    IncompatibleUnitsError, Unit, convert_unit, unit_of, units_detached, with_unit, without_unit
+)
+
+
+COST_ARITHMETIC = 1
+"""Kosten einfacher Arithmetik auf Decimal."""
+COST_FLOAT_FUNCTION = 2
+"""Kosten einer Funktion aus math, inklusive Umwandlung von und zu Decimal."""
+COST_DECIMAL_SQRT = 3
+"""Kosten einer Wurzel in voller Decimal-Präzision."""
+COST_DECIMAL_POWER = 40
+"""Kosten einer Potenz mit nicht ganzzahligem Exponenten in voller Decimal-Präzision."""
+ERROR_ROUNDED = 1
+"""Genauigkeitsverlust einer Formel, die ihr Ergebnis rundet, z.B. auf `konstanten.EPSILON_PRECISION`."""
+CONSISTENCY_TOLERANCE = 1e-9
+"""Relativer Unterschied, ab dem `Solvable.check_consistency()` zwei Werte eines Parameters als Widerspruch meldet."""
+
+
+class _UnknownUnit(Exception):
+    """Beim Abspielen mit reinen Zahlen hat eine Formel ein Ergebnis geliefert, deren Einheit noch nicht bekannt ist."""
+
+
+def formula_cost(cost: int = COST_ARITHMETIC, error: int = 0):
+    """Deklariert den Rechenaufwand und den Genauigkeitsverlust einer Formel.
+
+    Kann der Solver einen Parameter über mehrere Formeln berechnen, wählt er den Weg mit den geringsten Gesamtkosten
+    und bei Gleichstand den mit dem geringsten Gesamtfehler. Formeln ohne Deklaration haben die Kosten
+    `COST_ARITHMETIC` und keinen Fehler.
+
+    :param cost: Geschätzter Rechenaufwand, z.B. `COST_FLOAT_FUNCTION`.
+    :param error: Geschätzter Genauigkeitsverlust, z.B. `ERROR_ROUNDED`.
+    """
+    def decorator(function):
+        function.formula_cost = cost
+        function.formula_error = error
+        return function
+    return decorator
+
+
+@dataclass(frozen=True)
+class Formula:
+    """Eine Formel aus `param_funcs` mit ihrer beim Erstellen der Klasse ausgelesenen Signatur.
+
+    >>> from bahnen.ellipse import Ellipse
+    >>> [formula.name for formula in Ellipse.formula_index['rp']]
+    ['perizentrum_radius_a_epsilon', 'perizentrum_radius_a_ra', 'perizentrum_radius_p_epsilon']
+    >>> Ellipse.formula_index['b'][0].args
+    ('a', 'e')
+    >>> from decimal import Decimal
+    >>> Ellipse.formula_index['a'][1].raw_func(rp=Decimal(7000), ra=Decimal(9000)) == 8000
+    True
+    """
+
+    param: str
+    """Name des Parameters, den die Formel berechnet."""
+    func: Callable
+    """Die Funktion, die die Formel berechnet."""
+    args: Tuple[str, ...]
+    """Namen der Parameter, die die Formel benötigt."""
+    keyword_only: Tuple[bool, ...]
+    """Gibt für jedes Argument in `args` an, ob es nur als Keyword übergeben werden kann."""
+    cost: int = 1
+    """Geschätzter Rechenaufwand, siehe `formula_cost`."""
+    error: int = 0
+    """Geschätzter Genauigkeitsverlust, siehe `formula_cost`."""
+    raw_func: Optional[Callable] = None
+    """Die Funktion ohne den Wrapper von `return_unit`, die nur mit Zahlen rechnet. Für Formeln ohne Einheit gleich
+    `func`."""
+
+    @property
+    def name(self) -> str:
+        """Name der Funktion."""
+        return self.func.__name__
+
+    @property
+    def unit(self) -> Optional[str]:
+        """Die mit `return_unit` angegebene Einheit des Ergebnisses oder None."""
+        return getattr(self.func, 'unit', None)
+
+    @staticmethod
+    def from_func(param: str, func: Callable) -> 'Formula':
+        """Liest die Signatur einer Funktion aus.
+
+        Args:
+            param (str): Name des Parameters, den die Funktion berechnet.
+            func (Callable): Die Funktion.
+
+        Returns:
+            Formula: Die Formel.
+        """
+        parameters = inspect.signature(func).parameters.values()
+        return Formula(
+            param=param,
+            func=func,
+            args=tuple(parameter.name for parameter in parameters),
+            keyword_only=tuple(parameter.kind == inspect.Parameter.KEYWORD_ONLY for parameter in parameters),
+            cost=getattr(func, 'formula_cost', 1),
+            error=getattr(func, 'formula_error', 0),
+            raw_func=func.__wrapped__ if hasattr(func, 'unit') and hasattr(func, '__wrapped__') else func
+        )
+
+
+def _has_unit(value) -> bool:
+    """False für Zahlen ohne Einheit, mit denen sich die Einheit eines Ergebnisses nicht nachrechnen lässt."""
+    return unit_of(value) is not None or not isinstance(value, (Decimal, float, int))
+
+
+@dataclass(frozen=True)
+class ArraySolution:
+    """Ergebnis von `Solvable.solve_arrays()`: je Parameter eine Spalte mit den Werten aller Fälle."""
+
+    columns: Mapping[str, object]
+    """Werte nach Parameter. Berechnete Zahlen sind NumPy-Arrays, Dauern timedelta64-Arrays."""
+    units: Mapping[str, str]
+    """Einheit nach Parameter, soweit bekannt."""
+
+    def __getitem__(self, param: str):
+        return self.columns[param]
+
+    def __contains__(self, param: str) -> bool:
+        return param in self.columns
+
+    @staticmethod
+    def from_records(records: Sequence['Record']) -> 'ArraySolution':
+        """Fasst viele Datensätze derselben Klasse spaltenweise zusammen.
+
+        Jede Spalte ist ein neues Array, in das die Werte aus den Datensätzen übertragen werden. Spalten, die
+        ausschließlich aus floats bestehen, werden zu float64-Arrays, alle anderen zu Arrays mit dtype=object, deren
+        Elemente dieselben Objekte wie in den Datensätzen sind. Parameter, die in keinem Datensatz berechnet wurden,
+        fehlen. Ohne Kopie geht das mit einem `RecordBatch`, der die Datensätze gleich spaltenweise speichert.
+
+        >>> from bahnen.ellipse import Ellipse
+        >>> from lib.planet import ERDE
+        >>> from lib.unit_decimal import UnitDecimal
+        >>> records = [Ellipse.solve_record(zentralgestirn=ERDE, rp=UnitDecimal(rp, 'km'), ra=UnitDecimal(9000, 'km'),
+        ...                                 mode='float') for rp in (7000, 8000)]
+        >>> solution = ArraySolution.from_records(records)
+        >>> solution['a'], solution.units['a']
+        (array([8000., 8500.]), 'km')
+
+        Args:
+            records (Sequence[Record]): Die Datensätze, z.B. von `Solvable.solve_record()`.
+
+        Returns:
+            ArraySolution: Eine Spalte je Parameter.
+        """
+        np = numerik.np
+        if np is None:
+            raise ImportError('from_records() benötigt NumPy.')
+        if len(records) == 0:
+            return ArraySolution(columns=MappingProxyType({}), units=MappingProxyType({}))
+
+        columns, units = {}, {}
+        for param in type(records[0]).params:
+            values = [getattr(record, param) for record in records]
+            if all(value is None for value in values):
+                continue
+            if all(isinstance(value, float) for value in values):
+                columns[param] = np.fromiter(values, dtype=np.float64, count=len(values))
+            else:
+                column = np.empty(len(values), dtype=object)
+                column[:] = values
+                columns[param] = column
+            unit = unit_of(values[0])
+            if unit is not None:
+                units[param] = unit.symbol
+        return ArraySolution(columns=MappingProxyType(columns), units=MappingProxyType(units))
+
+
+class Record:
+    """Basisklasse der kompakten, unveränderlichen Ergebnisse von `Solvable.solve_record()`.
+
+    Jede Unterklasse von `Solvable` erhält beim Erstellen eine eigene Datenklasse `Record` mit `__slots__` und einem
+    Feld je Parameter aus `param_funcs` in deren Reihenfolge. Ein Datensatz hält nur die Werte, ohne `__dict__` und
+    ohne den Zustand des Solvers. Nicht berechnete Parameter sind None.
+
+    >>> from decimal import getcontext
+    >>> getcontext().prec = 128
+    >>> from bahnen.hohmann import HohmannTransfer
+    >>> from lib.planet import SONNE, ERDE, MARS
+    >>> record = HohmannTransfer.solve_record(zentralgestirn=SONNE, start_planet=ERDE, ziel_planet=MARS)
+    >>> type(record).__qualname__, record.v_total, hasattr(record, '__dict__')
+    ('HohmannTransfer.Record', 5.594 km/s, False)
+    """
+
+    __slots__ = ()
+
+    params: ClassVar[Tuple[str, ...]] = ()
+    """Namen der Felder in der Reihenfolge von `param_funcs`."""
+
+    def to_dict(self) -> dict:
+        """Liefert die berechneten Parameter wie `Solvable.to_dict()`, jedoch in der Reihenfolge von `params`."""
+        return {param: getattr(self, param) for param in self.params if getattr(self, param) is not None}
+
+    def __reduce__(self):
+        # Unveränderliche Datenklassen mit __slots__ lassen sich nicht über setattr wiederherstellen
+        return type(self), tuple(getattr(self, param) for param in self.params)
+
+
+def _record_type(solvable_class: Type['Solvable']) -> Type[Record]:
+    """Erzeugt die Datenklasse `Record` einer Unterklasse von `Solvable`."""
+    params = tuple(solvable_class.param_funcs.keys())
+    record_type = make_dataclass(
+        'Record', [(param, object) for param in params], bases=(Record,), frozen=True,
+        namespace={'__slots__': params, 'params': params}
+    )
+    # Damit pickle die Klasse als Attribut der Solvable-Klasse findet
+    record_type.__module__ = solvable_class.__module__
+    record_type.__qualname__ = f'{solvable_class.__qualname__}.Record'
+    return record_type
+
+
+class RecordBatch:
+    """Viele Datensätze einer `Solvable`-Klasse, gespeichert in einem NumPy-Array je Parameter statt in einzelnen
+    Objekten.
+
+    Zahlen ohne Decimal, also die Ergebnisse der Modi `numerik.FLOAT` und `numerik.ADAPTIVE`, liegen in
+    float64-Arrays, ihre Einheit einmal je Spalte. Alle anderen Werte wie Planeten oder Decimals liegen in Arrays mit
+    dtype=object. Der Typ einer Spalte ergibt sich aus dem ersten Datensatz, in dem der Parameter berechnet wurde. Die
+    Arrays sind der Speicher der Datensätze, daher liefert `to_array_solution()` die Spalten ohne Kopie.
+
+    >>> from bahnen.ellipse import Ellipse
+    >>> from lib.planet import ERDE
+    >>> from lib.unit_decimal import UnitDecimal
+    >>> batch = RecordBatch(Ellipse)
+    >>> for rp in (7000, 8000):
+    ...     _ = batch.solve(zentralgestirn=ERDE, rp=UnitDecimal(rp, 'km'), ra=UnitDecimal(9000, 'km'), mode='float')
+    >>> len(batch), batch[1].a
+    (2, 8500.000 km)
+    >>> solution = batch.to_array_solution()
+    >>> solution['a'], solution.units['a']
+    (array([8000., 8500.]), 'km')
+    >>> solution['a'].base is batch.columns['a']
+    True
+    """
+
+    def __init__(self, solvable_class: Type['Solvable'], capacity: int = 1024):
+        """
+        Args:
+            solvable_class (Type[Solvable]): Klasse der Datensätze.
+            capacity (int): Anzahl an Datensätzen, für die zu Beginn Platz reserviert wird. Danach wächst der Speicher
+                jeweils auf das Doppelte.
+        """
+        if numerik.np is None:
+            raise ImportError('RecordBatch benötigt NumPy.')
+        self.solvable_class = solvable_class
+        self.columns: Dict[str, object] = {}
+        """Die Arrays nach Parameter, mit Platz für mehr Datensätze als `len(self)`. Fehlende Werte sind NaN bzw.
+        None."""
+        self.units: Dict[str, Optional[Unit]] = {}
+        """Einheit der float64-Spalten."""
+        self._present: Dict[str, object] = {}
+        """bool-Array je Spalte, ob der Parameter im Datensatz berechnet wurde."""
+        self._capacity = max(capacity, 1)
+        self._length = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def solve(self, targets: Optional[Iterable[str]] = None, mode: Optional[str] = None, **given) -> int:
+        """Löst einen Fall wie `Solvable.solve_record()` und hängt ihn an.
+
+        Returns:
+            int: Index des Datensatzes.
+        """
+        return self.append(self.solvable_class(targets=targets, mode=mode, **given).to_record())
+
+    def append(self, record: Record) -> int:
+        """Hängt einen Datensatz an. Seine Werte werden in die Spalten geschrieben, er selbst wird nicht behalten.
+
+        Args:
+            record (Record): Ein Datensatz vom Typ `Record` der Klasse.
+
+        Returns:
+            int: Index des Datensatzes.
+        """
+        np = numerik.np
+        index = self._length
+        if index == self._capacity:
+            self._grow(2 * self._capacity)
+        for param in record.params:
+            value = getattr(record, param)
+            if value is None:
+                continue
+            column = self.columns.get(param)
+            if column is None:
+                column = self._add_column(param, value)
+            elif column.dtype != object and not self._fits(param, value):
+                # Ein Wert, der nicht in die float64-Spalte passt: einmalig auf dtype=object umstellen
+                column = np.array([self._element(param, i) for i in range(self._capacity)], dtype=object)
+                self.columns[param] = column
+                self.units.pop(param, None)
+            column[index] = without_unit(value) if column.dtype != object else value
+            self._present[param][index] = True
+        self._length += 1
+        return index
+
+    def __getitem__(self, index: int) -> Record:
+        """Liefert den Datensatz `index` als `Record`, mit den Einheiten der Spalten."""
+        if not -self._length <= index < self._length:
+            raise IndexError(f'Index {index} außerhalb von {self._length} Datensätzen')
+        index %= self._length
+        return self.solvable_class.Record(**{
+            param: self._element(param, index) if param in self.columns else None
+            for param in self.solvable_class.Record.params
+        })
+
+    def to_array_solution(self) -> ArraySolution:
+        """Liefert die Spalten als `ArraySolution`, ohne Kopie: Jede Spalte ist eine Ansicht auf die ersten
+        `len(self)` Einträge des Speichers. Wächst der Speicher durch weitere Datensätze, behalten bereits gelieferte
+        Ansichten den alten Stand.
+
+        Returns:
+            ArraySolution: Eine Spalte je Parameter, der in mindestens einem Datensatz berechnet wurde.
+        """
+        columns = {param: column[:self._length] for param, column in self.columns.items()}
+        units = {param: unit.symbol for param, unit in self.units.items() if unit is not None}
+        return ArraySolution(columns=MappingProxyType(columns), units=MappingProxyType(units))
+
+    def _add_column(self, param: str, value):
+        np = numerik.np
+        if isinstance(value, float):
+            column = np.full(self._capacity, np.nan)
+            self.units[param] = unit_of(value)
+        else:
+            column = np.full(self._capacity, None, dtype=object)
+        self.columns[param] = column
+        self._present[param] = np.zeros(self._capacity, dtype=bool)
+        return column
+
+    def _fits(self, param: str, value) -> bool:
+        return isinstance(value, float) and unit_of(value) is self.units.get(param)
+
+    def _element(self, param: str, index: int):
+        if not self._present[param][index]:
+            return None
+        value = self.columns[param][index]
+        if self.columns[param].dtype == object:
+            return value
+        unit = self.units.get(param)
+        return float(value) if unit is None else with_unit(float(value), unit)
+
+    def _grow(self, capacity: int):
+        np = numerik.np
+        for param, column in self.columns.items():
+            grown = np.full(capacity, np.nan) if column.dtype != object else np.full(capacity, None, dtype=object)
+            grown[:self._capacity] = column
+            self.columns[param] = grown
+            present = np.zeros(capacity, dtype=bool)
+            present[:self._capacity] = self._present[param]
+            self._present[param] = present
+        self._capacity = capacity
+
+
+@dataclass(frozen=True)
+class Disagreement:
+    """Ein Parameter, für den eine alternative Formel einen anderen Wert liefert als den verwendeten."""
+
+    param: str
+    """Name des Parameters."""
+    used: Optional[str]
+    """Name der Formel, mit der der Parameter berechnet wurde, oder None, wenn er gegeben war."""
+    value: object
+    """Der verwendete Wert."""
+    formula: str
+    """Name der alternativen Formel."""
+    formula_value: object
+    """Der Wert der alternativen Formel."""
+    difference: float
+    """Relativer Unterschied, siehe `numerik.relative_difference()`."""
+
+
+def _init_worker(precision: int, mode: str):
+    """Übernimmt in einem Prozess eines Pools die Decimal-Präzision und den Rechenmodus des aufrufenden Prozesses."""
+    getcontext().prec = precision
+    numerik.set_default_mode(mode)
+
+
+def _check_case(solvable_class: type, tolerance: float, given: dict) -> List[Disagreement]:
+    return solvable_class(**given).check_consistency(tolerance)
 
 
 class Solvable:
     param_funcs: dict  # {param: [func, ...], ...}
 
-    def __init__(self, **kwargs):
+    formula_index: Mapping[str, Tuple[Formula, ...]] = MappingProxyType({})
+    """Alle Formeln der Klasse nach dem Parameter, den sie berechnen. Wird beim Erstellen der Klasse aus
+    `param_funcs` aufgebaut und danach nicht mehr verändert."""
+    formula_dependents: Mapping[str, Tuple[Formula, ...]] = MappingProxyType({})
+    """Alle Formeln der Klasse nach den Parametern, die sie als Argument benötigen."""
+    param_units: Mapping[str, str] = MappingProxyType({})
+    """Die mit `return_unit` angegebene Einheit nach Parameter, soweit eine Formel des Parameters eine angibt.
+    Gegebene Werte mit Einheit werden in diese Einheit umgerechnet."""
+
+    _formulas: Tuple[Formula, ...] = ()
+    """Alle Formeln der Klasse in Deklarationsreihenfolge."""
+    _dependents: Mapping[str, Tuple[int, ...]] = MappingProxyType({})
+    """Rückwärtsindex von Argument zu den Indizes der Formeln in `_formulas`, die es benötigen."""
+    _known: dict
+    """Alle bekannten Parameter dieses Objekts, gegebene und berechnete."""
+    _given: Set[str]
+    """Namen der gegebenen Parameter dieses Objekts."""
+    _sources: Dict[str, Formula]
+    """Formel, mit der jeder berechnete Parameter dieses Objekts berechnet wurde."""
+    _targets: Optional[FrozenSet[str]]
+    """Namen der gesuchten Parameter dieses Objekts oder None für alle."""
+
+    _solve_plans: Dict[Tuple[FrozenSet[str], Optional[FrozenSet[str]]], Tuple[Formula, ...]]
+    """Cache der kompilierten Lösungspläne dieser Klasse, nach den Namen der gegebenen und gesuchten Parameter. Wird
+    nur unter `_plan_lock` erweitert; die Pläne selbst sind unveränderlich."""
+    _plan_lock: threading.Lock
+    """Sorgt dafür, dass jeder Plan auch bei gleichzeitigem Lösen aus mehreren Threads nur einmal kompiliert wird."""
+    _plan_units: Dict[Tuple[int, FrozenSet[Tuple[str, Optional[Unit]]]], Mapping[Formula, Optional[Unit]]]
+    """Einheiten der Ergebnisse der Formeln eines Plans, nach der id des Plans und den Einheiten der gegebenen
+    Parameter. Enthält jede Formel, die beim Abspielen mit Einheiten ein Ergebnis geliefert hat, auch die alternativen
+    Formeln für Schritte, die None geliefert haben, siehe `_replay()`."""
+
+    default_params: Mapping[str, object] = MappingProxyType({})
+    """Parameter, die für alle Objekte der Klasse gelten, solange sie nicht gegeben sind."""
+
+    Record: Type[Record] = Record
+    """Kompakter Datensatz mit einem Feld je Parameter dieser Klasse, siehe `solve_record()`."""
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        formulas = tuple(
+            Formula.from_func(param, func)
+            for param, funcs in cls.param_funcs.items()
+            for func in funcs
+        )
+        dependents: Dict[str, List[int]] = {}
+        for i, formula in enumerate(formulas):
+            for arg in set(formula.args):
+                dependents.setdefault(arg, []).append(i)
+
+        cls._formulas = formulas
+        cls._dependents = MappingProxyType({arg: tuple(indices) for arg, indices in dependents.items()})
+        cls.formula_index = MappingProxyType({
+            param: tuple(formula for formula in formulas if formula.param == param)
+            for param in cls.param_funcs.keys()
+        })
+        cls.param_units = MappingProxyType({
+            formula.param: formula.unit for formula in reversed(formulas) if formula.unit is not None
+        })
+        cls.formula_dependents = MappingProxyType({
+            arg: tuple(formulas[i] for i in indices)
+            for arg, indices in cls._dependents.items()
+        })
+        cls._solve_plans = {}
+        cls._plan_units = {}
+        cls._plan_lock = threading.Lock()
+        cls.Record = _record_type(cls)
+
+    _lazy: bool = False
+    """Gibt an, ob Parameter erst beim ersten Zugriff berechnet werden."""
+    _mode: str = numerik.DECIMAL
+    """Rechenmodus dieses Objekts, siehe `lib.numerik`."""
+    _exact_given: dict
+    """Im Modus `numerik.ADAPTIVE` die gegebenen Parameter vor der Umwandlung in floats."""
+
+    def __init__(
+            self, targets: Optional[Iterable[str]] = None, lazy: bool = False, mode: Optional[str] = None, **kwargs
+    ):
+        """
+        Args:
+            targets (Optional[Iterable[str]]): Namen der gesuchten Parameter. Ohne werden alle Parameter berechnet.
+            lazy (bool): Wenn True, werden Parameter nicht hier, sondern erst beim ersten Zugriff berechnet.
+            mode (Optional[str]): Rechenmodus, `numerik.DECIMAL`, `numerik.FLOAT` oder `numerik.ADAPTIVE`. Ohne gilt der
+                aktuelle Modus von `lib.numerik`.
+            **kwargs: Die gegebenen Parameter.
+        """
         super().__init__()
 
-        if len(kwargs) > 0:
-            self.solve(kwargs)
+        if lazy:
+            self._lazy = True
+            self._set_given(kwargs, targets, mode)
+        elif len(kwargs) > 0:
+            self.solve(kwargs, targets=targets, mode=mode)
+
+    def __getattr__(self, name: str):
+        """Berechnet im lazy-Modus einen Parameter beim ersten Zugriff. Dafür wird der Plan für die gegebenen Parameter
+        auf die Formeln zugeschnitten, die der Parameter braucht und die noch nicht ausgewertet wurden. So entsteht je
+        Klasse und gegebenen Parametern nur ein Plan, egal in welcher Reihenfolge auf Parameter zugegriffen wird.
+
+        >>> from bahnen.ellipse import Ellipse
+        >>> from lib.planet import ERDE
+        >>> from lib.unit_decimal import UnitDecimal
+        >>> given = dict(zentralgestirn=ERDE, rp=UnitDecimal(7000, 'km'), ra=UnitDecimal(9000, 'km'))
+        >>> ellipse = Ellipse(**given, lazy=True)
+        >>> ellipse.b, ellipse.a
+        (7937.254 km, 8000.000 km)
+        >>> plans = len(Ellipse._solve_plans)
+        >>> ellipse = Ellipse(**given, lazy=True)
+        >>> ellipse.a, ellipse.p, ellipse.b
+        (8000.000 km, 7875.000 km, 7937.254 km)
+        >>> len(Ellipse._solve_plans) - plans
+        0
+        """
+        # Wird nur aufgerufen, wenn das Attribut noch nicht existiert
+        if name.startswith('_') or not self._lazy or name not in self.param_funcs:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+        self._run(frozenset([name]))
+
+        if name not in self._known:
+            raise AttributeError(f'{name} kann aus den gegebenen Parametern nicht berechnet werden')
+        return self._known[name]
+
+    @classmethod
+    def solve_plan(cls, given: Iterable[str], targets: Optional[Iterable[str]] = None) -> Tuple[Formula, ...]:
+        """Liefert den Lösungsplan für die gegebenen Parameternamen.
+
+        Der Plan wird pro Klasse und Menge an gegebenen Parametern nur einmal kompiliert und danach aus dem Cache
+        der Klasse geliefert.
+
+        >>> from bahnen.transfer_ellipse import TransferEllipse
+        >>> plan = TransferEllipse.solve_plan(['zentralgestirn', 'start_planet', 'ziel_planet', 'epsilon', 'p'],
+        ...                                   targets=['v_total'])
+        >>> 'psi' in [formula.param for formula in plan]
+        False
+
+        Args:
+            given (Iterable[str]): Namen der gegebenen Parameter.
+            targets (Optional[Iterable[str]]): Namen der gesuchten Parameter. Der Plan enthält dann nur die Formeln,
+                die auf dem Weg zu diesen Parametern liegen. Ohne werden alle Parameter berechnet.
+
+        Returns:
+            Tuple[Formula, ...]: Die Schritte in der Reihenfolge, in der sie ausgeführt werden müssen.
+        """
+        key = (frozenset(given), None if targets is None else frozenset(targets))
+        plan = cls._solve_plans.get(key)
+        if plan is None:
+            with cls._plan_lock:
+                plan = cls._solve_plans.get(key)
+                if plan is None:
+                    plan = cls._compile_plan(key[0])
+                    if key[1] is not None:
+                        plan = cls._slice_plan(plan, key[1])
+                    cls._solve_plans[key] = plan
+        return plan
+
+    @staticmethod
+    def _slice_plan(plan: Tuple[Formula, ...], targets: FrozenSet[str]) -> Tuple[Formula, ...]:
+        """Verkettet rückwärts von den gesuchten Parametern und behält nur die Formeln, die dafür benötigt werden.
+
+        Args:
+            plan (Tuple[Formula, ...]): Vollständiger Plan.
+            targets (FrozenSet[str]): Namen der gesuchten Parameter.
+
+        Returns:
+            Tuple[Formula, ...]: Die benötigten Schritte in der Reihenfolge des vollständigen Plans.
+        """
+        needed = set(targets)
+        kept = []
+        for formula in reversed(plan):
+            if formula.param in needed:
+                kept.append(formula)
+                needed.update(formula.args)
+        return tuple(reversed(kept))
+
+    @classmethod
+    def _relevant_params(cls, targets: Iterable[str]) -> Set[str]:
+        """Sammelt rückwärts alle Parameter, die über irgendeine Formel zu den gesuchten Parametern beitragen können.
+
+        Args:
+            targets (Iterable[str]): Namen der gesuchten Parameter.
+
+        Returns:
+            Set[str]: Die gesuchten Parameter und alle Parameter, von denen sie abhängen können.
+        """
+        relevant = set()
+        pending = list(targets)
+        while len(pending) > 0:
+            param = pending.pop()
+            if param in relevant:
+                continue
+            relevant.add(param)
+            for formula in cls.formula_index.get(param, ()):
+                pending.extend(formula.args)
+        return relevant
+
+    @classmethod
+    def _compile_plan(cls, given: FrozenSet[str]) -> Tuple[Formula, ...]:
+        """Ermittelt die Reihenfolge der Formeln, ohne sie auszuwerten.
+
+        Args:
+            given (FrozenSet[str]): Namen der gegebenen Parameter.
 
-    def solve(self, given_params):
-        solvable_params = list(self.param_funcs.keys())
-        previous_size = len(solvable_params) + 1
+        Returns:
+            Tuple[Formula, ...]: Die Schritte des Plans.
+        """
+        return tuple(cls._worklist(given, lambda formula: True))
 
-        while previous_size > len(solvable_params) and len(solvable_params) > 0:
-            previous_size = len(solvable_params)
-            random.shuffle(solvable_params)
+    @classmethod
+    def _worklist(
+            cls, known: Iterable[str], evaluate: Callable[[Formula], bool], relevant: Optional[Set[str]] = None
+    ) -> List[Formula]:
+        """Löst Parameter mittels einer Worklist über den Rückwärtsindex der Formeln.
 
-            for param in solvable_params:
-                result = self.solve_param(param, given_params)
-                if result is None:
+        Eine Formel wird erst in die Worklist aufgenommen, wenn alle ihre Argumente bekannt sind, und höchstens
+        einmal ausgewertet. Die Worklist ist nach den Gesamtkosten (Kosten der Formel und ihrer Argumente) und danach
+        nach dem Gesamtfehler sortiert, sodass für jeden Parameter zuerst der günstigste und dann der genaueste Weg
+        ausgewertet wird. Bei Gleichstand entscheidet die Reihenfolge in `param_funcs`.
+
+        Args:
+            known (Iterable[str]): Namen der bereits bekannten Parameter.
+            evaluate (Callable[[Formula], bool]): Wertet eine Formel aus. Liefert False, wenn die Formel kein
+                Ergebnis liefert und der Parameter über eine andere Formel gesucht werden muss.
+            relevant (Optional[Set[str]]): Wenn angegeben, werden nur Formeln für diese Parameter ausgewertet.
+
+        Returns:
+            List[Formula]: Die erfolgreich ausgewerteten Formeln in Ausführungsreihenfolge.
+        """
+        formulas, dependents = cls._formulas, cls._dependents
+        # Gesamtkosten und Gesamtfehler der bekannten Parameter. Gegebene Parameter sind kostenlos und exakt.
+        totals: Dict[str, Tuple[int, int]] = {param: (0, 0) for param in known}
+        missing: Dict[int, int] = {}
+        worklist: List[Tuple[int, int, int]] = []
+
+        def push(i: int):
+            formula = formulas[i]
+            cost = formula.cost + sum(totals[arg][0] for arg in formula.args)
+            error = formula.error + sum(totals[arg][1] for arg in formula.args)
+            heapq.heappush(worklist, (cost, error, i))
+
+        for i, formula in enumerate(formulas):
+            if formula.param in totals or (relevant is not None and formula.param not in relevant):
+                continue
+            missing[i] = sum(1 for arg in set(formula.args) if arg not in totals)
+            if missing[i] == 0:
+                push(i)
+
+        solved = []
+        while len(worklist) > 0:
+            cost, error, i = heapq.heappop(worklist)
+            formula = formulas[i]
+            if formula.param in totals or not evaluate(formula):
+                continue
+
+            totals[formula.param] = (cost, error)
+            solved.append(formula)
+            for i in dependents.get(formula.param, ()):
+                if i not in missing:
                     continue
+                missing[i] -= 1
+                if missing[i] == 0 and formulas[i].param not in totals:
+                    push(i)
+
+        return solved
+
+    def solve(self, given_params: dict, targets: Optional[Iterable[str]] = None, mode: Optional[str] = None):
+        """Berechnet die Parameter aus den gegebenen Parametern und setzt sie als Attribute.
+
+        In den Modi `numerik.FLOAT` und `numerik.ADAPTIVE` werden die gegebenen Parameter in floats umgewandelt und alle
+        Formeln mit float ausgewertet. Die Ergebnisse tragen weiterhin ihre Einheit:
+
+        >>> from bahnen.ellipse import Ellipse
+        >>> from lib.planet import ERDE
+        >>> from lib.unit_decimal import UnitDecimal
+        >>> ellipse = Ellipse(zentralgestirn=ERDE, rp=UnitDecimal(7000, 'km'), ra=UnitDecimal(9000, 'km'), mode='float')
+        >>> ellipse.vp, type(ellipse.vp).__name__
+        (8.004 km/s, 'UnitFloat')
 
-                setattr(self, param, result)
-                given_params[param] = result
-                solvable_params.remove(param)
+        Args:
+            given_params (dict): Gegebene Parameter. Wird um die berechneten Parameter erweitert.
+            targets (Optional[Iterable[str]]): Namen der gesuchten Parameter. Wenn angegeben, werden nur die Formeln
+                ausgewertet, die auf dem Weg zu diesen Parametern liegen.
+            mode (Optional[str]): Rechenmodus, `numerik.DECIMAL`, `numerik.FLOAT` oder `numerik.ADAPTIVE`. Ohne gilt der
+                aktuelle Modus von `lib.numerik`.
 
-        if len(solvable_params) > 0:
-            print("ATTENTION: Could not solve. Missing " + str(solvable_params))
+        Returns:
+            Solvable: self.
+        """
+        self._set_given(given_params, targets, mode)
+        self._run(self._targets)
+
+        wanted = self.param_funcs.keys() if self._targets is None else self._targets
+        missing_params = [param for param in wanted if param not in given_params]
+        if len(missing_params) > 0:
+            tracing.message("ATTENTION: Could not solve. Missing " + str(missing_params))
 
         return self
 
-    def solve_param(self, param: str, given_params: dict) -> Optional[Decimal]:
-        if param in given_params:
-            # print(f'[{param}] given as {given_params[param]}')
-            return given_params[param]
-
-        random.shuffle(self.param_funcs[param])
-        for func in self.param_funcs[param]:
-            func_args = inspect.signature(func)
-            required_kwargs = {}
-
-            works = True
-            for arg in func_args.parameters.keys():
-                if arg not in given_params.keys():
-                    works = False
-                    break
-                else:
-                    required_kwargs[arg] = given_params[arg]
-
-            if works is False:
-                continue
+    @classmethod
+    def solve_arrays(
+            cls, targets: Optional[Iterable[str]] = None, mode: str = numerik.FLOAT, **given
+    ) -> 'ArraySolution':
+        """Löst viele Fälle auf einmal, indem die Formeln mit NumPy-Arrays statt einzelnen Werten ausgewertet werden.
+
+        Jeder gegebene Parameter ist entweder ein einzelner Wert, der für alle Fälle gilt, oder eine Liste bzw. ein Array
+        mit einem Wert je Fall. Werte werden mit float64 gerechnet. Planeten müssen für alle Fälle gleich sein, Masken
+        wie `flug_zu_innerem_planet` dürfen je Fall verschieden sein.
+
+        >>> from bahnen.ellipse import Ellipse
+        >>> from lib.planet import ERDE
+        >>> solution = Ellipse.solve_arrays(targets=['a'], rp=[7000, 8000], ra=9000, zentralgestirn=ERDE)
+        >>> solution['a'], solution.units['a']
+        (array([8000., 8500.]), 'km')
+
+        Args:
+            targets (Optional[Iterable[str]]): Namen der gesuchten Parameter. Ohne werden alle Parameter berechnet.
+            mode (str): `numerik.FLOAT` oder `numerik.ADAPTIVE`, um schlecht konditionierte Fälle einzeln mit Decimal
+                nachzurechnen.
+            **given: Die gegebenen Parameter.
+
+        Returns:
+            ArraySolution: Die berechneten und gegebenen Parameter als Spalten.
+        """
+        if numerik.np is None:
+            raise ImportError('solve_arrays() benötigt NumPy.')
+
+        values = {**cls.default_params, **given}
+        solver = cls.__new__(cls)
+        with numerik.np.errstate(invalid='ignore', divide='ignore'):
+            solver.solve(values, targets=targets, mode=mode)
+
+        units = {}
+        for param, value in values.items():
+            unit = getattr(value, 'unit', None)
+            if isinstance(unit, str):
+                units[param] = unit
+        for param, formula in solver._sources.items():
+            unit = getattr(formula.func, 'unit', None)
+            if unit is not None:
+                units[param] = unit
+
+        columns = {param: value for param, value in values.items() if param in cls.param_funcs}
+        return ArraySolution(columns=MappingProxyType(columns), units=MappingProxyType(units))
+
+    @classmethod
+    def solve_record(
+            cls, targets: Optional[Iterable[str]] = None, mode: Optional[str] = None, **given
+    ) -> 'Record':
+        """Löst einen Fall wie der Konstruktor, liefert aber statt des Objekts nur einen kompakten Datensatz, siehe
+        `Record`. Für Sweeps, die sehr viele Ergebnisse gleichzeitig behalten. Noch kompakter und spaltenweise
+        speichert sie ein `RecordBatch`.
+
+        Args:
+            targets (Optional[Iterable[str]]): Namen der gesuchten Parameter. Ohne werden alle Parameter berechnet.
+            mode (Optional[str]): Rechenmodus, siehe `__init__()`.
+            **given: Die gegebenen Parameter.
+
+        Returns:
+            Record: Ein Datensatz vom Typ `cls.Record`.
+        """
+        return cls(targets=targets, mode=mode, **given).to_record()
+
+    def to_record(self) -> 'Record':
+        """Liefert die Parameter dieses Objekts als kompakten Datensatz, siehe `Record`.
+
+        Im lazy-Modus werden dafür zuerst alle Parameter berechnet.
+
+        Returns:
+            Record: Ein Datensatz vom Typ `Record` dieser Klasse.
+        """
+        self.resolve_all()
+        values = vars(self)
+        return self.Record(**{param: values.get(param) for param in self.Record.params})
+
+    def resolve_all(self):
+        """Berechnet im lazy-Modus alle noch fehlenden Parameter.
+
+        Returns:
+            Solvable: self.
+        """
+        if self._lazy:
+            self._run(self._targets)
+        return self
+
+    def _set_given(self, given_params: dict, targets: Optional[Iterable[str]], mode: Optional[str] = None):
+        """Setzt die gegebenen Parameter und den Zustand des Solvers zurück.
+
+        Args:
+            given_params (dict): Gegebene Parameter.
+            targets (Optional[Iterable[str]]): Namen der gesuchten Parameter oder None für alle.
+            mode (Optional[str]): Rechenmodus oder None für den aktuellen Modus von `lib.numerik`.
+
+        Raises:
+            IncompatibleUnitsError: Wenn ein gegebener Wert eine andere Dimension hat als in `param_units`.
+        """
+        for param, value in self.default_params.items():
+            given_params.setdefault(param, value)
+        self._convert_given(given_params)
+
+        self._mode = numerik.current_mode() if mode is None else mode
+        if self._mode == numerik.ADAPTIVE:
+            self._exact_given = dict(given_params)
+        if self._mode != numerik.DECIMAL:
+            for param, value in given_params.items():
+                given_params[param] = numerik.to_float(value)
+
+        self._known = given_params
+        self._given = set(given_params.keys())
+        self._sources = {}
+        self._targets = None if targets is None else frozenset(targets)
+
+        for param in self.param_funcs.keys():
+            if param in given_params:
+                setattr(self, param, given_params[param])
+
+    def _convert_given(self, given_params: dict):
+        """Rechnet gegebene Werte mit Einheit in die Einheiten aus `param_units` um.
+
+        Args:
+            given_params (dict): Gegebene Parameter. Wird verändert.
+
+        Raises:
+            IncompatibleUnitsError: Wenn ein gegebener Wert eine andere Dimension hat als in `param_units`.
+        """
+        for param, value in given_params.items():
+            if param in self.param_units and unit_of(value) is not None:
+                given_params[param] = convert_unit(value, self.param_units[param])
+
+    def _run(self, targets: Optional[FrozenSet[str]]):
+        """Berechnet die gesuchten Parameter aus den bisher bekannten.
+
+        Args:
+            targets (Optional[FrozenSet[str]]): Namen der gesuchten Parameter oder None für alle.
+        """
+        self._evaluate_in_mode(lambda: self._replay(targets), targets)
+
+    def _evaluate_in_mode(self, evaluate: Callable[[], None], targets: Optional[FrozenSet[str]]):
+        """Führt `evaluate` im Rechenmodus dieses Objekts aus. Im Modus `numerik.ADAPTIVE` werden danach die Fälle, für
+        die eine Formel unzuverlässig war, mit Decimal neu gelöst."""
+        with numerik.numeric_mode(self._mode), numerik.collect_unreliable() as unreliable:
+            evaluate()
+        if self._mode == numerik.ADAPTIVE and len(unreliable) > 0:
+            self._escalate(unreliable, targets)
+
+    def _escalate(self, unreliable: List, targets: Optional[FrozenSet[str]]):
+        """Löst die unzuverlässigen Fälle vollständig mit Decimal aus den ursprünglich gegebenen Parametern und
+        übernimmt die Ergebnisse als floats.
+
+        Args:
+            unreliable (List): True oder bool-Masken der unzuverlässigen Fälle, siehe `numerik.collect_unreliable()`.
+            targets (Optional[FrozenSet[str]]): Namen der gesuchten Parameter oder None für alle.
+        """
+        computed = [param for param in self._known if param not in self._given]
+        arrays = [param for param in computed if numerik.is_array(self._known[param])]
+
+        if len(arrays) == 0:
+            exact = self._solve_exact(self._exact_given, targets)
+            for param in computed:
+                if param in exact._known:
+                    self._set_known(param, numerik.to_float(exact._known[param]))
+            return
+
+        np = numerik.np
+        shape = np.broadcast_shapes(*(np.shape(mask) for mask in unreliable), *(self._known[p].shape for p in arrays))
+        mask = np.zeros(shape, dtype=bool)
+        for cases in unreliable:
+            mask |= np.broadcast_to(cases, shape)
+
+        for param in arrays:
+            value = self._known[param]
+            if value.shape != shape or not value.flags.writeable:
+                self._set_known(param, np.array(np.broadcast_to(value, shape)))
 
-            # All params given, so calculate
+        # Listen mit dtype=object, damit gegebene Decimals nicht schon hier zu floats werden
+        exact_given = {
+            param: np.asarray(value, dtype=object) if isinstance(value, (list, tuple)) else value
+            for param, value in self._exact_given.items()
+        }
+        for index in zip(*np.nonzero(mask)):
+            exact = self._solve_exact(
+                {param: numerik.element(value, index, shape) for param, value in exact_given.items()}, targets
+            )
+            for param in arrays:
+                if param in exact._known:
+                    numerik.set_element(self._known[param], index, exact._known[param])
+
+    def _solve_exact(self, given_params: dict, targets: Optional[FrozenSet[str]]) -> 'Solvable':
+        """Löst einen einzelnen Fall mit Decimal in mindestens `numerik.ESCALATION_PRECISION` Stellen."""
+        exact = type(self).__new__(type(self))
+        with localcontext() as context:
+            context.prec = max(context.prec, numerik.ESCALATION_PRECISION)
+            exact.solve(
+                {param: numerik.to_decimal(value) for param, value in given_params.items()},
+                targets=targets, mode=numerik.DECIMAL
+            )
+        return exact
+
+    def _set_known(self, param: str, value):
+        self._known[param] = value
+        if param in self.param_funcs:
+            setattr(self, param, value)
+
+    def _replay(self, targets: Optional[FrozenSet[str]]):
+        """Wie `_run()`, aber ohne den Rechenmodus zu setzen.
+
+        Beim ersten Abspielen eines Plans mit bestimmten Einheiten der gegebenen Parameter rechnen die Formeln mit
+        Einheiten: Unverträgliche Summen und Formeln, deren berechnete Einheit nicht zur mit `return_unit` angegebenen
+        passt, lösen einen `IncompatibleUnitsError` aus, siehe `_evaluate()`. Geprüft werden nur Formeln, deren
+        Argumente alle Einheiten haben. Die Einheiten der Ergebnisse aller ausgewerteten Formeln werden dabei für den
+        Plan gespeichert, auch die der alternativen Formeln, wenn ein Schritt wie `rp` einer `TransferEllipse` je nach
+        Flugrichtung None liefert. Danach wird der Plan mit reinen Zahlen abgespielt, siehe `_replay_raw()`. Das ist
+        auch bei gegebenen Werten in anderen Einheiten wie m richtig, da `_set_given()` sie vorher in die Einheiten aus
+        `param_units` umrechnet.
+
+        >>> from bahnen.ellipse import Ellipse
+        >>> from lib.planet import ERDE
+        >>> from lib.unit_decimal import UnitDecimal
+        >>> [Ellipse(zentralgestirn=ERDE, rp=UnitDecimal(7_000_000, 'm'), ra=UnitDecimal(9000, 'km')).a == 8000
+        ...  for _ in range(2)]
+        [True, True]
+        >>> Ellipse(zentralgestirn=ERDE, rp=UnitDecimal(7000, 'km/s'), ra=UnitDecimal(9000, 'km'))
+        Traceback (most recent call last):
+        lib.unit_decimal.IncompatibleUnitsError: Got 'km/s', but expected 'km'
+
+        Ein Flug nach außen, bei dem `ra` und nicht `rp` aus dem Plan None liefert, wird ab dem zweiten Mal ebenfalls
+        mit reinen Zahlen gelöst:
+
+        >>> from unittest import mock
+        >>> from bahnen.transfer_ellipse import TransferEllipse
+        >>> from lib.planet import SONNE, MARS
+        >>> given = dict(zentralgestirn=SONNE, start_planet=ERDE, ziel_planet=MARS, epsilon=UnitDecimal('0.25', ''))
+        >>> first = TransferEllipse(**given)
+        >>> replay_raw, results = TransferEllipse._replay_raw, []
+        >>> with mock.patch.object(TransferEllipse, '_replay_raw',
+        ...                        lambda *args: results.append(replay_raw(*args)) or results[-1]):
+        ...     second = TransferEllipse(**given)
+        >>> results, first.to_dict() == second.to_dict()
+        ([True], True)
+        """
+        known = self._known
+        plan = self.solve_plan(self._given, self._targets)
+        if targets == self._targets:
+            units_key = (id(plan), frozenset((param, unit_of(known[param])) for param in self._given))
+            units = self._plan_units.get(units_key)
+        else:
+            # Zugriff im lazy-Modus: Ausschnitt des Plans, der nur einmal und daher immer mit Einheiten abgespielt wird
+            plan = tuple(formula for formula in self._slice_plan(plan, targets) if formula.param not in known)
+            units_key = units = None
+
+        relevant = None if targets is None else self._relevant_params(targets)
+        if units is not None and not tracing.get_sink().enabled and self._replay_raw(plan, units, relevant):
+            return
+
+        # Plan abspielen. Liefert eine Formel zur Laufzeit None, wird der Parameter übersprungen und unten über die
+        # alternativen Formeln gesucht.
+        complete = True
+        for formula in plan:
+            if not all(arg in known for arg in formula.args) or not self._evaluate(formula, known):
+                complete = False
+        if not complete:
+            self._worklist(known.keys(), lambda formula: self._evaluate(formula, known), relevant=relevant)
+
+        if units_key is not None:
+            # Neues dict statt Änderung, damit gleichzeitig lesende Threads nie ein halb erweitertes sehen
+            merged = dict(self._plan_units.get(units_key, {}))
+            merged.update((formula, unit_of(known[formula.param])) for formula in self._sources.values())
+            self._plan_units[units_key] = merged
+
+    def _replay_raw(
+            self, plan: Tuple[Formula, ...], units: Mapping[Formula, Optional[Unit]], relevant: Optional[Set[str]]
+    ) -> bool:
+        """Spielt einen Plan mit reinen Zahlen ab, ohne Wrapper von `return_unit` und ohne Einheitenrechnung, und hängt
+        die Einheiten erst an die fertigen Ergebnisse an. Liefert eine Formel None, werden wie in `_replay()` die
+        alternativen Formeln über die Worklist gesucht, ebenfalls mit reinen Zahlen.
+
+        Args:
+            plan (Tuple[Formula, ...]): Der Plan.
+            units (Mapping[Formula, Optional[Unit]]): Einheit des Ergebnisses jeder bisher ausgewerteten Formel oder None
+                für Werte ohne Einheit.
+            relevant (Optional[Set[str]]): Parameter, die über die Worklist gesucht werden, oder None für alle.
+
+        Returns:
+            bool: False, wenn eine Formel ein Ergebnis geliefert hat, deren Einheit nicht in `units` steht. Dann wurde
+            nichts gesetzt und der Fall muss mit Einheiten gelöst werden.
+        """
+        values = {param: without_unit(value) for param, value in self._known.items()}
+        # Gegebene Werte wie Planeten, die Formeln unverändert weiterreichen, werden wieder zum Original
+        originals = {id(values[param]): value for param, value in self._known.items() if values[param] is not value}
+        computed = []
+
+        def evaluate(formula: Formula) -> bool:
+            required_kwargs = {arg: values[arg] for arg in formula.args}
+            if formula_cache.enabled:
+                result = formula_cache.call(formula.raw_func, **required_kwargs)
+            else:
+                result = formula.raw_func(**required_kwargs)
+            if result is None:
+                return False
+            if formula not in units:
+                raise _UnknownUnit()
+            values[formula.param] = result
+            computed.append(formula)
+            return True
+
+        try:
+            with units_detached():
+                complete = True
+                for formula in plan:
+                    if not all(arg in values for arg in formula.args) or not evaluate(formula):
+                        complete = False
+                if not complete:
+                    self._worklist(values.keys(), evaluate, relevant=relevant)
+        except _UnknownUnit:
+            return False
+
+        for formula in computed:
+            result = values[formula.param]
+            unit = units[formula]
+            if unit is None:
+                result = originals.get(id(result), result)
+            else:
+                result = with_unit(result, unit)
+            self._set_known(formula.param, result)
+            self._sources[formula.param] = formula
+        return True
+
+    def _evaluate(self, formula: Formula, given_params: dict) -> bool:
+        """Wertet eine Formel aus und setzt bei Erfolg den berechneten Parameter.
+
+        Haben alle Zahlen unter den Argumenten eine Einheit, wird die Einheit, die die Formel ohne den Wrapper von
+        `return_unit` berechnet, mit der angegebenen verglichen, siehe `convert_unit()`.
+
+        Args:
+            formula (Formula): Auszuwertende Formel.
+            given_params (dict): Bekannte Parameter. Wird um das Ergebnis erweitert.
+
+        Raises:
+            IncompatibleUnitsError: Wenn die berechnete Einheit eine andere Dimension als die angegebene hat.
+
+        Returns:
+            bool: False, wenn die Formel None geliefert hat.
+        """
+        required_kwargs = {arg: given_params[arg] for arg in formula.args}
+        checked = formula.unit is not None and all(_has_unit(value) for value in required_kwargs.values())
+        func = formula.raw_func if checked else formula.func
+        if formula_cache.enabled:
+            result = formula_cache.call(func, **required_kwargs)
+        else:
             result = func(**required_kwargs)
+        if checked and result is not None:
+            result = convert_unit(result, formula.unit)
+
+        # If none, this result should be ignored
+        if result is None:
+            return False
+
+        sink = tracing.get_sink()
+        if sink.enabled:
+            sink.record(TraceStep(
+                parameter=formula.param, result=result, function=formula.name, arguments=required_kwargs
+            ))
+        setattr(self, formula.param, result)
+        given_params[formula.param] = result
+        self._sources[formula.param] = formula
+        return True
 
-            # If none, this result should be ignored
+    def check_consistency(
+            self, tolerance: float = CONSISTENCY_TOLERANCE, max_workers: int = 1
+    ) -> List[Disagreement]:
+        """Wertet für jeden bekannten Parameter alle anderen Formeln aus, deren Argumente bekannt sind, und meldet die,
+        deren Ergebnis um mehr als `tolerance` vom verwendeten Wert abweicht.
+
+        So werden Widersprüche in den Formeln sichtbar, etwa durch das Runden der numerischen Exzentrizität auf
+        `konstanten.EPSILON_PRECISION`. Die Formeln werden nacheinander im Rechenmodus dieses Objekts ausgewertet, da
+        die Formeln für einen Thread-Pool zu kurz sind. Viele Fälle prüft `check_consistency_batch()` in mehreren
+        Prozessen. Formeln, die None liefern oder an einem Definitionsbereich scheitern, werden übersprungen. Im
+        lazy-Modus werden zuerst alle Parameter berechnet.
+
+        >>> from decimal import getcontext
+        >>> getcontext().prec = 128
+        >>> from bahnen.ellipse import Ellipse
+        >>> from lib.planet import ERDE
+        >>> from lib.unit_decimal import UnitDecimal
+        >>> ellipse = Ellipse(zentralgestirn=ERDE, rp=UnitDecimal(7000, 'km'), ra=UnitDecimal(9100, 'km'))
+        >>> sorted({(d.param, d.formula) for d in ellipse.check_consistency()})[:2]
+        [('a', 'grosse_halbachse_p_epsilon'), ('ra', 'apozentrum_radius_a_epsilon')]
+
+        Args:
+            tolerance (float): Größter erlaubter relativer Unterschied.
+            max_workers (int): Anzahl an Threads. Erst mit mehr als 1 wird in einem Thread-Pool ausgewertet.
+
+        Returns:
+            List[Disagreement]: Die Widersprüche, nach Parameter und Formel in Deklarationsreihenfolge.
+        """
+        self.resolve_all()
+        known = self._known
+        checks = [
+            (param, formula)
+            for param in self.param_funcs.keys() if param in known
+            for formula in self.formula_index[param]
+            if formula is not self._sources.get(param) and all(arg in known for arg in formula.args)
+        ]
+
+        if max_workers <= 1:
+            with numerik.numeric_mode(self._mode):
+                results = [self._evaluate_alternative(formula, known) for param, formula in checks]
+        else:
+            # Jede Formel in einer eigenen Kopie des Kontexts, damit Rechenmodus und Decimal-Präzision in den Threads
+            # gelten
+            with numerik.numeric_mode(self._mode):
+                contexts = [contextvars.copy_context() for _ in checks]
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [
+                    executor.submit(context.run, self._evaluate_alternative, formula, known)
+                    for context, (param, formula) in zip(contexts, checks)
+                ]
+                results = [future.result() for future in futures]
+
+        disagreements = []
+        for (param, formula), result in zip(checks, results):
             if result is None:
                 continue
+            difference = numerik.relative_difference(without_unit(known[param]), without_unit(result))
+            if difference > tolerance:
+                source = self._sources.get(param)
+                disagreements.append(Disagreement(
+                    param=param, used=None if source is None else source.name, value=known[param],
+                    formula=formula.name, formula_value=result, difference=difference
+                ))
+        return disagreements
+
+    @classmethod
+    def check_consistency_batch(
+            cls, cases: Iterable[dict], tolerance: float = CONSISTENCY_TOLERANCE, max_workers: Optional[int] = None,
+            chunksize: int = 16
+    ) -> List[List[Disagreement]]:
+        """Löst viele Fälle und prüft jeden mit `check_consistency()`, verteilt auf einen Pool von Prozessen.
+
+        Die Prozesse übernehmen die Decimal-Präzision und den Rechenmodus des aufrufenden Prozesses. Die Fälle und die
+        Ergebnisse müssen sich mit pickle übertragen lassen.
+
+        Args:
+            cases (Iterable[dict]): Die gegebenen Parameter je Fall.
+            tolerance (float): Größter erlaubter relativer Unterschied.
+            max_workers (Optional[int]): Anzahl an Prozessen. Ohne so viele wie Prozessoren.
+            chunksize (int): Anzahl an Fällen, die ein Prozess auf einmal erhält.
+
+        Returns:
+            List[List[Disagreement]]: Die Widersprüche je Fall in der Reihenfolge von `cases`.
+        """
+        with ProcessPoolExecutor(
+                max_workers=max_workers, initializer=_init_worker,
+                initargs=(getcontext().prec, numerik.current_mode())
+        ) as executor:
+            return list(executor.map(partial(_check_case, cls, tolerance), cases, chunksize=chunksize))
+
+    @staticmethod
+    def _evaluate_alternative(formula: Formula, known: dict):
+        try:
+            return formula.func(**{arg: known[arg] for arg in formula.args})
+        except IncompatibleUnitsError:
+            raise
+        except (ArithmeticError, ValueError):
+            return None
+
+    def update(self, **changes):
+        """Ändert gegebene Parameter eines gelösten Objekts und berechnet nur die davon abhängigen Parameter neu.
+
+        Geänderte Parameter gelten danach als gegeben, auch wenn sie vorher berechnet wurden. Wie in `solve()` werden
+        sie in die Einheiten aus `param_units` umgerechnet. Danach werden auch Parameter berechnet, die erst durch die
+        Änderung berechenbar werden.
+
+        >>> from decimal import getcontext
+        >>> getcontext().prec = 128
+        >>> from bahnen.ellipse import Ellipse
+        >>> from lib.planet import ERDE
+        >>> from lib.unit_decimal import UnitDecimal
+        >>> ellipse = Ellipse(zentralgestirn=ERDE, rp=UnitDecimal(7000, 'km'), ra=UnitDecimal(9000, 'km'))
+        >>> ellipse.a
+        8000.000 km
+        >>> sorted(ellipse.update(ra=UnitDecimal(11000, 'km')))
+        ['a', 'b', 'e', 'epsilon', 'p', 'umlaufzeit', 'va', 'vp']
+        >>> ellipse.a
+        9000.000 km
+        >>> ellipse.update(ra=UnitDecimal(13_000_000, 'm')) >= {'a', 'b'}
+        True
+        >>> ellipse.ra, ellipse.a
+        (13000.000 km, 10000.000 km)
+        >>> ellipse = Ellipse(zentralgestirn=ERDE, rp=UnitDecimal(7000, 'km'))
+        >>> 'a' in ellipse.to_dict()
+        False
+        >>> sorted(ellipse.update(ra=UnitDecimal(9000, 'km')))
+        ['a', 'b', 'e', 'epsilon', 'p', 'umlaufzeit', 'va', 'vp']
+        >>> ellipse.a
+        8000.000 km
+
+        Args:
+            **changes: Die neuen Werte der Parameter.
+
+        Returns:
+            Set[str]: Namen der neu berechneten Parameter.
+        """
+        changes = dict(changes)
+        self._convert_given(changes)
+
+        # Vorwärtsindex der tatsächlich verwendeten Formeln: Argument -> daraus berechnete Parameter
+        derived_from: Dict[str, List[str]] = {}
+        for param, formula in self._sources.items():
+            for arg in formula.args:
+                derived_from.setdefault(arg, []).append(param)
+
+        invalid = set()
+        pending = list(changes.keys())
+        while len(pending) > 0:
+            for param in derived_from.get(pending.pop(), ()):
+                if param not in invalid and param not in changes:
+                    invalid.add(param)
+                    pending.append(param)
+
+        for param in invalid:
+            del self._known[param]
+            del self._sources[param]
+            if param in vars(self):
+                delattr(self, param)
+
+        for param, value in changes.items():
+            if self._mode == numerik.ADAPTIVE:
+                self._exact_given[param] = value
+            if self._mode != numerik.DECIMAL:
+                value = numerik.to_float(value)
+            self._known[param] = value
+            self._given.add(param)
+            self._sources.pop(param, None)
+            if param in self.param_funcs:
+                setattr(self, param, value)
+
+        # Nicht nur die ungültigen Parameter, sondern alle noch fehlenden, die nun erreichbar sind
+        before = set(self._known.keys())
+        relevant = None if self._targets is None else self._relevant_params(self._targets)
+        self._evaluate_in_mode(lambda: self._worklist(
+            self._known.keys(), lambda formula: self._evaluate(formula, self._known), relevant=relevant
+        ), self._targets)
+        return {param for param in self._known if param not in before}
+
+    def to_dict(self) -> dict:
+        """Liefert alle bekannten Parameter, die in `param_funcs` vorkommen.
+
+        Im lazy-Modus werden dafür zuerst alle Parameter berechnet.
 
-            output = {
-                'parameter': param,
-                'result': result,
-                'function': {
-                    'name': func.__name__,
-                    'parameter': [
-                        {key: value for key, value in required_kwargs.items()}
-                    ]
-                }
-            }
-            print(json.dumps(output, indent='  ', default=str, ensure_ascii=False))
-            return result
-
-        return None
+        Returns:
+            dict: {Name des Parameters: Wert}.
+        """
+        self.resolve_all()
+        return {key: value for key, value in vars(self).items() if not key.startswith('_')}
 
     def __str__(self):
         key_value_pairs = map(
-            lambda item: f'{str(item[0])} = {str(item[1])}', vars(self).items())
+            lambda item: f'{str(item[0])} = {str(item[1])}', self.to_dict().items())
         return '{\n' + '\n'.join(f'  {x}' for x in key_value_pairs) + '\n}'
@@ -0,0 +1,126 @@
+"""Löst eine `Solvable`-Klasse für alle Kombinationen eines Parameterrasters, verteilt auf einen Pool von Prozessen.
+
+Das Raster wird in Blöcke aufgeteilt, die die Prozesse nacheinander lösen. Die Ergebnisse kommen als kompakte
+Datensätze (`Solvable.Record`) in der Reihenfolge des Rasters zurück, unabhängig von der Anzahl der Prozesse und der
+Reihenfolge, in der die Blöcke fertig werden. Jeder Prozess rechnet mit der Decimal-Präzision und dem Rechenmodus des
+aufrufenden Prozesses, sodass das Ergebnis auch nicht davon abhängt, wie die Fälle verteilt werden.
+"""
+import itertools
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from decimal import getcontext
+from typing import Iterable, Iterator, List, Mapping, Optional, Type
+
+from lib import numerik
+from lib.solvable import Record, Solvable
+
+
+def grid_cases(grid: Mapping[str, Iterable], **fixed) -> Iterator[dict]:
+    """Liefert alle Kombinationen der Werte im Raster als gegebene Parameter. Der letzte Parameter im Raster ändert sich
+    am schnellsten.
+
+    >>> [case['rp'] for case in grid_cases({'ra': [9000, 9500], 'rp': [7000, 8000]}, zentralgestirn='Erde')]
+    [7000, 8000, 7000, 8000]
+
+    Args:
+        grid (Mapping[str, Iterable]): Werte je Parameter.
+        **fixed: Parameter, die für alle Fälle gleich sind.
+
+    Returns:
+        Iterator[dict]: Die gegebenen Parameter je Fall.
+    """
+    params = list(grid.keys())
+    for values in itertools.product(*(list(grid[param]) for param in params)):
+        yield {**fixed, **dict(zip(params, values))}
+
+
+def _warm_up(solvable_class: Type[Solvable], given: Iterable[str], targets: Optional[Iterable[str]]):
+    given = set(given) | set(solvable_class.default_params.keys())
+    solvable_class.solve_plan(given, targets)
+
+
+def _init_worker(
+        precision: int, mode: str, solvable_class: Type[Solvable], given: List[str], targets: Optional[List[str]]
+):
+    """Übernimmt Präzision und Rechenmodus und kompiliert den Lösungsplan, bevor der Prozess den ersten Block erhält."""
+    getcontext().prec = precision
+    numerik.set_default_mode(mode)
+    _warm_up(solvable_class, given, targets)
+
+
+def _solve_chunk(
+        solvable_class: Type[Solvable], targets: Optional[List[str]], mode: Optional[str], cases: List[dict]
+) -> List[Record]:
+    return [solvable_class.solve_record(targets=targets, mode=mode, **case) for case in cases]
+
+
+def _chunks(cases: Iterable[dict], chunksize: int) -> Iterator[List[dict]]:
+    iterator = iter(cases)
+    while True:
+        chunk = list(itertools.islice(iterator, chunksize))
+        if len(chunk) == 0:
+            return
+        yield chunk
+
+
+def sweep(
+        solvable_class: Type[Solvable], grid: Mapping[str, Iterable], targets: Optional[Iterable[str]] = None,
+        mode: Optional[str] = None, max_workers: Optional[int] = None, chunksize: int = 64, **fixed
+) -> Iterator[Record]:
+    """Löst die Klasse für alle Kombinationen des Rasters, siehe `grid_cases()`, und liefert die Ergebnisse in
+    dieser Reihenfolge, sobald sie vorliegen.
+
+    Es sind höchstens doppelt so viele Blöcke gleichzeitig unterwegs wie Prozesse, sodass auch sehr große Raster
+    nicht vollständig im Speicher liegen. Scheitert ein Fall, wird die Ausnahme beim Abrufen seines Ergebnisses
+    ausgelöst.
+
+    >>> from decimal import getcontext
+    >>> getcontext().prec = 128
+    >>> from bahnen.ellipse import Ellipse
+    >>> from lib.planet import ERDE
+    >>> from lib.unit_decimal import UnitDecimal
+    >>> grid = {'rp': [UnitDecimal(rp, 'km') for rp in (7000, 7500, 8000)], 'ra': [UnitDecimal(9000, 'km')]}
+    >>> [record.a for record in sweep(Ellipse, grid, max_workers=2, chunksize=2, zentralgestirn=ERDE)]
+    [8000.000 km, 8250.000 km, 8500.000 km]
+
+    Args:
+        solvable_class (Type[Solvable]): Die Klasse, z.B. `TransferEllipse`.
+        grid (Mapping[str, Iterable]): Werte je Parameter. Werte und Ergebnisse müssen sich mit pickle übertragen
+            lassen.
+        targets (Optional[Iterable[str]]): Namen der gesuchten Parameter. Ohne werden alle Parameter berechnet.
+        mode (Optional[str]): Rechenmodus, siehe `lib.numerik`. Ohne gilt der aktuelle Modus.
+        max_workers (Optional[int]): Anzahl an Prozessen. Ohne so viele wie Prozessoren, mit 1 ohne Pool im
+            aufrufenden Prozess.
+        chunksize (int): Anzahl an Fällen je Block.
+        **fixed: Parameter, die für alle Fälle gleich sind.
+
+    Returns:
+        Iterator[Record]: Ein Datensatz je Fall, in der Reihenfolge des Rasters.
+    """
+    if chunksize < 1:
+        raise ValueError('chunksize muss mindestens 1 sein.')
+    targets = None if targets is None else sorted(targets)
+    mode = numerik.current_mode() if mode is None else mode
+    given = sorted(set(grid.keys()) | set(fixed.keys()))
+    chunks = _chunks(grid_cases(grid, **fixed), chunksize)
+    max_workers = (os.cpu_count() or 1) if max_workers is None else max_workers
+
+    if max_workers == 1:
+        for chunk in chunks:
+            yield from _solve_chunk(solvable_class, targets, mode, chunk)
+        return
+
+    # Im aufrufenden Prozess kompilierte Pläne erben die Prozesse beim Start per fork
+    _warm_up(solvable_class, given, targets)
+    with ProcessPoolExecutor(
+            max_workers=max_workers, initializer=_init_worker,
+            initargs=(getcontext().prec, mode, solvable_class, given, targets)
+    ) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_solve_chunk, solvable_class, targets, mode, chunk))
+            if len(pending) >= 2 * max_workers:
+                yield from pending.popleft().result()
+        while len(pending) > 0:
+            yield from pending.popleft().result()
@@ -0,0 +1,206 @@
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, TextIO
+
+
+@dataclass(frozen=True)
+class TraceStep:
+    """Herkunft eines abgeleiteten Parameters."""
+
+    parameter: str
+    """Name des berechneten Parameters."""
+    result: Any
+    """Berechneter Wert."""
+    function: str
+    """Name der Formel, mit der der Wert berechnet wurde."""
+    arguments: Dict[str, Any]
+    """Argumente, mit denen die Formel aufgerufen wurde."""
+
+    def to_json_dict(self) -> dict:
+        """Liefert den Schritt in der Struktur, in der er als JSON ausgegeben wird."""
+        return {
+            'parameter': self.parameter,
+            'result': self.result,
+            'function': {
+                'name': self.function,
+                'parameter': [self.arguments]
+            }
+        }
+
+
+class TraceSink:
+    """Empfängt die Schritte des Solvers und Meldungen der Berechnungen.
+
+    Der Solver erzeugt Schritte nur, wenn `enabled` True ist. Ist der Null-Sink aktiv, entsteht daher kein Aufwand.
+    """
+
+    enabled: bool = True
+    """Gibt an, ob der Sink Schritte und Meldungen entgegennimmt."""
+
+    def record(self, step: TraceStep):
+        """Nimmt einen Schritt des Solvers entgegen.
+
+        Args:
+            step (TraceStep): Der Schritt.
+        """
+        raise NotImplementedError
+
+    def message(self, text: str):
+        """Nimmt eine Meldung einer Berechnung entgegen.
+
+        Args:
+            text (str): Die Meldung.
+        """
+        raise NotImplementedError
+
+
+class NullSink(TraceSink):
+    """Verwirft alles. Standard-Sink."""
+
+    enabled = False
+
+    def record(self, step: TraceStep):
+        pass
+
+    def message(self, text: str):
+        pass
+
+
+class ListSink(TraceSink):
+    """Sammelt Schritte und Meldungen in Listen."""
+
+    def __init__(self):
+        self.steps: List[TraceStep] = []
+        self.messages: List[str] = []
+
+    def record(self, step: TraceStep):
+        self.steps.append(step)
+
+    def message(self, text: str):
+        self.messages.append(text)
+
+
+class JsonlFileSink(TraceSink):
+    """Schreibt jeden Schritt und jede Meldung als eine JSON-Zeile in eine Datei."""
+
+    def __init__(self, file: TextIO):
+        """
+        Args:
+            file (TextIO): Geöffnete Datei, in die geschrieben wird. Wird nicht vom Sink geschlossen.
+        """
+        self.file = file
+
+    @staticmethod
+    def open(path: str) -> 'JsonlFileSink':
+        """Öffnet die Datei unter `path` zum Anhängen.
+
+        Args:
+            path (str): Pfad der Datei.
+
+        Returns:
+            JsonlFileSink: Sink, dessen Datei mit `close()` geschlossen werden muss.
+        """
+        return JsonlFileSink(open(path, 'a', encoding='utf-8'))
+
+    def record(self, step: TraceStep):
+        self.file.write(json.dumps(step.to_json_dict(), default=str, ensure_ascii=False) + '\n')
+
+    def message(self, text: str):
+        self.file.write(json.dumps({'message': text}, ensure_ascii=False) + '\n')
+
+    def close(self):
+        self.file.close()
+
+
+class CallbackSink(TraceSink):
+    """Ruft für jeden Schritt und jede Meldung eine Funktion auf."""
+
+    def __init__(self, on_step: Callable[[TraceStep], Any], on_message: Optional[Callable[[str], Any]] = None):
+        """
+        Args:
+            on_step (Callable[[TraceStep], Any]): Wird für jeden Schritt aufgerufen.
+            on_message (Optional[Callable[[str], Any]]): Wird für jede Meldung aufgerufen. Ohne werden Meldungen
+                verworfen.
+        """
+        self.on_step = on_step
+        self.on_message = on_message
+
+    def record(self, step: TraceStep):
+        self.on_step(step)
+
+    def message(self, text: str):
+        if self.on_message is not None:
+            self.on_message(text)
+
+
+class PrintSink(TraceSink):
+    """Gibt Schritte als eingerücktes JSON und Meldungen auf stdout aus. Wird von den interaktiven main()-Funktionen
+    verwendet."""
+
+    def record(self, step: TraceStep):
+        print(json.dumps(step.to_json_dict(), indent='  ', default=str, ensure_ascii=False))
+
+    def message(self, text: str):
+        print(text)
+
+
+NULL_SINK = NullSink()
+
+# ContextVar statt globaler Variable, damit jeder Thread bzw. jeder asyncio-Task seinen eigenen Sink hat. Neue
+# Threads starten mit dem Null-Sink.
+_sink: ContextVar[TraceSink] = ContextVar('sink', default=NULL_SINK)
+
+
+def get_sink() -> TraceSink:
+    """Liefert den aktiven Sink des aktuellen Threads."""
+    return _sink.get()
+
+
+def set_sink(sink: TraceSink) -> TraceSink:
+    """Setzt den aktiven Sink des aktuellen Threads.
+
+    Args:
+        sink (TraceSink): Der neue Sink.
+
+    Returns:
+        TraceSink: Der bisher aktive Sink.
+    """
+    previous = _sink.get()
+    _sink.set(sink)
+    return previous
+
+
+@contextmanager
+def use_sink(sink: TraceSink):
+    """Aktiviert `sink` für die Dauer des with-Blocks.
+
+    >>> from bahnen.ellipse import Ellipse
+    >>> from lib.planet import ERDE
+    >>> from lib import tracing
+    >>> sink = tracing.ListSink()
+    >>> with tracing.use_sink(sink):
+    ...     ellipse = Ellipse(zentralgestirn=ERDE, rp=ERDE.R + 200, ra=ERDE.R + 1000)
+    >>> next(step.function for step in sink.steps if step.parameter == 'a')
+    'grosse_halbachse_ra_rp'
+
+    Args:
+        sink (TraceSink): Der Sink.
+    """
+    previous = set_sink(sink)
+    try:
+        yield sink
+    finally:
+        set_sink(previous)
+
+
+def message(text: str):
+    """Gibt eine Meldung an den aktiven Sink weiter.
+
+    Args:
+        text (str): Die Meldung.
+    """
+    sink = _sink.get()
+    if sink.enabled:
+        sink.message(text)
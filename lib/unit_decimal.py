@@ -1,41 +1,594 @@
+import dataclasses
+import math
+import re
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
 from functools import wraps
 from decimal import Decimal
+from typing import Dict, Tuple, Union
 
+from lib.numerik import is_array
 
-class UnitDecimal(Decimal):
-    """A typed Decimal, i.e. a Decimal with a unit."""
 
-    output_decimal_points: int = 3
+class IncompatibleUnitsError(ValueError):
+    """Raised when values with incompatible dimensions are added, subtracted or raised to a power."""
+
+
+class Dimension:
+    """The dimension of a unit as a vector of integer exponents over length, time, mass and angle.
+
+    Dimensions are interned, so two dimensions are equal if and only if they are the same object.
+
+    >>> Dimension.of(1, -1, 0, 0) is Dimension.of(1, 0, 0, 0) / Dimension.of(0, 1, 0, 0)
+    True
+    """
+
+    __slots__ = ('exponents', '__weakref__')
+
+    exponents: Tuple[int, int, int, int]
+    """Exponents of length (km), time (s), mass (kg) and angle (rad)."""
+
+    _interned: Dict[Tuple[int, ...], 'Dimension'] = {}
+
+    @classmethod
+    def of(cls, length: int = 0, time: int = 0, mass: int = 0, angle: int = 0) -> 'Dimension':
+        """Returns the interned dimension with the given exponents."""
+        exponents = (length, time, mass, angle)
+        dimension = cls._interned.get(exponents)
+        if dimension is None:
+            dimension = object.__new__(cls)
+            dimension.exponents = exponents
+            dimension = cls._interned.setdefault(exponents, dimension)
+        return dimension
+
+    def __mul__(self, other: 'Dimension') -> 'Dimension':
+        return Dimension.of(*(a + b for a, b in zip(self.exponents, other.exponents)))
+
+    def __truediv__(self, other: 'Dimension') -> 'Dimension':
+        return Dimension.of(*(a - b for a, b in zip(self.exponents, other.exponents)))
+
+    def __pow__(self, exponent: int) -> 'Dimension':
+        return Dimension.of(*(a * exponent for a in self.exponents))
+
+    def root(self, n: int) -> 'Dimension':
+        """Returns the n-th root of this dimension.
+
+        :raises IncompatibleUnitsError: If an exponent is not divisible by n.
+        """
+        if any(a % n != 0 for a in self.exponents):
+            raise IncompatibleUnitsError(f'Cannot take the {n}-th root of dimension {self}')
+        return Dimension.of(*(a // n for a in self.exponents))
+
+    @property
+    def is_dimensionless(self) -> bool:
+        return self is DIMENSIONLESS
+
+    @property
+    def is_angle(self) -> bool:
+        return self is ANGLE
+
+    def __repr__(self):
+        return f'Dimension{self.exponents}'
+
+
+DIMENSIONLESS = Dimension.of()
+ANGLE = Dimension.of(angle=1)
+
+_BASE_UNITS: Dict[str, Tuple[Dimension, float]] = {
+    'km': (Dimension.of(length=1), 1.0),
+    'm': (Dimension.of(length=1), 1e-3),
+    's': (Dimension.of(time=1), 1.0),
+    'min': (Dimension.of(time=1), 60.0),
+    'h': (Dimension.of(time=1), 3600.0),
+    'd': (Dimension.of(time=1), 86400.0),
+    'a': (Dimension.of(time=1), 365.2422 * 86400.0),
+    'kg': (Dimension.of(mass=1), 1.0),
+    't': (Dimension.of(mass=1), 1e3),
+    'rad': (ANGLE, 1.0),
+    '°': (ANGLE, math.pi / 180),
+    '%': (DIMENSIONLESS, 1e-2),
+}
+"""Known unit symbols with their dimension and their factor relative to km, s, kg and rad."""
+
+_SUPERSCRIPTS = str.maketrans('⁰¹²³⁴⁵⁶⁷⁸⁹⁻', '0123456789-')
+_FACTOR_PATTERN = re.compile(r'^(?P<symbol>[^\d⁰¹²³⁴⁵⁶⁷⁸⁹⁻^]+)(?:\^?(?P<exponent>-?\d+)|(?P<superscript>[⁰¹²³⁴⁵⁶⁷⁸⁹⁻]+))?$')
+
+
+class Unit:
+    """A unit, i.e. a symbol for display together with its interned dimension.
+
+    Units are interned by symbol. Products, quotients and powers of units are cached, so arithmetic on values with
+    units costs a dictionary lookup after the first time.
+
+    >>> Unit.parse('km³/s²') * Unit.parse('s') ** 2 / Unit.parse('km') ** 2
+    Unit('km')
+    >>> Unit.parse('km') / Unit.parse('a')
+    Unit('km/a')
+    """
+
+    __slots__ = ('symbol', 'dimension', 'factor', '__weakref__')
+
+    symbol: str
+    """Symbol of the unit, e.g. `'km/s'`."""
+    dimension: Dimension
+    """Dimension of the unit."""
+    factor: float
+    """Size of the unit relative to the base units km, s, kg and rad, e.g. 3600 for `'h'`."""
+
+    _by_symbol: Dict[str, 'Unit'] = {}
+    _by_dimension: Dict[Tuple[Dimension, float], 'Unit'] = {}
+    _operations: Dict[tuple, 'Unit'] = {}
+
+    @classmethod
+    def parse(cls, symbol: Union[str, 'Unit']) -> 'Unit':
+        """Returns the interned unit with the given symbol, e.g. `'km/s'`, `'km³/s²'` or `'°/d'`.
+
+        :raises ValueError: If the symbol contains an unknown unit.
+        """
+        if isinstance(symbol, Unit):
+            return symbol
+        unit = cls._by_symbol.get(symbol)
+        if unit is None:
+            unit = cls._register(symbol, *cls._parse_symbol(symbol))
+        return unit
+
+    @staticmethod
+    def _parse_symbol(symbol: str) -> Tuple[Dimension, float]:
+        dimension = DIMENSIONLESS
+        factor = 1.0
+        for i, part in enumerate(symbol.split('/')):
+            sign = 1 if i == 0 else -1
+            for factor_symbol in re.split(r'[·*]', part.strip()):
+                if factor_symbol.strip() in ('', '1'):
+                    continue
+                match = _FACTOR_PATTERN.match(factor_symbol.strip())
+                if match is None or match['symbol'] not in _BASE_UNITS:
+                    raise ValueError(f'Unknown unit {factor_symbol!r} in {symbol!r}')
+                base_dimension, base_factor = _BASE_UNITS[match['symbol']]
+                exponent_text = match['exponent'] or (match['superscript'] or '1').translate(_SUPERSCRIPTS)
+                exponent = sign * int(exponent_text)
+                dimension = dimension * base_dimension ** exponent
+                factor *= base_factor ** exponent
+        return dimension, factor
+
+    @classmethod
+    def _register(cls, symbol: str, dimension: Dimension, factor: float) -> 'Unit':
+        unit = object.__new__(cls)
+        unit.symbol = symbol
+        unit.dimension = dimension
+        unit.factor = factor
+        unit = cls._by_symbol.setdefault(symbol, unit)
+        cls._by_dimension.setdefault((dimension, cls._factor_key(factor)), unit)
+        return unit
+
+    @staticmethod
+    def _factor_key(factor: float) -> float:
+        return float(f'{factor:.12g}')
+
+    @classmethod
+    def _derived(cls, dimension: Dimension, factor: float, symbol: str) -> 'Unit':
+        """Returns a known unit with this dimension and factor, or else a new unit with the given symbol."""
+        unit = cls._by_dimension.get((dimension, cls._factor_key(factor)))
+        if unit is not None:
+            return unit
+        if cls._factor_key(factor) == 1.0:
+            symbol = cls._base_symbol(dimension)
+        return cls._by_symbol.get(symbol) or cls._register(symbol, dimension, factor)
+
+    @staticmethod
+    def _base_symbol(dimension: Dimension) -> str:
+        superscripts = str.maketrans('0123456789-', '⁰¹²³⁴⁵⁶⁷⁸⁹⁻')
+
+        def power(base: str, exponent: int) -> str:
+            return base if exponent == 1 else base + str(exponent).translate(superscripts)
+
+        bases = ('km', 's', 'kg', 'rad')
+        numerator = '·'.join(power(b, e) for b, e in zip(bases, dimension.exponents) if e > 0)
+        denominator = '·'.join(power(b, -e) for b, e in zip(bases, dimension.exponents) if e < 0)
+        if denominator == '':
+            return numerator
+        return (numerator or '1') + '/' + denominator
+
+    def __mul__(self, other: 'Unit') -> 'Unit':
+        if other is DIMENSIONLESS_UNIT:
+            return self
+        if self is DIMENSIONLESS_UNIT:
+            return other
+        key = ('*', self, other)
+        unit = Unit._operations.get(key)
+        if unit is None:
+            unit = Unit._operations[key] = Unit._derived(
+                self.dimension * other.dimension, self.factor * other.factor, f'{self.symbol}·{other.symbol}'
+            )
+        return unit
+
+    def __truediv__(self, other: 'Unit') -> 'Unit':
+        if other is DIMENSIONLESS_UNIT:
+            return self
+        key = ('/', self, other)
+        unit = Unit._operations.get(key)
+        if unit is None:
+            numerator = self.symbol or '1'
+            denominator = f'({other.symbol})' if '/' in other.symbol or '·' in other.symbol else other.symbol
+            unit = Unit._operations[key] = Unit._derived(
+                self.dimension / other.dimension, self.factor / other.factor, f'{numerator}/{denominator}'
+            )
+        return unit
+
+    def __pow__(self, exponent: int) -> 'Unit':
+        key = ('**', self, exponent)
+        unit = Unit._operations.get(key)
+        if unit is None:
+            superscript = str(exponent).translate(str.maketrans('0123456789-', '⁰¹²³⁴⁵⁶⁷⁸⁹⁻'))
+            unit = Unit._operations[key] = Unit._derived(
+                self.dimension ** exponent, self.factor ** exponent, f'({self.symbol}){superscript}'
+            )
+        return unit
+
+    def root(self, n: int) -> 'Unit':
+        """Returns the n-th root of this unit.
+
+        :raises IncompatibleUnitsError: If the dimension has no n-th root.
+        """
+        key = ('root', self, n)
+        unit = Unit._operations.get(key)
+        if unit is None:
+            unit = Unit._operations[key] = Unit._derived(
+                self.dimension.root(n), self.factor ** (1 / n), f'({self.symbol})^(1/{n})'
+            )
+        return unit
+
+    def __repr__(self):
+        return f'Unit({self.symbol!r})'
+
+
+DIMENSIONLESS_UNIT = Unit.parse('')
+
+
+def unit_of(value) -> Union[Unit, None]:
+    """The unit of a UnitDecimal or UnitFloat, or None for values without a unit."""
+    return getattr(value, '_unit', None)
+
+
+def without_unit(value):
+    """Removes the unit of a UnitDecimal or UnitFloat. Dataclasses like `Planet` become copies whose fields have no
+    unit. All other values are returned unchanged.
+
+    >>> without_unit(UnitDecimal('7.5', 'km'))
+    Decimal('7.5')
+    """
+    if unit_of(value) is not None:
+        return value._number(value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return _dataclass_without_unit(value)
+    return value
+
+
+_unitless_copies: Dict[int, Tuple[weakref.ref, object]] = {}
+"""Copies of dataclasses without units by id() of the original, with a weak reference to the original. Not by hash,
+as e.g. `SONNE` has NaN fields. An entry is removed as soon as its original is garbage collected."""
+
+
+def _dataclass_without_unit(value):
+    """
+    >>> from lib.planet import ERDE
+    >>> planet = dataclasses.replace(ERDE, name='Erde 2')
+    >>> without_unit(planet) is without_unit(planet), id(planet) in _unitless_copies
+    (True, True)
+    >>> key = id(planet)
+    >>> del planet
+    >>> key in _unitless_copies
+    False
+    """
+    cached = _unitless_copies.get(id(value))
+    if cached is not None and cached[0]() is value:
+        return value if cached[1] is None else cached[1]
+
+    changes = {
+        field.name: without_unit(getattr(value, field.name))
+        for field in dataclasses.fields(value)
+        if unit_of(getattr(value, field.name)) is not None
+    }
+    copy = dataclasses.replace(value, **changes) if len(changes) > 0 else value
+    try:
+        original = weakref.ref(value)
+    except TypeError:
+        # Without __weakref__ the copy is not cached
+        return copy
+    # None instead of the original itself, so the entry does not keep it alive
+    _unitless_copies[id(value)] = (original, None if copy is value else copy)
+    weakref.finalize(value, _unitless_copies.pop, id(value), None)
+    return copy
+
+
+def _sum_unit(left: Unit, right: Union[Unit, None]) -> Unit:
+    """Unit of a sum or difference. Plain numbers take the unit of the other operand; angles may be combined with
+    dimensionless values, as radians are dimensionless. Operands in another unit are converted, see `_in_unit()`."""
+    if right is None or right is left or right.dimension is left.dimension:
+        return left
+    if left.dimension.is_angle and right.dimension.is_dimensionless:
+        return left
+    if left.dimension.is_dimensionless and right.dimension.is_angle:
+        return right
+    raise IncompatibleUnitsError(f'Cannot add or subtract {left.symbol!r} and {right.symbol!r}')
+
+
+def _without_angle(dimension: Dimension) -> Dimension:
+    length, time, mass, _ = dimension.exponents
+    return Dimension.of(length, time, mass)
+
 
-    unit: str
-    """The unit of this Decimal."""
+def _in_unit(value, unit: Unit, target: Unit):
+    """Converts a quantity in `unit` to a plain number in `target`, a unit of the same dimension (or an angle and a
+    dimensionless value, which counts as radians)."""
+    number = value._number(value)
+    ratio = unit.factor / target.factor
+    if Unit._factor_key(ratio) == 1.0:
+        return number
+    return number * (Decimal(repr(ratio)) if isinstance(number, Decimal) else ratio)
 
-    def __new__(cls, value, unit: str):
-        return Decimal.__new__(cls, value)
 
-    def __init__(self, value, unit: str):
-        Decimal.__init__(value)
-        self.unit = unit
+def _power_unit(unit: Unit, exponent) -> Unit:
+    """Unit of a power with a plain exponent. Integer exponents and roots like `1 / 3` are supported."""
+    if unit.dimension.is_dimensionless:
+        return unit
+    if unit_of(exponent) is not None and not unit_of(exponent).dimension.is_dimensionless:
+        raise IncompatibleUnitsError(f'Exponent must be dimensionless, not {unit_of(exponent).symbol!r}')
+    exponent = float(exponent)
+    if exponent == int(exponent):
+        return unit ** int(exponent)
+    root = round(1 / exponent)
+    if root != 0 and abs(root * exponent - 1) < 1e-9:
+        return unit.root(root)
+    raise IncompatibleUnitsError(f'Cannot raise {unit.symbol!r} to the power of {exponent}')
+
+
+class _Quantity:
+    """Arithmetic for numbers with a unit, shared by UnitDecimal and UnitFloat.
+
+    Results keep their unit: sums require compatible dimensions, products and quotients combine the units and powers
+    raise them. Plain numbers are treated as dimensionless factors or, in sums, as values in the unit of the other
+    operand.
+    """
+
+    __slots__ = ()
+
+    _number: type
+    """The number type the quantity extends."""
+    _unit: Unit
+
+    @property
+    def unit(self) -> str:
+        """The symbol of the unit of this value."""
+        return self._unit.symbol
+
+    @property
+    def dimension(self) -> Dimension:
+        """The dimension of the unit of this value."""
+        return self._unit.dimension
+
+    def _with_unit(self, value, unit: Unit):
+        if value is NotImplemented:
+            return value
+        result = self._number.__new__(type(self), value)
+        result._unit = unit
+        return result
+
+    def _sum(self, operation, other):
+        other_unit = unit_of(other)
+        if other_unit is None or other_unit is self._unit:
+            return self._with_unit(operation(self, other), self._unit)
+        unit = _sum_unit(self._unit, other_unit)
+        left = self if unit is self._unit else _in_unit(self, self._unit, unit)
+        right = other if other_unit is unit else _in_unit(other, other_unit, unit)
+        return self._with_unit(operation(left, right), unit)
+
+    def _same_scale(self, other, other_unit: Unit):
+        """Converts `other` to the unit of this value if both units have the same dimension but another scale, so that
+        e.g. km / m yields a plain ratio instead of a value in the mixed unit km/m."""
+        if other_unit is self._unit or other_unit.dimension is not self._unit.dimension:
+            return other, other_unit
+        return _in_unit(other, other_unit, self._unit), self._unit
+
+    def __add__(self, other):
+        return self._sum(self._number.__add__, other)
+
+    def __radd__(self, other):
+        return self._sum(self._number.__radd__, other)
+
+    def __sub__(self, other):
+        return self._sum(self._number.__sub__, other)
+
+    def __rsub__(self, other):
+        return self._sum(self._number.__rsub__, other)
+
+    def __mul__(self, other):
+        other_unit = unit_of(other)
+        if other_unit is None:
+            return self._with_unit(self._number.__mul__(self, other), self._unit)
+        other, other_unit = self._same_scale(other, other_unit)
+        return self._with_unit(self._number.__mul__(self, other), self._unit * other_unit)
+
+    def __rmul__(self, other):
+        return self._with_unit(self._number.__rmul__(self, other), self._unit)
+
+    def __truediv__(self, other):
+        other_unit = unit_of(other)
+        if other_unit is None:
+            return self._with_unit(self._number.__truediv__(self, other), self._unit)
+        other, other_unit = self._same_scale(other, other_unit)
+        return self._with_unit(self._number.__truediv__(self, other), self._unit / other_unit)
+
+    def __rtruediv__(self, other):
+        return self._with_unit(self._number.__rtruediv__(self, other), DIMENSIONLESS_UNIT / self._unit)
+
+    def __pow__(self, exponent, modulo=None):
+        if modulo is not None:
+            return self._number.__pow__(self, exponent, modulo)
+        return self._with_unit(self._number.__pow__(self, exponent), _power_unit(self._unit, exponent))
+
+    def __neg__(self):
+        return self._with_unit(self._number.__neg__(self), self._unit)
+
+    def __pos__(self):
+        return self._with_unit(self._number.__pos__(self), self._unit)
+
+    def __abs__(self):
+        return self._with_unit(self._number.__abs__(self), self._unit)
 
     def __str__(self):
-        return ('{:.' + str(self.output_decimal_points) + 'f} {}').format(Decimal(self), self.unit)
+        return ('{:.' + str(UnitDecimal.output_decimal_points) + 'f} {}').format(self._number(self), self._unit.symbol)
 
     def __repr__(self):
         return str(self)
 
+    def __reduce__(self):
+        return type(self), (str(self._number(self)), self._unit.symbol)
+
+
+class UnitDecimal(_Quantity, Decimal):
+    """A typed Decimal, i.e. a Decimal with a unit.
+
+    Arithmetic propagates and checks the unit. Operands in another unit of the same dimension are converted to the
+    unit of the left operand:
+
+    >>> UnitDecimal('100', 'km') / UnitDecimal('20', 's')
+    5.000 km/s
+    >>> UnitDecimal(1, 'km') + UnitDecimal(1, 'm')
+    1.001 km
+    >>> UnitDecimal(2, '°') + UnitDecimal(1, 'rad')
+    59.296 °
+    >>> ratio = UnitDecimal(2, 'km') / UnitDecimal(1, 'm')
+    >>> ratio == 2000, ratio.dimension.is_dimensionless
+    (True, True)
+    >>> UnitDecimal('100', 'km') + UnitDecimal('20', 's')  # doctest: +IGNORE_EXCEPTION_DETAIL
+    Traceback (most recent call last):
+    ...
+    IncompatibleUnitsError: Cannot add or subtract 'km' and 's'
+    """
+
+    __slots__ = ('_unit',)
+
+    _number = Decimal
+
+    output_decimal_points: int = 3
+
+    def __new__(cls, value, unit: Union[str, Unit]):
+        self = Decimal.__new__(cls, value)
+        self._unit = Unit.parse(unit)
+        return self
+
+    def copy_abs(self):
+        return self._with_unit(Decimal.copy_abs(self), self._unit)
+
+    def copy_negate(self):
+        return self._with_unit(Decimal.copy_negate(self), self._unit)
+
+    def __str__(self):
+        return ('{:.' + str(self.output_decimal_points) + 'f} {}').format(Decimal(self), self._unit.symbol)
+
+
+class UnitFloat(_Quantity, float):
+    """A typed float, i.e. a float with a unit. The counterpart of UnitDecimal for the float mode of `lib.numerik`.
+
+    >>> UnitFloat(7.7843, 'km/s')
+    7.784 km/s
+    """
+
+    __slots__ = ('_unit',)
+
+    _number = float
+
+    def __new__(cls, value, unit: Union[str, Unit]):
+        self = float.__new__(cls, value)
+        self._unit = Unit.parse(unit)
+        return self
+
+    def __reduce__(self):
+        return type(self), (float(self), self._unit.symbol)
+
+
+_units_detached: ContextVar[bool] = ContextVar('units_detached', default=False)
+"""True while `units_detached()` is active in the current thread or task."""
+
+
+@contextmanager
+def units_detached():
+    """Evaluates formulas on plain numbers: within the block `with_unit()` and therefore `return_unit` attach no units.
+
+    Used by the solver once the units of a solve plan have been checked, so only the final results get their unit.
+
+    >>> with units_detached():
+    ...     with_unit(Decimal('7.5'), 'km')
+    Decimal('7.5')
+    """
+    token = _units_detached.set(True)
+    try:
+        yield
+    finally:
+        _units_detached.reset(token)
+
+
+def attaches_units() -> bool:
+    """False within `units_detached()`, otherwise True."""
+    return not _units_detached.get()
+
+
+def with_unit(value, unit: Union[str, Unit]):
+    """Attaches a unit to a plain number: Decimal becomes UnitDecimal, float becomes UnitFloat and NumPy arrays stay
+    unchanged. Within `units_detached()` all values stay unchanged."""
+    if is_array(value) or _units_detached.get():
+        return value
+    if isinstance(value, float):
+        return UnitFloat(value, unit)
+    return UnitDecimal(value, unit)
+
+
+def convert_unit(value, unit: Union[str, Unit]):
+    """Like `with_unit()`, but checks values that already have a unit: they must have the dimension of `unit`, apart
+    from angles, which count as dimensionless. Values of the same dimension are converted to `unit`, for angles only
+    the unit is replaced.
+
+    Used by the solver to compare the unit a formula computes with the unit it declares with `return_unit`.
+
+    >>> distance = convert_unit(UnitDecimal(1500, 'm'), 'km')
+    >>> distance == Decimal('1.5'), unit_of(distance)
+    (True, Unit('km'))
+    >>> convert_unit(UnitDecimal(1500, 'm'), 'km/s')  # doctest: +IGNORE_EXCEPTION_DETAIL
+    Traceback (most recent call last):
+    IncompatibleUnitsError: Got 'm', but expected 'km/s'
+
+    :raises IncompatibleUnitsError: If the dimensions differ.
+    """
+    value_unit = unit_of(value)
+    if value_unit is None or _units_detached.get():
+        return with_unit(value, unit)
+    unit = Unit.parse(unit)
+    if value_unit.dimension is unit.dimension:
+        return with_unit(_in_unit(value, value_unit, unit), unit)
+    if _without_angle(value_unit.dimension) is not _without_angle(unit.dimension):
+        raise IncompatibleUnitsError(f'Got {value_unit.symbol!r}, but expected {unit.symbol!r}')
+    return with_unit(value._number(value), unit)
+
 
 def return_unit(unit: str):
-    """Changes the return type of the decorated function from Decimal to a UnitDecimal.
+    """Changes the return type of the decorated function from Decimal to a UnitDecimal, or from float to a UnitFloat.
+
+    NumPy arrays, as computed by `Solvable.solve_arrays()`, are returned unchanged; their unit is available as the
+    attribute `unit` of the decorated function. The undecorated function is available as `__wrapped__`, which the
+    solver calls once the units of a solve plan have been checked.
 
     :param unit: The unit of the returned UnitDecimal.
     """
+    parsed_unit = Unit.parse(unit)
+
     def decorator(function):
         # @wraps copies the function name, docstring and argument list from the decorated function to the wrapper.
         @wraps(function)
         def wrapper(*args, **kwargs):
-            # Call function and wrap return value in UnitDecimal
-            return_value = function(*args, **kwargs)
-            return UnitDecimal(return_value, unit)
+            # Call function and wrap return value in UnitDecimal or UnitFloat
+            return with_unit(function(*args, **kwargs), parsed_unit)
+        wrapper.unit = unit
         return wrapper
     return decorator
-
@@ -4,6 +4,7 @@ from typing import Optional
 
 from bahnaufstieg import bahnaufstieg, Bahnaufstieg
 from fluchthyperbel import fluchthyperbel, Fluchthyperbel
+from lib import tracing
 from lib.planet import *
 from lib.solvable import Solvable
 from lib.unit_decimal import UnitDecimal
@@ -26,7 +27,7 @@ class Mission:
     def __str__(self):
         return json.dumps(
             dataclasses.asdict(self), indent='  ',
-            default=lambda x: vars(x) if isinstance(x, Solvable) else str(x),
+            default=lambda x: x.to_dict() if isinstance(x, Solvable) else str(x),
             ensure_ascii=False
         )
 
@@ -34,11 +35,11 @@ class Mission:
 def print_mission_ablauf():
     """Gibt den Missionsablauf aus."""
 
-    print('Ablauf der Mission')
-    print('1. Bahnaufstieg')
-    print('2. Flucht aus dem Gravitationsfeld des Startplaneten')
-    print('3. Übergang zum Zielplaneten (Hohmann-Transfer)')
-    print('4. Einschwenken in den Orbit um die Zielplaneten')
+    tracing.message('Ablauf der Mission')
+    tracing.message('1. Bahnaufstieg')
+    tracing.message('2. Flucht aus dem Gravitationsfeld des Startplaneten')
+    tracing.message('3. Übergang zum Zielplaneten (Hohmann-Transfer)')
+    tracing.message('4. Einschwenken in den Orbit um die Zielplaneten')
 
 
 def bahnaufstieg_1() -> Bahnaufstieg:
@@ -58,8 +59,11 @@ def uebergang_zielplanet_3(*, start_planet: Planet, ziel_planet: Planet) -> Hohm
     :param ziel_planet: Zielplanet.
     :return: Sämtliche berechneten Werte.
     """
-    print('3. Übergang zum Zielplaneten')
-    uebergang_zielplanet_data = HohmannTransfer(zentralgestirn=SONNE, start_planet=start_planet, ziel_planet=ziel_planet)
+    tracing.message('3. Übergang zum Zielplaneten')
+    # lazy: Für die Mission werden nur delta_v1 und delta_v2 benötigt, der Rest erst beim Export
+    uebergang_zielplanet_data = HohmannTransfer(
+        zentralgestirn=SONNE, start_planet=start_planet, ziel_planet=ziel_planet, lazy=True
+    )
     return uebergang_zielplanet_data
 
 
@@ -72,10 +76,10 @@ def flucht_gravitationsfeld_2(planet: Planet, hp: Decimal, vinf: Decimal) -> Flu
     :param vinf: Hyperbolische Exzessgeschwindigkeit im Unendlichen in km/s.
     :return: 
     """
-    print(f'2. Flucht aus dem Gravitationsfeld von Start {planet}')
-    print(f'Berechne Fluchthyperbel von {planet=}')
-    print(f'Höhe des Perizentrums über der Planetenoberfläche {hp=}')
-    print(f'Exzessgeschwindigkeit delta_v1 (vom Hohmann-Übergang) {vinf=}')
+    tracing.message(f'2. Flucht aus dem Gravitationsfeld von Start {planet}')
+    tracing.message(f'Berechne Fluchthyperbel von {planet=}')
+    tracing.message(f'Höhe des Perizentrums über der Planetenoberfläche {hp=}')
+    tracing.message(f'Exzessgeschwindigkeit delta_v1 (vom Hohmann-Übergang) {vinf=}')
     return fluchthyperbel(planet=planet, hp=hp, vinf=vinf)
 
 
@@ -89,10 +93,10 @@ def einschwenken_orbit_zielplanet_4(ziel_planet: Planet, hp: Decimal, vinf: Deci
     km/s.
     :return: Daten der Hyperbel.
     """
-    print(f'4. Einschwenken in Orbit um den Zielplaneten')
-    print(f'{ziel_planet=}')
-    print(f'Höhe Perizentrum über Plantenoberfläche {hp=}')
-    print(f'Anfluggeschwindigkeit vom Hohmann-Transfer (va) hier als hyperbolische Exzessgeschwindigkeit {vinf=}')
+    tracing.message(f'4. Einschwenken in Orbit um den Zielplaneten')
+    tracing.message(f'{ziel_planet=}')
+    tracing.message(f'Höhe Perizentrum über Plantenoberfläche {hp=}')
+    tracing.message(f'Anfluggeschwindigkeit vom Hohmann-Transfer (va) hier als hyperbolische Exzessgeschwindigkeit {vinf=}')
     return fluchthyperbel(planet=ziel_planet, hp=hp, vinf=vinf)
 
 
@@ -111,15 +115,15 @@ def mission(
     :return: Sämtliche berechneten Werte.
     """
     print_mission_ablauf()
-    print('\n---\n')
+    tracing.message('\n---\n')
     bahnaufstieg_1_data = bahnaufstieg_1() if bahnaufstieg_machen else None
-    print('\n---\n')
+    tracing.message('\n---\n')
     uebergang_zielplanet_3_data = uebergang_zielplanet_3(start_planet=start_planet, ziel_planet=ziel_planet)
-    print('\n---\n')
+    tracing.message('\n---\n')
     flucht_gravitationsfeld_2_data = flucht_gravitationsfeld_2(
         planet=start_planet, hp=start_planet_hoehe_umlaufbahn, vinf=uebergang_zielplanet_3_data.delta_v1
     )
-    print('\n---\n')
+    tracing.message('\n---\n')
     einschwenken_orbit_zielplanet_4_data = einschwenken_orbit_zielplanet_4(
         ziel_planet=ziel_planet, hp=ziel_planet_hoehe_umlaufbahn, vinf=uebergang_zielplanet_3_data.delta_v2
     )
@@ -138,6 +142,7 @@ def mission(
 
 
 def main():
+    tracing.set_sink(tracing.PrintSink())
     print('Vollständige Mission 🚀 - Eingabe der Parameter')
     # Eingabe lesen
     start_planet = planet_from_name(input('Startplanet: '))
@@ -1,6 +1,7 @@
 import json
 from decimal import Decimal
 from lib.unit_decimal import UnitDecimal, return_unit
+from lib import tracing
 from lib.solvable import Solvable
 
 
@@ -122,10 +123,11 @@ class Nutzlast(Solvable):
 
 
 def main():
+    tracing.set_sink(tracing.PrintSink())
     nutzlast_input_json = input('Nutzlast Data: ')
     nutzlast_input = json.loads(nutzlast_input_json)
     nutzlast_obj = Nutzlast(**nutzlast_input)
-    print(json.dumps(nutzlast_obj.__dict__, indent='  ', default=lambda x: str(x)))
+    print(json.dumps(nutzlast_obj.to_dict(), indent='  ', default=lambda x: str(x)))
 
 
 if __name__ == '__main__':